@@ -0,0 +1,306 @@
+"""
+エリア別の一覧ページによるまとめ取得の確認とベンチマーク
+
+保存済みの一覧ページ (fixtures/listing) と路線ページ (fixtures/diainfo) を使い、次を確かめる
+    listing_parse  一覧ページの解析 (extract_listing) が expected.json と一致するか(少しずつ渡した場合も)と解析時間
+    area_fetch     N路線の更新1回分 (StatusPipeline) の通信数と時間: 路線毎のページ / 一覧ページでまとめて取得
+                   路線は一覧の行から選び、area の無い路線と一覧に無い路線を1つずつ加える
+                   結果(状況・テキスト)が路線毎のページと同じで、通信数が
+                   エリアの数 + トラブル中の路線 + 一覧に無い路線 + area の無い路線 になれば合格
+    listing_error  一覧ページが取得できない場合は路線毎のページに切り替わるか(一覧は1回だけ試す)
+    scheduled      PollScheduler で路線毎の取得時刻に少しずつ取得した場合( StatusAggregator.poll_lines を
+                   仮の時計で --hours 時間分)。一覧ページの通信数が エリアの数 x (経過時間 / ttl + 1) 以下で
+                   取得の回数より少なく、最後の状態が路線毎のページと同じで、
+                   PollScheduler が数えたリクエスト数(取得数の上限に使う)が実際の送信数と同じなら合格
+トラブル中の路線のページは fixtures/diainfo/trouble_delay.html、それ以外は normal.html を返す
+通信は FixtureTransport (保存済みページを返す)。--http の場合は代替 HTTP サーバーと HttpTransport (requests が必要)
+一致しない項目があれば終了コード 1
+
+実行例:
+    python bench/bench_area_fetch.py [--lines 5 20 50] [--repeat 200] [--hours 2] [--json FILE]
+    python bench/bench_area_fetch.py --http
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR)) # traffic_info を import するため
+
+from bench_suite import FixtureServer, load_fixtures, median_ms
+from traffic_info.logs import setup_logging
+from traffic_info.parsers import ListingExtractor, extract_listing
+from traffic_info.pipeline import StatusPipeline
+from traffic_info.registry import LineConfig
+from traffic_info.scheduler import PollScheduler
+from traffic_info.server import StatusAggregator, StatusHub
+from traffic_info.transport import CachedPage, PageResponse
+
+FIXTURE_DIR = os.path.join(BENCH_DIR, "fixtures")
+YAHOO_BASE = "https://transit.yahoo.co.jp"
+# 一覧ページのパス -> 保存済みの一覧ページ
+AREA_PATHS = {
+    "/diainfo/area/6": "area_kinki.html",
+    "/diainfo/area/4": "area_kanto.html",
+}
+MISSING_AREA_PATH = "/diainfo/area/99" # 取得できない一覧ページ
+DIRECT_LINE = ("サンライズ出雲・瀬戸", "1052") # area の無い路線
+UNLISTED_LINE = ("未掲載線", "9999") # 一覧に無い路線
+CHUNK_SIZES = (1, 7, 100, 8192)
+SCHEDULED_LINES = 20
+POLL_STEP_SEC = 5.0 # 仮の時計で取得時刻を確認する間隔
+
+
+# 保存済みページを返す transport (HttpTransport の get_extracted() と同じ呼び出し方)
+class FixtureTransport:
+
+    # pages: パス -> 本文(文字列)
+    def __init__(self, pages):
+        self.pages = pages
+        self.requests = 0
+        self.request_hooks = []
+        self._lock = threading.Lock()
+
+    def get_extracted(self, url, make_extractor, timeout=None):
+        for hook in self.request_hooks:
+            hook()
+        with self._lock:
+            self.requests += 1
+        body = self.pages.get(urlsplit(url).path)
+        if body is None:
+            raise OSError(f"404 Not Found: {url}")
+        extractor = make_extractor()
+        for start in range(0, len(body), 8192):
+            extractor.feed(body[start:start + 8192])
+            if extractor.done:
+                break
+        extractor.close()
+        page = CachedPage(url, None, len(body), None, None)
+        page.parsed = extractor.result()
+        return PageResponse(page, False, 200)
+
+    def begin_cycle(self):
+        pass
+
+    def close(self):
+        pass
+
+
+# 一覧ページの解析: 結果の確認と解析時間
+def check_listing_parse(results, failures, repeat):
+    with open(os.path.join(FIXTURE_DIR, "listing", "expected.json"), encoding="utf-8") as f:
+        expected = json.load(f)
+    for name, html in load_fixtures("listing").items():
+        html = html.decode("utf-8")
+        want = [tuple(row) for row in expected[name]]
+        for size in CHUNK_SIZES:
+            extractor = ListingExtractor()
+            for start in range(0, len(html), size):
+                extractor.feed(html[start:start + size])
+            extractor.close()
+            got = [tuple(entry) for entry in extractor.result()]
+            if got != want:
+                failures.append(f"listing_parse {name} (chunk {size}): {len(got)}行, 期待値 {len(want)}行")
+                for got_row, want_row in zip(got, want):
+                    if got_row != want_row:
+                        failures.append(f"  {got_row} != {want_row}")
+                break
+        results[f"listing_parse.{name}.rows"] = len(want)
+        results[f"listing_parse.{name}.median_ms"] = median_ms(lambda html=html: extract_listing(html), repeat)
+    return expected
+
+
+# 一覧の行から count 路線を選び, area の無い路線と一覧に無い路線を加える
+# 戻り値: (LineConfig のリスト, 路線名 -> 一覧での状況)
+def build_lines(expected, base, count):
+    rows = []
+    seen = set()
+    for path, name in AREA_PATHS.items():
+        for line_id, line_name, status, _ in expected[name]:
+            if line_id not in seen: # 複数のエリアに載っている路線(新幹線)は最初のエリアで
+                seen.add(line_id)
+                rows.append((path, line_id, line_name, status))
+    lines = []
+    statuses = {}
+    for i in range(count):
+        path, line_id, line_name, status = rows[i % len(rows)]
+        name = line_name if i < len(rows) else f"{line_name} ({i // len(rows) + 1})"
+        lines.append(LineConfig(name, f"{base}/diainfo/{line_id}/0", None, "", {}, area=base + path))
+        statuses[name] = status
+    direct_name, direct_id = DIRECT_LINE
+    lines.append(LineConfig(direct_name, f"{base}/diainfo/{direct_id}/0", None, "", {}))
+    unlisted_name, unlisted_id = UNLISTED_LINE
+    lines.append(LineConfig(unlisted_name, f"{base}/diainfo/{unlisted_id}/0", None, "", {}, area=base + "/diainfo/area/6"))
+    return lines, statuses
+
+
+# 路線ページ・一覧ページ(パス -> 本文)
+def build_pages(expected):
+    diainfo = {name: body.decode("utf-8") for name, body in load_fixtures("diainfo").items()}
+    listing = {name: body.decode("utf-8") for name, body in load_fixtures("listing").items()}
+    pages = {path: listing[name] for path, name in AREA_PATHS.items()}
+    trouble_ids = {row[0] for name in AREA_PATHS.values() for row in expected[name] if row[2] == "trouble"}
+    for name in AREA_PATHS.values():
+        for line_id, _, _, _ in expected[name]:
+            pages[f"/diainfo/{line_id}/0"] = diainfo["trouble_delay.html" if line_id in trouble_ids else "normal.html"]
+    for _, line_id in (DIRECT_LINE, UNLISTED_LINE):
+        pages[f"/diainfo/{line_id}/0"] = diainfo["normal.html"]
+    return pages
+
+
+# 1サイクル分を取得して (路線名 -> (状況, テキスト), 通信数, ミリ秒, 一覧の集計)
+def run_cycle(lines, make_transport, count_requests):
+    transport = make_transport()
+    pipeline = StatusPipeline(lines=lines, transport=transport, max_workers=4)
+    try:
+        before = count_requests(transport)
+        started = time.perf_counter()
+        states = pipeline.refresh(timeout=60)
+        elapsed = (time.perf_counter() - started) * 1000
+        requests = count_requests(transport) - before
+        got = {name: (state.status, state.text) for name, state in states.items()}
+        for name, error in pipeline.errors.items():
+            got[name] = ("error", repr(error))
+        return got, requests, elapsed, pipeline.area_fetch.cycle_stats()
+    finally:
+        pipeline.close()
+
+
+# N路線の更新1回分: 路線毎のページ / 一覧ページでまとめて取得
+def check_area_fetch(results, failures, expected, line_counts, base, make_transport, count_requests):
+    for count in line_counts:
+        lines, statuses = build_lines(expected, base, count)
+        per_line = [line._replace(area=None) for line in lines]
+        want, per_line_requests, per_line_ms, _ = run_cycle(per_line, make_transport, count_requests)
+        got, bulk_requests, bulk_ms, stats = run_cycle(lines, make_transport, count_requests)
+        areas = len({line.area for line in lines if line.area})
+        trouble = sum(1 for status in statuses.values() if status == "trouble")
+        expected_requests = areas + trouble + 2 # + 一覧に無い路線 + area の無い路線
+        results[f"area_fetch.{count}.per_line_requests"] = per_line_requests
+        results[f"area_fetch.{count}.bulk_requests"] = bulk_requests
+        results[f"area_fetch.{count}.per_line_ms"] = per_line_ms
+        results[f"area_fetch.{count}.bulk_ms"] = bulk_ms
+        results[f"area_fetch.{count}.resolved"] = stats["resolved"]
+        if got != want:
+            for name in sorted(set(got) | set(want)):
+                if got.get(name) != want.get(name):
+                    failures.append(f"area_fetch.{count} {name}: {got.get(name)} != {want.get(name)}")
+        if bulk_requests != expected_requests:
+            failures.append(f"area_fetch.{count}: 通信 {bulk_requests}件 (期待値 {expected_requests}件)")
+
+
+# 一覧ページが取得できない場合
+def check_listing_error(results, failures, expected, base, make_transport, count_requests):
+    lines, _ = build_lines(expected, base, 10)
+    want, _, _, _ = run_cycle([line._replace(area=None) for line in lines], make_transport, count_requests)
+    broken = [line._replace(area=base + MISSING_AREA_PATH) if line.area else line for line in lines]
+    got, requests, _, stats = run_cycle(broken, make_transport, count_requests)
+    results["listing_error.requests"] = requests
+    if got != want:
+        failures.append("listing_error: 路線毎のページと結果が違います")
+    if stats["listing_requests"] != 1 or requests != len(lines) + 1:
+        failures.append(f"listing_error: 一覧 {stats['listing_requests']}件, 通信 {requests}件 (期待値 1件, {len(lines) + 1}件)")
+
+
+# 仮の時計(秒)
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+# PollScheduler の取得時刻毎に少しずつ取得した場合の一覧ページの通信数
+def check_scheduled(results, failures, expected, base, make_transport, count_requests, hours):
+    lines, _ = build_lines(expected, base, SCHEDULED_LINES)
+    want, _, _, _ = run_cycle([line._replace(area=None) for line in lines], make_transport, count_requests)
+    clock = FakeClock()
+    pipeline = StatusPipeline(lines=lines, transport=make_transport(), max_workers=4)
+    pipeline.area_fetch.clock = clock # 一覧ページの使い回しも仮の時計で
+    scheduler = PollScheduler([line.name for line in lines], clock=clock, rng=random.Random(1))
+    aggregator = StatusAggregator(pipeline, StatusHub(history_size=64), scheduler=scheduler)
+    batches = 0
+    listing_requests = 0
+    requests_before = count_requests(pipeline.transport)
+    try:
+        while clock.now < hours * 3600:
+            dispatched = sum(schedule.requests for schedule in scheduler.lines.values())
+            aggregator.poll_lines()
+            if sum(schedule.requests for schedule in scheduler.lines.values()) != dispatched:
+                batches += 1 # 取得した(集計は取得毎にリセットされる)
+                listing_requests += pipeline.area_fetch.cycle_stats()["listing_requests"]
+            clock.now += POLL_STEP_SEC
+        got = {name: (state.status, state.text) for name, state in pipeline.states.items()}
+        sent = count_requests(pipeline.transport) - requests_before
+    finally:
+        pipeline.close()
+    areas = len({line.area for line in lines if line.area})
+    limit = areas * int(hours * 3600 / pipeline.area_fetch.ttl + 1)
+    results["scheduled.batches"] = batches
+    results["scheduled.line_dispatches"] = sum(schedule.requests for schedule in scheduler.lines.values())
+    results["scheduled.requests"] = scheduler.total_requests
+    results["scheduled.listing_requests"] = listing_requests
+    results["scheduled.listing_limit"] = limit
+    if scheduler.total_requests != sent: # 取得数の上限は実際に送ったリクエストで数える
+        failures.append(f"scheduled: PollScheduler のリクエスト数 {scheduler.total_requests}件 != 送信 {sent}件")
+    if listing_requests > limit or listing_requests >= batches:
+        failures.append(f"scheduled: 一覧ページ {listing_requests}件 (上限 {limit}件, 取得 {batches}回)")
+    for name in sorted(set(got) | set(want)):
+        if got.get(name) != want.get(name):
+            failures.append(f"scheduled {name}: {got.get(name)} != {want.get(name)}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, nargs="+", default=[5, 20, 50])
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--hours", type=float, default=2.0, help="scheduled の仮の経過時間")
+    parser.add_argument("--http", action="store_true", help="代替 HTTP サーバーと HttpTransport を使う")
+    parser.add_argument("--json", help="結果を JSON で書き出す")
+    args = parser.parse_args()
+    setup_logging("ERROR") # 一覧ページの取得失敗の警告は listing_error で想定どおり
+
+    results = {}
+    failures = []
+    expected = check_listing_parse(results, failures, args.repeat)
+    pages = build_pages(expected)
+    server = None
+    if args.http:
+        from traffic_info.transport import HttpTransport
+        server = FixtureServer({path: body.encode("utf-8") for path, body in pages.items()})
+        base = server.url("")
+        make_transport = lambda: HttpTransport(pool_maxsize=4)
+        count_requests = lambda transport: server.requests
+    else:
+        base = YAHOO_BASE
+        make_transport = lambda: FixtureTransport(pages)
+        count_requests = lambda transport: transport.requests
+    try:
+        check_area_fetch(results, failures, expected, args.lines, base, make_transport, count_requests)
+        check_listing_error(results, failures, expected, base, make_transport, count_requests)
+        check_scheduled(results, failures, expected, base, make_transport, count_requests, args.hours)
+    finally:
+        if server is not None:
+            server.close()
+
+    for key, value in results.items():
+        print(f"{key:<40} {value:10.3f}" if isinstance(value, float) else f"{key:<40} {value:>10}")
+    for failure in failures:
+        print("不一致：" + failure)
+    print("合格" if not failures else f"不合格 ({len(failures)}件)")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"results": results, "failures": failures}, f, ensure_ascii=False, indent=2)
+    return 0 if not failures else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
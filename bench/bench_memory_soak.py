@@ -0,0 +1,341 @@
+"""
+長時間稼働のメモリの確認(ソークテスト)
+
+通信の代わりに保存済みの路線ページ (fixtures/diainfo) を返し、画面の更新サイクルを数千回繰り返す
+    取得 (FetchEngine + ResilientFetch) → 解析 → LineState の比較 → スクロール表示の作り直し
+    → 取得間隔 (PollScheduler) → 保存 (SnapshotStore / StatusHistory) → 配信 (StatusHub)
+    → 3回に1回ニュースの解析とティッカーの差し替え → 1サイクルあたり30フレームのスクロール
+1サイクルは5分として扱う(3000回で約10日分)。GC は画面と同じく MemoryGovernor で設定し、
+毎サイクル若い世代だけを回収する(一定間隔の gc.collect() はしない)
+ウォームアップ後の RSS の増加量が --max-growth-mb 以下で、Canvas のアイテム数・after() の予約数が
+増えていなければ合格(終了コード 0)
+
+実行例:
+    python bench/bench_memory_soak.py [--cycles 3000] [--lines 20] [--tk] [--trace] [--json FILE]
+    --tk: 実際の Tk Canvas と after() を使う(仮想ディスプレイ上)
+    --trace: tracemalloc で増えた箇所も表示する(遅くなる)
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR)) # traffic_info を import するため
+
+from bench_suite import load_fixtures, start_virtual_display
+from traffic_info.fetcher import FetchEngine, FetchResult
+from traffic_info.history import StatusHistory
+from traffic_info.logs import get_logger, setup_logging
+from traffic_info.memory import MemoryGovernor, format_top_stats, widget_census
+from traffic_info.news import extract_news_headlines
+from traffic_info.parsers import extract_train_status
+from traffic_info.resilience import ResilientFetch
+from traffic_info.scheduler import PollScheduler
+from traffic_info.server import StatusHub, line_payload
+from traffic_info.snapshot import SnapshotStore
+from traffic_info.status import build_line_state
+from traffic_info.ticker import ScrollTask, TickerChain
+
+CYCLE_SEC = 300 # 1サイクルの想定時間(秒)
+FRAMES_PER_CYCLE = 30
+CANVAS_WIDTH = 1000
+DT = 1 / 30
+
+soak_log = get_logger("scheduler")
+
+
+# Tk Canvas の代わり(表示中のアイテムを数える)
+class CountingCanvas:
+
+    def __init__(self):
+        self.items = {} # アイテムID -> タグ
+        self._next_id = 0
+
+    def create_text(self, *args, tags=None, **kwargs):
+        self._next_id += 1
+        self.items[self._next_id] = tags
+        return self._next_id
+
+    def delete(self, *targets):
+        for target in targets:
+            if target in self.items:
+                del self.items[target]
+            else: # タグ
+                for item_id in [i for i, tag in self.items.items() if tag == target]:
+                    del self.items[item_id]
+
+    def find_all(self):
+        return tuple(self.items)
+
+    def move(self, tag, dx, dy):
+        pass
+
+    def coords(self, item_id, x, y):
+        pass
+
+    def itemconfigure(self, target, **kwargs):
+        pass
+
+
+# Tk の after() の代わり(予約中の数を数える)
+class CountingScheduler:
+
+    def __init__(self):
+        self.pending = {}
+        self._next_id = 0
+
+    def after(self, ms, func):
+        self._next_id += 1
+        self.pending[self._next_id] = func
+        return self._next_id
+
+    def after_cancel(self, after_id):
+        self.pending.pop(after_id, None)
+
+
+# 画面の更新サイクルを Tk・通信なしで再現する
+class SoakBoard:
+
+    def __init__(self, line_count, work_dir, canvas_factory, scheduler):
+        self.pages = {name: body.decode("utf-8") for name, body in load_fixtures("diainfo").items()}
+        self.page_names = sorted(self.pages)
+        self.news_pages = [body.decode("utf-8") for body in load_fixtures("news").values()]
+        self.names = [f"路線{i}" for i in range(line_count)]
+        self.urls = {name: f"http://soak.invalid/diainfo/{i}" for i, name in enumerate(self.names)}
+        self.current_page = {} # URL -> 今のサイクルで返すページ
+        self.engine = FetchEngine(fetch_func=ResilientFetch(self._fetch), max_workers=4, job_timeout=35.0)
+        self.poll_scheduler = PollScheduler(self.names)
+        self.snapshot_store = SnapshotStore(os.path.join(work_dir, "snapshot.json"))
+        self.history = StatusHistory(os.path.join(work_dir, "history"))
+        # 配信の履歴は上限 (history_size) まで増えるので、ウォームアップ中に一杯になる大きさにする
+        self.hub = StatusHub(history_size=256)
+        self.canvases = [canvas_factory() for _ in range(min(line_count, 5))] # 表示は5行
+        self.news_canvas = canvas_factory()
+        self.scheduler = scheduler
+        self.states = {}
+        self.tasks = {} # 表示行 -> ScrollTask
+        self.news_chain = TickerChain(
+            self.news_canvas, "news", [], 20, None, None, lambda font, text: 8 * len(text), "black", 25)
+        self.drain_after_id = None
+        self.started = time.time()
+
+    # 保存済みページを返す(通信の代わり)
+    def _fetch(self, url, timeout=None):
+        return extract_train_status(self.current_page[url])
+
+    # 表示行のスクロールを作り直す(画面の _render_slot と同じく, 古いアイテムを削除して作る)
+    def _render_slot(self, slot, state):
+        canvas = self.canvases[slot]
+        task = self.tasks.pop(slot, None)
+        if task is not None:
+            canvas.delete(task.text_item_id)
+        if state.status != "trouble":
+            return
+        width = 8 * len(state.text)
+        item_id = canvas.create_text(CANVAS_WIDTH + width / 2, 20, text=state.text, anchor="center")
+        self.tasks[slot] = ScrollTask(canvas, item_id, state.text, width, CANVAS_WIDTH + width / 2, 20, True, True, None, 40)
+
+    def run_cycle(self, cycle):
+        now = self.started + cycle * CYCLE_SEC
+        for i, name in enumerate(self.names):
+            # 3サイクル毎に路線毎のページ(状況)を切り替える
+            self.current_page[self.urls[name]] = self.pages[self.page_names[(i + cycle // 3) % len(self.page_names)]]
+        # 画面の _drain_fetch_results と同じく, キュー確認の after() を予約し直す
+        if self.drain_after_id is not None:
+            self.scheduler.after_cancel(self.drain_after_id)
+        self.drain_after_id = self.scheduler.after(100, lambda: None)
+        self.engine.submit_cycle(dict(self.urls))
+        published = {}
+        for result in self.engine.wait_cycle(timeout=30):
+            if not isinstance(result, FetchResult):
+                continue
+            if result.error is not None:
+                soak_log.warning("取得に失敗しました(%s)：%s", result.key, result.error)
+                continue
+            status, text = result.value
+            self.poll_scheduler.record_result(result.key, status, text)
+            self.snapshot_store.update_line(result.key, status, text, fetched_at=now)
+            self.history.record(result.key, status, timestamp=now)
+            state = build_line_state(result.key, status, text, section="区間")
+            if self.states.get(result.key) != state:
+                self.states[result.key] = state
+                published[result.key] = line_payload(state)
+                slot = self.names.index(result.key)
+                if slot < len(self.canvases):
+                    self._render_slot(slot, state)
+        self.hub.publish(lines=published)
+        self.snapshot_store.save(max_age=0)
+        self.history.flush()
+        if cycle % 3 == 0:
+            headlines = extract_news_headlines(self.news_pages[cycle // 3 % len(self.news_pages)])
+            segments = ["  ◆◆◆  ニュース："] + [headline + " ／ " for headline in headlines]
+            if self.news_chain.set_texts(segments):
+                self.hub.publish(news=headlines)
+        for _ in range(FRAMES_PER_CYCLE):
+            for task in self.tasks.values():
+                task.advance(DT, CANVAS_WIDTH)
+            self.news_chain.advance(DT, CANVAS_WIDTH)
+        soak_log.debug("サイクル %s", cycle) # 既定のレベルでは出ない(呼び出しの負荷のみ)
+
+    def canvas_items(self):
+        return sum(len(canvas.find_all()) for canvas in self.canvases + [self.news_canvas])
+
+    def close(self):
+        self.engine.shutdown()
+        self.history.close()
+
+
+# 最小二乗法の傾き(1000サイクルあたり)
+def slope_per_1000(points):
+    n = len(points)
+    if n < 2:
+        return 0.0
+    mean_x = sum(x for x, _ in points) / n
+    mean_y = sum(y for _, y in points) / n
+    var = sum((x - mean_x) ** 2 for x, _ in points)
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / var * 1000 if var else 0.0
+
+
+def run(args, canvas_factory, scheduler, census_root=None):
+    work_dir = tempfile.mkdtemp(prefix="traffic_soak_")
+    board = SoakBoard(args.lines, work_dir, canvas_factory, scheduler)
+    governor = MemoryGovernor(trace=args.trace)
+    sample_every = max(1, args.cycles // args.samples)
+    warmup = int(args.cycles * args.warmup)
+    samples = []
+    started = time.perf_counter()
+    try:
+        for cycle in range(args.cycles):
+            board.run_cycle(cycle)
+            if census_root is not None:
+                census_root.update_idletasks()
+            if cycle == warmup:
+                governor.tune_gc() # 画面と同じく起動処理(ウォームアップ)の後
+            if governor.tuned:
+                governor.collect_idle()
+            if cycle >= warmup and (cycle - warmup) % sample_every == 0 or cycle == args.cycles - 1:
+                census = widget_census(census_root) if census_root is not None else None
+                report = governor.check(census)
+                sample = {
+                    "cycle": cycle,
+                    "rss_mib": report["rss"] / 1024 / 1024 if report["rss"] is not None else None,
+                    "gc_objects": len(gc.get_objects()),
+                    "canvas_items": board.canvas_items(),
+                    "after": census["after_total"] if census is not None else len(scheduler.pending),
+                    "threads": threading.active_count(),
+                }
+                if report["traced_growth"] is not None:
+                    sample["traced_kib"] = report["traced_growth"] / 1024
+                samples.append(sample)
+                print(
+                    f"{cycle:>7} {_format(sample['rss_mib'], '.1f'):>9} {sample['gc_objects']:>10} "
+                    f"{sample['canvas_items']:>7} {sample['after']:>6} {sample['threads']:>8}"
+                    + (f" {sample['traced_kib']:>+11.1f}" if "traced_kib" in sample else "")
+                )
+                if args.trace and report["top"] and cycle == args.cycles - 1:
+                    print("前回から増えた箇所:\n" + "\n".join(format_top_stats(report["top"])))
+    finally:
+        board.close()
+    return samples, time.perf_counter() - started
+
+
+def _format(value, spec):
+    return "-" if value is None else format(value, spec)
+
+
+# 後半の最小値が前半の最大値より大きい(増え続けている)か
+def _grew(values):
+    half = len(values) // 2
+    return half > 0 and min(values[half:]) > max(values[:half])
+
+
+# 合否の判定
+def verdict(samples, max_growth_mb):
+    first, last = samples[0], samples[-1]
+    summary = {
+        "canvas_items_growth": last["canvas_items"] - first["canvas_items"],
+        "after_growth": last["after"] - first["after"],
+        "gc_objects_growth": last["gc_objects"] - first["gc_objects"],
+        "threads_growth": last["threads"] - first["threads"],
+    }
+    failures = []
+    if first["rss_mib"] is not None:
+        summary["rss_growth_mib"] = last["rss_mib"] - first["rss_mib"]
+        summary["rss_slope_mib_per_1000"] = slope_per_1000([(s["cycle"], s["rss_mib"]) for s in samples])
+        if summary["rss_growth_mib"] > max_growth_mb:
+            failures.append(f"RSS が {summary['rss_growth_mib']:.1f} MiB 増えました(上限 {max_growth_mb} MiB)")
+    for key, label in (("canvas_items", "Canvas アイテム"), ("after", "after() の予約"), ("threads", "スレッド")):
+        if _grew([s[key] for s in samples]):
+            failures.append(f"{label}が増え続けています ({first[key]} → {last[key]})")
+    return summary, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="長時間稼働のメモリの確認")
+    parser.add_argument("--cycles", type=int, default=3000, help="更新サイクルの回数(1回 = 5分)")
+    parser.add_argument("--lines", type=int, default=20, help="路線数")
+    parser.add_argument("--samples", type=int, default=20, help="記録する回数")
+    parser.add_argument("--warmup", type=float, default=0.2, help="ウォームアップ(判定に含めない)の割合")
+    parser.add_argument("--max-growth-mb", type=float, default=2.0, help="ウォームアップ後の RSS の増加の上限")
+    parser.add_argument("--tk", action="store_true", help="実際の Tk Canvas と after() を使う")
+    parser.add_argument("--trace", action="store_true", help="tracemalloc で増えた箇所を表示する")
+    parser.add_argument("--json", metavar="FILE", help="結果を JSON で保存する")
+    args = parser.parse_args()
+    setup_logging("WARNING")
+
+    print(f"{'cycle':>7} {'RSS MiB':>9} {'objects':>10} {'items':>7} {'after':>6} {'threads':>8}"
+          + (f" {'traced KiB':>11}" if args.trace else ""))
+    display = None
+    root = None
+    if args.tk:
+        import tkinter
+
+        display = start_virtual_display()
+        try:
+            root = tkinter.Tk()
+        except tkinter.TclError as e:
+            print(f"ディスプレイが無いため --tk は実行できません：{e}")
+            return 2
+        root.geometry("1300x750")
+        canvas_factory = lambda: _packed_canvas(tkinter, root) # noqa: E731
+        scheduler = root
+    else:
+        canvas_factory = CountingCanvas
+        scheduler = CountingScheduler()
+    try:
+        samples, elapsed = run(args, canvas_factory, scheduler, census_root=root)
+    finally:
+        if root is not None:
+            root.destroy()
+        if display is not None:
+            display.terminate()
+
+    summary, failures = verdict(samples, args.max_growth_mb)
+    print(f"{args.cycles}サイクル ({args.cycles * CYCLE_SEC / 86400:.1f}日分, {args.lines}路線) {elapsed:.1f}秒")
+    for key, value in summary.items():
+        print(f"  {key}: {value:+.2f}" if isinstance(value, float) else f"  {key}: {value:+d}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "samples": samples, "summary": summary, "failures": failures}, f, ensure_ascii=False, indent=1)
+    if failures:
+        for failure in failures:
+            print("不合格: " + failure)
+        return 1
+    print("合格: ウォームアップ後のメモリ使用量は増えていません")
+    return 0
+
+
+def _packed_canvas(tkinter, root):
+    canvas = tkinter.Canvas(root, width=CANVAS_WIDTH, height=40, highlightthickness=0)
+    canvas.pack()
+    return canvas
+
+
+if __name__ == "__main__":
+    sys.exit(main())
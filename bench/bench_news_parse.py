@@ -0,0 +1,110 @@
+"""
+ニュース見出し解析のベンチマーク
+
+保存済みのニュースページ (fixtures/news/*.html) を使い、
+    - 従来の BeautifulSoup 版 (parse_news_headlines)
+    - NewsExtractor で全体を読む場合 (セレクタの記憶なし: NEWS_SELECTORS の順)
+    - NewsExtractor + SelectorLearner (前回のセレクタを先に試し, 8件で打ち切る)
+の結果・解析時間・ピークメモリ (tracemalloc) を比較する
+
+実行例: python bench/bench_news_parse.py [--repeat 50]
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR)) # traffic_info を import するため
+
+from traffic_info.news import NEWS_SELECTORS, SelectorLearner, extract_news_headlines, parse_news_headlines
+
+FIXTURE_DIR = os.path.join(BENCH_DIR, "fixtures", "news")
+
+
+# 保存済みページと期待値を読み込む
+def load_corpus():
+    with open(os.path.join(FIXTURE_DIR, "expected.json"), encoding="utf-8") as f:
+        expected = json.load(f)
+    corpus = {}
+    for name in sorted(expected):
+        with open(os.path.join(FIXTURE_DIR, name), encoding="utf-8") as f:
+            corpus[name] = (f.read(), expected[name])
+    return corpus
+
+
+# 1回分のピークメモリ (KiB)
+def peak_kib(func):
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+# 同じページを続けて解析した場合(2回目以降はセレクタを覚えている)の learner を作る
+def warm_learner(html):
+    learner = SelectorLearner(NEWS_SELECTORS)
+    extract_news_headlines(html, learner=learner)
+    return learner
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ニュース見出し解析のベンチマーク")
+    parser.add_argument("--repeat", type=int, default=50, help="1ページあたりの繰り返し回数")
+    args = parser.parse_args()
+
+    try:
+        import bs4 # noqa: F401
+        has_bs4 = True
+    except ImportError:
+        has_bs4 = False
+        print("bs4 が無いため BeautifulSoup 版との比較は省略します")
+
+    corpus = load_corpus()
+    mismatches = 0
+    variants = [("full", lambda html: extract_news_headlines(html, learner=None))]
+    if has_bs4:
+        variants.insert(0, ("bs4", parse_news_headlines))
+    print(f"{'page':<26}{'bytes':>8}" + "".join(f"{label + ' ms':>11}{label + ' KiB':>11}" for label, _ in variants)
+          + f"{'learned ms':>12}{'learned KiB':>12}")
+    totals = {}
+    for name, (html, expected) in corpus.items():
+        row = f"{name:<26}{len(html.encode()):>8}"
+        for label, func in variants:
+            result = func(html)
+            if result != expected:
+                mismatches += 1
+                print(f"結果が一致しません: {name} {label}={result!r} expected={expected!r}")
+            ms = timeit.timeit(lambda: func(html), number=args.repeat) * 1000 / args.repeat
+            kib = peak_kib(lambda: func(html))
+            totals[label] = totals.get(label, 0.0) + ms
+            row += f"{ms:>11.2f}{kib:>11.0f}"
+        # セレクタを覚えた状態(各回とも同じ状態から解析する)
+        learner = warm_learner(html)
+        learned = lambda: extract_news_headlines(html, learner=learner) # noqa: E731
+        result = learned()
+        if result != expected:
+            mismatches += 1
+            print(f"結果が一致しません: {name} learned={result!r} expected={expected!r}")
+        ms = timeit.timeit(learned, number=args.repeat) * 1000 / args.repeat
+        kib = peak_kib(learned)
+        totals["learned"] = totals.get("learned", 0.0) + ms
+        print(row + f"{ms:>12.2f}{kib:>12.0f}")
+        stats = learner.stats()
+        print(f"{'':<26}セレクタ: {stats['preferred']}  打ち切り {stats['early_stops']}/{stats['parses']}回")
+
+    print("合計(ms): " + ", ".join(f"{label} {total:.2f}" for label, total in totals.items()))
+    if mismatches:
+        print(f"{mismatches} 件の不一致があります")
+        return 1
+    print("全ページの結果が期待値と一致しました")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
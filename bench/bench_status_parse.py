@@ -0,0 +1,83 @@
+"""
+運行状況解析のベンチマーク
+
+保存済みの路線ページ (fixtures/diainfo/*.html) を使い、
+従来の BeautifulSoup 版 (parse_train_status) と
+StatusExtractor 版 (extract_train_status) の結果と速度を比較する
+
+実行例: python bench/bench_status_parse.py [--repeat 200]
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR)) # traffic_info を import するため
+
+from traffic_info.parsers import extract_train_status, parse_train_status
+
+FIXTURE_DIR = os.path.join(BENCH_DIR, "fixtures", "diainfo")
+
+
+# 保存済みページと期待値を読み込む
+def load_corpus():
+    with open(os.path.join(FIXTURE_DIR, "expected.json"), encoding="utf-8") as f:
+        expected = json.load(f)
+    corpus = {}
+    for name in sorted(expected):
+        with open(os.path.join(FIXTURE_DIR, name), encoding="utf-8") as f:
+            corpus[name] = (f.read(), tuple(expected[name]))
+    return corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description="運行状況解析のベンチマーク")
+    parser.add_argument("--repeat", type=int, default=200, help="1ページあたりの繰り返し回数")
+    args = parser.parse_args()
+
+    try:
+        import bs4 # noqa: F401
+        has_bs4 = True
+    except ImportError:
+        has_bs4 = False
+        print("bs4 が無いため BeautifulSoup 版との比較は省略します")
+
+    corpus = load_corpus()
+    mismatches = 0
+    total_old = 0.0
+    total_new = 0.0
+    print(f"{'page':<24}{'bytes':>8}{'bs4 (ms)':>12}{'extractor (ms)':>16}{'speedup':>10}")
+    for name, (html, expected) in corpus.items():
+        new_result = extract_train_status(html)
+        if new_result != expected:
+            mismatches += 1
+            print(f"結果が一致しません: {name} extractor={new_result!r} expected={expected!r}")
+        new_ms = timeit.timeit(lambda: extract_train_status(html), number=args.repeat) * 1000 / args.repeat
+        total_new += new_ms
+        if has_bs4:
+            old_result = parse_train_status(html)
+            if old_result != new_result:
+                mismatches += 1
+                print(f"結果が一致しません: {name} bs4={old_result!r} extractor={new_result!r}")
+            old_ms = timeit.timeit(lambda: parse_train_status(html), number=args.repeat) * 1000 / args.repeat
+            total_old += old_ms
+            print(f"{name:<24}{len(html.encode()):>8}{old_ms:>12.3f}{new_ms:>16.3f}{old_ms / new_ms:>9.1f}x")
+        else:
+            print(f"{name:<24}{len(html.encode()):>8}{'-':>12}{new_ms:>16.3f}{'-':>10}")
+
+    if has_bs4:
+        print(f"{'total':<24}{'':>8}{total_old:>12.3f}{total_new:>16.3f}{total_old / total_new:>9.1f}x")
+    else:
+        print(f"{'total':<24}{'':>8}{'-':>12}{total_new:>16.3f}")
+    if mismatches:
+        print(f"{mismatches} 件の不一致があります")
+        return 1
+    print("全ページの結果が一致しました")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+"""
+配信サーバー( traffic_info.server )のベンチマーク
+
+ローカルにサーバーを起動し、SSE の購読者を N 接続つないだ状態で更新を配信して
+    - 配信の遅延(publish から各購読者が受け取るまで) p50 / p99 / 最大
+    - 全購読者が全ての版を受け取れたか
+    - /status の応答数/秒 (200 と ETag による 304)
+を測る。購読者は1スレッド( selectors )でまとめて読む。通信は 127.0.0.1 のみ
+
+実行例: python bench/bench_status_server.py [--clients 10 100 300] [--updates 50]
+"""
+
+import argparse
+import http.client
+import os
+import selectors
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR)) # traffic_info を import するため
+
+from traffic_info.server import StatusHub, StatusServer, line_payload
+from traffic_info.status import build_line_state
+
+LINE_COUNT = 50
+
+
+# SSE の購読者(まとめて1スレッドで読む)
+class Subscribers:
+
+    def __init__(self, port, count):
+        self.selector = selectors.DefaultSelector()
+        self.received = {} # 版 -> [受信時刻, ...]
+        self.buffers = {}
+        self.connected = 0
+        for _ in range(count):
+            sock = socket.create_connection(("127.0.0.1", port))
+            sock.sendall(b"GET /events HTTP/1.1\r\nHost: bench\r\nAccept: text/event-stream\r\n\r\n")
+            sock.setblocking(False)
+            self.selector.register(sock, selectors.EVENT_READ)
+            self.buffers[sock] = b""
+        self._stop = False
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while not self._stop:
+            for key, _ in self.selector.select(timeout=0.1):
+                sock = key.fileobj
+                try:
+                    data = sock.recv(65536)
+                except BlockingIOError:
+                    continue
+                if not data:
+                    self.selector.unregister(sock)
+                    continue
+                now = time.perf_counter()
+                buffer = self.buffers[sock] + data
+                *events, rest = buffer.split(b"\n\n")
+                self.buffers[sock] = rest
+                for event in events:
+                    if b"event: snapshot" in event:
+                        self.connected += 1
+                    for line in event.split(b"\n"):
+                        if line.startswith(b"id: ") and b"event: delta" in event:
+                            self.received.setdefault(int(line[4:]), []).append(now)
+
+    def close(self):
+        self._stop = True
+        self.thread.join()
+        for key in list(self.selector.get_map().values()):
+            key.fileobj.close()
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+# 1ラウンド: 購読者 clients 接続に updates 回配信する
+def run_fanout(clients, updates, interval):
+    hub = StatusHub()
+    server = StatusServer(hub, "127.0.0.1", 0)
+    server.request_queue_size = max(128, clients)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    names = [f"路線{i}" for i in range(LINE_COUNT)]
+    hub.publish(lines={name: line_payload(build_line_state(name, "normal", "平常運転")) for name in names})
+
+    subscribers = Subscribers(server.server_port, clients)
+    deadline = time.perf_counter() + 10
+    while subscribers.connected < clients and time.perf_counter() < deadline:
+        time.sleep(0.01)
+
+    published = {}
+    for i in range(updates):
+        name = names[i % LINE_COUNT]
+        status = "trouble" if i % 2 == 0 else "normal"
+        state = build_line_state(name, status, f"運転見合わせ {i}" if status == "trouble" else f"運転再開 {i}")
+        started = time.perf_counter()
+        version = hub.publish(lines={name: line_payload(state)})
+        published[version] = started
+        time.sleep(interval)
+    time.sleep(0.5) # 最後の配信を待つ
+    subscribers.close()
+
+    latencies = []
+    complete = 0
+    for version, started in published.items():
+        arrivals = subscribers.received.get(version, [])
+        if len(arrivals) == clients:
+            complete += 1
+        latencies.extend((arrival - started) * 1000 for arrival in arrivals)
+    server.shutdown()
+    server.server_close()
+    return {
+        "connected": subscribers.connected,
+        "complete": complete,
+        "p50": percentile(latencies, 0.5) if latencies else float("nan"),
+        "p99": percentile(latencies, 0.99) if latencies else float("nan"),
+        "max": max(latencies) if latencies else float("nan"),
+    }
+
+
+# /status を requests 回取得する(etag を付けると 304)
+def run_status(requests_count, workers, use_etag):
+    hub = StatusHub()
+    server = StatusServer(hub, "127.0.0.1", 0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    names = [f"路線{i}" for i in range(LINE_COUNT)]
+    hub.publish(lines={name: line_payload(build_line_state(name, "normal", "平常運転")) for name in names})
+    etag = f'"{hub.version}"'
+
+    def fetch(_):
+        conn = http.client.HTTPConnection("127.0.0.1", server.server_port)
+        conn.request("GET", "/status", headers={"If-None-Match": etag} if use_etag else {})
+        response = conn.getresponse()
+        size = len(response.read())
+        conn.close()
+        return response.status, size
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(fetch, range(requests_count)))
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+    server.server_close()
+    statuses = {status for status, _ in results}
+    return requests_count / elapsed, statuses, sum(size for _, size in results) / len(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, nargs="+", default=[10, 100, 300])
+    parser.add_argument("--updates", type=int, default=50)
+    parser.add_argument("--interval", type=float, default=0.02, help="配信間隔(秒)")
+    parser.add_argument("--requests", type=int, default=2000, help="/status の取得回数")
+    args = parser.parse_args()
+
+    print(f"SSE 配信 ({args.updates}回, {LINE_COUNT}路線)")
+    print(f"{'購読者':>6} {'接続':>6} {'全員受信':>8} {'p50(ms)':>9} {'p99(ms)':>9} {'最大(ms)':>9}")
+    for clients in args.clients:
+        r = run_fanout(clients, args.updates, args.interval)
+        print(
+            f"{clients:>6} {r['connected']:>6} {r['complete']:>5}/{args.updates:<3}"
+            f"{r['p50']:>9.2f} {r['p99']:>9.2f} {r['max']:>9.2f}"
+        )
+
+    print(f"\n/status ({args.requests}回, 8並列)")
+    for use_etag in (False, True):
+        rate, statuses, size = run_status(args.requests, 8, use_etag)
+        label = "If-None-Match" if use_etag else "通常"
+        print(f"  {label:<14} {rate:8.0f} 回/秒  status={sorted(statuses)}  平均 {size:.0f} bytes")
+
+
+if __name__ == "__main__":
+    main()
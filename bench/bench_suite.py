@@ -0,0 +1,439 @@
+"""
+処理時間のベンチマーク一式(コミット間の比較用)
+
+保存済みの路線ページ (fixtures/diainfo) とニュースページ (fixtures/news) を
+ローカルの代替 HTTP サーバー (127.0.0.1) から返し、次の処理時間を測る
+    status_parse   運行状況の解析 (extract_train_status) 1ページあたり
+    news_parse     ニュース見出しの解析 (全体を読む場合 / セレクタを覚えた場合)
+    update_cycle   N路線の更新1回分 (StatusPipeline: 取得 + 解析 + LineState)。初回と 304 の2回目
+    stream_fetch   路線ページ1件の取得 + 解析。本文を全部受け取る場合と、少しずつ読んで状況を読み終えたら
+                   閉じる場合 (get_extracted) の受信バイト数・ピークメモリ (tracemalloc)・時間
+                   (実際のページに近づけるため、状況の後ろに約200KBの HTML を足したページを使う)
+    news_refresh   ニュースの取得 + 解析 (fetch_news_headlines)
+    ticker_step    スクロール1ティック (ティッカー 5 / 50 / 500 個)
+                   Canvas のスタブ版と、実際の Tk Canvas 版(仮想ディスプレイ上)
+結果は計測項目名 -> 値 の JSON で出力する。--compare で以前の JSON と比べ、遅くなった項目を表示する
+実行できない項目(requests が無い, ディスプレイが無い 等)は skipped に理由を記録する
+
+実行例:
+    python bench/bench_suite.py --json bench-results.json
+    python bench/bench_suite.py --compare bench-results.json
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR) # traffic_info を import するため
+
+from traffic_info.news import NEWS_SELECTORS, SelectorLearner, extract_news_headlines
+from traffic_info.parsers import extract_train_status
+from traffic_info.registry import LineConfig
+from traffic_info.ticker import ScrollTask, TickerChain
+
+FIXTURE_DIR = os.path.join(BENCH_DIR, "fixtures")
+LARGE_PAGE_PADDING = b'<div class="footer"><ul><li><a href="/about">about</a></li></ul></div>\n' * 2800 # 約200KB
+TICKER_COUNTS = (5, 50, 500)
+CANVAS_WIDTH = 1000
+DT = 1 / 30 # 30fps
+REGRESSION_THRESHOLD = 0.10 # --compare で 10% 以上遅くなった項目を表示
+
+
+# 保存済みページ(名前 -> HTML)。expected.json に載っているものだけ
+def load_fixtures(kind):
+    directory = os.path.join(FIXTURE_DIR, kind)
+    with open(os.path.join(directory, "expected.json"), encoding="utf-8") as f:
+        names = sorted(json.load(f))
+    pages = {}
+    for name in names:
+        with open(os.path.join(directory, name), "rb") as f:
+            pages[name] = f.read()
+    return pages
+
+
+# func を repeat 回実行した1回あたりの時間(ミリ秒)の中央値
+def median_ms(func, repeat):
+    func() # ウォームアップ
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+# --- ↓↓↓ 代替 HTTP サーバー(保存済みページを返す。ETag / If-None-Match 対応) ---
+class FixtureRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # keep-alive
+
+    def do_GET(self):
+        page = self.server.pages.get(self.path.split("?", 1)[0])
+        if page is None:
+            self.send_error(404)
+            return
+        body, etag = page
+        with self.server.lock:
+            self.server.requests += 1
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass # 途中で読むのをやめて閉じた (get_extracted)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FixtureServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    # pages: パス -> 本文(バイト列)
+    def __init__(self, pages):
+        super().__init__(("127.0.0.1", 0), FixtureRequestHandler)
+        self.pages = {path: (body, '"' + hashlib.md5(body).hexdigest() + '"') for path, body in pages.items()}
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.server_port}{path}"
+
+    # get_extracted() が途中で閉じた keep-alive 接続はトレースバックを出さない
+    # (次のリクエストを待つ rfile.readline() で発生するため do_GET では捕まえられない)
+    def handle_error(self, request, client_address):
+        if isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError, ConnectionAbortedError)):
+            return
+        super().handle_error(request, client_address)
+
+    def close(self):
+        self.shutdown()
+        self.server_close()
+# --- ↑↑↑ ここまで ---
+
+
+def bench_status_parse(results, repeat):
+    pages = {name: body.decode("utf-8") for name, body in load_fixtures("diainfo").items()}
+    per_page = [median_ms(lambda html=html: extract_train_status(html), repeat) for html in pages.values()]
+    results["status_parse.pages"] = len(pages)
+    results["status_parse.median_ms"] = statistics.median(per_page)
+    results["status_parse.max_ms"] = max(per_page)
+
+
+def bench_news_parse(results, repeat):
+    pages = {name: body.decode("utf-8") for name, body in load_fixtures("news").items()}
+    full = []
+    learned = []
+    for html in pages.values():
+        full.append(median_ms(lambda html=html: extract_news_headlines(html, learner=None), repeat))
+        learner = SelectorLearner(NEWS_SELECTORS)
+        extract_news_headlines(html, learner=learner) # セレクタを覚えた状態にする
+        learned.append(median_ms(lambda html=html, learner=learner: extract_news_headlines(html, learner=learner), repeat))
+    results["news_parse.full_ms"] = statistics.median(full)
+    results["news_parse.learned_ms"] = statistics.median(learned)
+
+
+# N路線の更新(初回は全ページを受信, 2回目は 304)
+def bench_update_cycle(results, skipped, server, line_counts, workers):
+    try:
+        import requests # noqa: F401
+    except ImportError:
+        skipped["update_cycle"] = "requests が無いため省略"
+        skipped["news_refresh"] = "requests が無いため省略"
+        return
+    from traffic_info.news import fetch_news_headlines
+    from traffic_info.pipeline import StatusPipeline
+    from traffic_info.transport import HttpTransport
+
+    names = sorted(load_fixtures("diainfo"))
+    for count in line_counts:
+        lines = [
+            LineConfig(f"路線{i}", server.url(f"/diainfo/{names[i % len(names)]}?line={i}"), None, f"区間{i}", {})
+            for i in range(count)
+        ]
+        pipeline = StatusPipeline(lines=lines, max_workers=workers)
+        try:
+            for phase in ("cold", "warm"):
+                started = time.perf_counter()
+                pipeline.refresh(timeout=60)
+                results[f"update_cycle.{count}.{phase}_ms"] = (time.perf_counter() - started) * 1000
+                if pipeline.errors:
+                    skipped[f"update_cycle.{count}"] = f"取得エラー {len(pipeline.errors)}件"
+        finally:
+            pipeline.close()
+
+    transport = HttpTransport(pool_maxsize=1)
+    try:
+        news_names = sorted(load_fixtures("news"))
+        url = server.url(f"/news/{news_names[-1]}")
+        for phase in ("cold", "warm"):
+            started = time.perf_counter()
+            fetch_news_headlines(transport, url)
+            results[f"news_refresh.{phase}_ms"] = (time.perf_counter() - started) * 1000
+    finally:
+        transport.close()
+
+
+# 状況の後ろ(</body> の前)に HTML を足したページ
+def pad_page(body):
+    index = body.rfind(b"</body>")
+    if index < 0:
+        return body + LARGE_PAGE_PADDING
+    return body[:index] + LARGE_PAGE_PADDING + body[index:]
+
+
+# 路線ページ1件の取得 + 解析(全部受け取る場合 / 少しずつ読む場合)
+def bench_stream_fetch(results, skipped, server, repeat):
+    try:
+        import requests # noqa: F401
+    except ImportError:
+        skipped["stream_fetch"] = "requests が無いため省略"
+        return
+    from traffic_info.parsers import StatusExtractor
+    from traffic_info.transport import HttpTransport
+
+    urls = [server.url(f"/diainfo_large/{name}") for name in sorted(load_fixtures("diainfo"))]
+    variants = {
+        "buffered": lambda transport, url: extract_train_status(transport.get(url, timeout=10).text),
+        "streamed": lambda transport, url: transport.get_extracted(url, StatusExtractor, timeout=10).page.parsed,
+    }
+    for label, fetch in variants.items():
+        transport = HttpTransport(pool_maxsize=1)
+        try:
+            transport.session # 接続の準備(requests の import)は計測に含めない
+            transport.begin_cycle()
+            peaks = []
+            for url in urls:
+                transport._cache.clear()
+                tracemalloc.start()
+                try:
+                    fetch(transport, url)
+                    peaks.append(tracemalloc.get_traced_memory()[1] / 1024)
+                finally:
+                    tracemalloc.stop()
+            stats = transport.cycle_stats()
+            results[f"stream_fetch.{label}.bytes_per_page"] = stats["bytes_received"] // len(urls)
+            results[f"stream_fetch.{label}.peak_kib"] = max(peaks)
+            samples = []
+            for url in urls:
+                def fetch_once(url=url):
+                    transport._cache.clear()
+                    fetch(transport, url)
+                samples.append(median_ms(fetch_once, repeat))
+            results[f"stream_fetch.{label}.median_ms"] = statistics.median(samples)
+        finally:
+            transport.close()
+
+
+# --- ↓↓↓ スクロール1ティック ---
+# Tk Canvas の代わり(呼び出しだけ受け付ける)
+class StubCanvas:
+    def coords(self, item_id, x, y):
+        pass
+
+    def move(self, tag, dx, dy):
+        pass
+
+    def create_text(self, *args, **kwargs):
+        return 1
+
+    def delete(self, *args):
+        pass
+
+
+# board._advance_tickers と同じ処理(スクロール中のタスクを dt 秒分進める)
+def advance_all(tasks, canvas_width):
+    for task in tasks:
+        if task.active:
+            task.advance(DT, canvas_width)
+
+
+# 1ティックあたりの時間(マイクロ秒)
+def tick_us(tasks, ticks):
+    advance_all(tasks, CANVAS_WIDTH) # ウォームアップ
+    started = time.perf_counter()
+    for _ in range(ticks):
+        advance_all(tasks, CANVAS_WIDTH)
+    return (time.perf_counter() - started) * 1e6 / ticks
+
+
+def bench_ticker_stub(results, ticks):
+    for count in TICKER_COUNTS:
+        canvas = StubCanvas()
+        tasks = [ScrollTask(canvas, i + 1, "text", 1800, CANVAS_WIDTH - i * 37 % 1800, 30, True, True, None, 40) for i in range(count)]
+        tasks.append(TickerChain(canvas, "news", ["見出し" * 10] * 8, 20, None, None, lambda font, text: 600, "black", 25))
+        results[f"ticker_stub.{count}.tick_us"] = tick_us(tasks, max(50, ticks * 5 // count))
+
+
+# 仮想ディスプレイ( Xvfb )を起動する。ディスプレイがある場合・起動できない場合は None
+def start_virtual_display():
+    if os.environ.get("DISPLAY") or sys.platform in ("win32", "darwin"):
+        return None
+    xvfb = shutil.which("Xvfb")
+    if xvfb is None:
+        return None
+    for number in range(99, 120):
+        if os.path.exists(f"/tmp/.X{number}-lock"):
+            continue
+        process = subprocess.Popen(
+            [xvfb, f":{number}", "-screen", "0", "1300x750x24", "-nolisten", "tcp"],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        time.sleep(0.5)
+        if process.poll() is None:
+            os.environ["DISPLAY"] = f":{number}"
+            return process
+    return None
+
+
+# 実際の Tk Canvas でのスクロール(ティッカー毎に Canvas を1つ)
+def bench_ticker_tk(results, skipped, ticks):
+    try:
+        import tkinter
+        import tkinter.font
+    except ImportError:
+        skipped["ticker_tk"] = "tkinter が無いため省略"
+        return
+    display = start_virtual_display()
+    try:
+        try:
+            root = tkinter.Tk()
+        except tkinter.TclError as e:
+            skipped["ticker_tk"] = f"ディスプレイが無いため省略 (Xvfb も見つかりません)：{e}"
+            return
+        root.geometry("1300x750")
+        font = tkinter.font.Font(root, family="MS Gothic", size=20)
+        try:
+            for count in TICKER_COUNTS:
+                frame = tkinter.Frame(root)
+                frame.pack()
+                tasks = []
+                started = time.perf_counter()
+                for i in range(count):
+                    canvas = tkinter.Canvas(frame, width=CANVAS_WIDTH, height=40, highlightthickness=0)
+                    if i < 20: # 表示されるのは一部(残りは作るだけ)
+                        canvas.pack()
+                    text = f"路線{i} 運転見合わせ 信号設備点検のため一部列車に遅れが出ています" * 2
+                    width = font.measure(text)
+                    item_id = canvas.create_text(CANVAS_WIDTH + width / 2, 20, text=text, font=font, anchor="center")
+                    tasks.append(ScrollTask(canvas, item_id, text, width, CANVAS_WIDTH + width / 2, 20, True, True, font, 40))
+                root.update()
+                results[f"ticker_tk.{count}.start_ms"] = (time.perf_counter() - started) * 1000
+                samples = []
+                for _ in range(max(20, ticks * 5 // count // 10)):
+                    tick_started = time.perf_counter()
+                    advance_all(tasks, CANVAS_WIDTH)
+                    root.update_idletasks() # 再描画まで含める
+                    samples.append((time.perf_counter() - tick_started) * 1e6)
+                results[f"ticker_tk.{count}.tick_us"] = statistics.median(samples)
+                results[f"ticker_tk.{count}.tick_p99_us"] = sorted(samples)[int(len(samples) * 0.99)]
+                frame.destroy()
+        finally:
+            root.destroy()
+    finally:
+        if display is not None:
+            display.terminate()
+# --- ↑↑↑ ここまで ---
+
+
+# 実行環境の情報
+def environment():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True, timeout=10
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+# 以前の結果と比べて表示する。遅くなった項目の数を返す(時間の項目のみ: 名前が _ms / _us で終わるもの)
+def compare(base, results):
+    regressions = 0
+    print(f"\n比較: {base['environment'].get('commit')} → {environment()['commit']}")
+    for key, value in results.items():
+        old = base["results"].get(key)
+        if old is None or not key.endswith(("_ms", "_us")) or not old:
+            continue
+        ratio = value / old
+        mark = ""
+        if ratio > 1 + REGRESSION_THRESHOLD:
+            mark = "  ← 遅くなりました"
+            regressions += 1
+        elif ratio < 1 - REGRESSION_THRESHOLD:
+            mark = "  (速くなりました)"
+        print(f"  {key:<36}{old:>12.3f}{value:>12.3f}{ratio:>8.2f}x{mark}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="処理時間のベンチマーク一式")
+    parser.add_argument("--repeat", type=int, default=20, help="解析の繰り返し回数")
+    parser.add_argument("--ticks", type=int, default=2000, help="スクロールのティック数")
+    parser.add_argument("--lines", type=int, nargs="+", default=[10, 50], help="更新1回分の路線数")
+    parser.add_argument("--workers", type=int, default=4, help="同時取得数")
+    parser.add_argument("--json", metavar="FILE", help="結果を JSON で保存する")
+    parser.add_argument("--compare", metavar="FILE", help="以前の結果( JSON )と比較する")
+    args = parser.parse_args()
+
+    results = {}
+    skipped = {}
+    bench_status_parse(results, args.repeat)
+    bench_news_parse(results, args.repeat)
+    pages = {f"/diainfo/{name}": body for name, body in load_fixtures("diainfo").items()}
+    pages.update({f"/diainfo_large/{name}": pad_page(body) for name, body in load_fixtures("diainfo").items()})
+    pages.update({f"/news/{name}": body for name, body in load_fixtures("news").items()})
+    server = FixtureServer(pages)
+    try:
+        bench_update_cycle(results, skipped, server, args.lines, args.workers)
+        bench_stream_fetch(results, skipped, server, args.repeat)
+    finally:
+        server.close()
+    bench_ticker_stub(results, args.ticks)
+    bench_ticker_tk(results, skipped, args.ticks)
+
+    for key, value in results.items():
+        print(f"{key:<36}{value:>12.3f}" if isinstance(value, float) else f"{key:<36}{value:>12}")
+    for key, reason in skipped.items():
+        print(f"{key:<36}  省略: {reason}")
+    report = {"environment": environment(), "results": results, "skipped": skipped}
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=1)
+    regressions = 0
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(json.load(f), results)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""
+スクロール処理(1ティック)のマイクロベンチマーク
+
+従来の 12要素タプルを毎回作り直す方式 と ScrollTask をその場で更新する方式 を、
+ティッカー数 5 / 50 / 500 で比較する(1ティックあたりの時間・メモリ確保量・winfo_width 呼び出し回数)
+Canvas は Tk を使わないスタブ(coords / winfo_width の呼び出し回数だけ数える)
+
+実行例: python bench/bench_ticker_step.py [--ticks 2000]
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR)) # traffic_info を import するため
+
+from traffic_info.ticker import ScrollTask
+
+CANVAS_WIDTH = 1000
+TEXT_WIDTH = 1800 # スクロールが必要な長さ
+DT = 1 / 30 # 30fps
+
+
+# Tk Canvas の代わり
+class StubCanvas:
+    def __init__(self):
+        self.coords_calls = 0
+        self.winfo_calls = 0
+
+    def coords(self, item_id, x, y):
+        self.coords_calls += 1
+
+    def winfo_width(self):
+        self.winfo_calls += 1 # 実機では Tcl への問い合わせ
+        return CANVAS_WIDTH
+
+
+# --- ↓↓↓ 従来方式(タプルを毎回作り直す) ---
+def legacy_tasks(canvas, count):
+    return {
+        i: (canvas, i + 1, "text", None, TEXT_WIDTH, CANVAS_WIDTH - i * 37 % TEXT_WIDTH, 30, True, True, None, 2, 50)
+        for i in range(count)
+    }
+
+
+def legacy_tick(tasks):
+    for task_key in list(tasks.keys()):
+        task_data = tasks[task_key]
+        canvas_widget, text_item_id, _, after_id, text_width_pixels, current_x_pos, initial_y_pos, scroll_active, is_trouble_scroll, _, scroll_speed_px, scroll_interval_ms = task_data
+        if not scroll_active:
+            continue
+        new_x_pos = current_x_pos - scroll_speed_px
+        if new_x_pos + (text_width_pixels / 2) < 0:
+            new_x_pos = canvas_widget.winfo_width() + (text_width_pixels / 2)
+        canvas_widget.coords(text_item_id, new_x_pos, initial_y_pos)
+        tasks[task_key] = (
+            canvas_widget, text_item_id, task_data[2], after_id, text_width_pixels, new_x_pos,
+            initial_y_pos, True, is_trouble_scroll, task_data[9], scroll_speed_px, scroll_interval_ms,
+        )
+# --- ↑↑↑ ここまで ---
+
+
+# --- ↓↓↓ ScrollTask 方式(その場で更新, 幅は <Configure> で保持した値) ---
+def slotted_tasks(canvas, count):
+    return {
+        i: ScrollTask(canvas, i + 1, "text", TEXT_WIDTH, CANVAS_WIDTH - i * 37 % TEXT_WIDTH, 30, True, True, None, 60)
+        for i in range(count)
+    }
+
+
+def slotted_tick(tasks, canvas_geometry):
+    for task in tasks.values():
+        if not task.active:
+            continue
+        task.advance(DT, canvas_geometry[task.canvas][0])
+# --- ↑↑↑ ここまで ---
+
+
+# ticks 回実行して 1ティックの時間(µs) を返す
+def measure(tick, ticks):
+    tick() # ウォームアップ
+    start = time.perf_counter()
+    for _ in range(ticks):
+        tick()
+    return (time.perf_counter() - start) * 1e6 / ticks
+
+
+# tracemalloc のピーク(1ティック分の一時確保量)
+def peak_per_tick(tick):
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    base, _ = tracemalloc.get_traced_memory()
+    tick()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak - base
+
+
+def main():
+    parser = argparse.ArgumentParser(description="スクロール処理のマイクロベンチマーク")
+    parser.add_argument("--ticks", type=int, default=2000, help="計測するティック数")
+    args = parser.parse_args()
+
+    print(f"{'tickers':>8}{'mode':>10}{'us/tick':>12}{'peak B/tick':>14}{'winfo calls':>14}")
+    for count in (5, 50, 500):
+        ticks = max(50, args.ticks * 5 // count)
+
+        legacy_canvas = StubCanvas()
+        legacy = legacy_tasks(legacy_canvas, count)
+        legacy_us = measure(lambda: legacy_tick(legacy), ticks)
+        legacy_peak = peak_per_tick(lambda: legacy_tick(legacy))
+
+        slotted_canvas = StubCanvas()
+        geometry = {slotted_canvas: (CANVAS_WIDTH, 60)}
+        slotted = slotted_tasks(slotted_canvas, count)
+        slotted_us = measure(lambda: slotted_tick(slotted, geometry), ticks)
+        slotted_peak = peak_per_tick(lambda: slotted_tick(slotted, geometry))
+
+        print(f"{count:>8}{'tuple':>10}{legacy_us:>12.1f}{legacy_peak:>14}{legacy_canvas.winfo_calls:>14}")
+        print(f"{count:>8}{'slots':>10}{slotted_us:>12.1f}{slotted_peak:>14}{slotted_canvas.winfo_calls:>14}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,17 @@
+"""
+列車運行情報(データ引用：Yahoo路線情報)
+
+UI 非依存の部分 (路線レジストリ・取得・解析・表示状態) と、
+その利用者の1つである Tk の画面 (traffic_info.board) からなる。
+import しただけでは画面は作られない(画面の起動は traffic_info.board.main)
+
+    registry  対象路線の設定 (LineConfig)
+    fetcher   バックグラウンド取得エンジン
+    listing   エリア別の一覧ページからまとめて取得 (AreaStatusFetch)
+    transport 共有 HTTP セッション(条件付き GET)
+    parsers   路線ページの解析
+    status    路線毎の表示状態 (LineState)
+    pipeline  画面を持たない取得処理 (StatusPipeline)
+"""
+
+from .startup import STARTUP # 起動時間の計測はパッケージの import から
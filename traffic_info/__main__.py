@@ -0,0 +1,83 @@
+"""
+python -m traffic_info で起動する
+
+    python -m traffic_info              画面を起動
+    python -m traffic_info --headless   画面を使わずに1回だけ取得して表示
+    python -m traffic_info --lines FILE 路線設定ファイルを指定(既定は lines.json)
+    python -m traffic_info --history    保存した履歴(トラブル時間・状況の変化)を表示
+    python -m traffic_info --serve [HOST:PORT]  画面を使わずに取得し, HTTP (JSON / SSE) で配信
+    python -m traffic_info --serve --export FILE  配信内容をファイルにも書き出す
+    python -m traffic_info --upstream URL|FILE  自分では取得せず, 配信サーバー(またはファイル)の変更を表示
+    python -m traffic_info --log-level DEBUG    ログの詳しさを指定(既定は INFO)
+    python -m traffic_info --memory-trace       tracemalloc でメモリを確保した箇所を記録([G]キーで表示)
+"""
+
+import argparse
+import sys
+
+
+# 画面を使わずに1回だけ取得して標準出力に表示
+def run_headless(config_path=None):
+    from .pipeline import StatusPipeline
+    from .registry import load_lines
+
+    pipeline = StatusPipeline(lines=load_lines(config_path) if config_path else None)
+    try:
+        states = pipeline.refresh()
+        for line in pipeline.lines:
+            state = states.get(line.name)
+            if state is not None:
+                stale = "\t(前回の情報)" if state.stale else ""
+                print(f"{line.name}\t{state.status}\t{state.text}{stale}")
+            else:
+                print(f"{line.name}\terror\t{pipeline.errors.get(line.name)}")
+    finally:
+        pipeline.close()
+    return 0 if not pipeline.errors else 1
+
+
+# 保存した履歴を表示
+def show_history(days):
+    from .history import DEFAULT_HISTORY_DIR, StatusHistory
+
+    history = StatusHistory(DEFAULT_HISTORY_DIR).load()
+    print(history.summary(days=days))
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="traffic_info", description="列車運行情報")
+    parser.add_argument("--headless", action="store_true", help="画面を使わずに1回だけ取得して表示する")
+    parser.add_argument("--lines", metavar="FILE", help="路線設定ファイル( JSON / TOML )")
+    parser.add_argument("--history", nargs="?", const=7, type=int, metavar="DAYS", help="保存した履歴を表示する(既定は7日分)")
+    parser.add_argument("--serve", nargs="?", const="", metavar="HOST:PORT", help="運行状況の配信サーバーを起動する(既定は 127.0.0.1:8765)")
+    parser.add_argument("--export", metavar="FILE", help="--serve の配信内容を書き出すファイル")
+    parser.add_argument("--upstream", metavar="URL|FILE", help="配信サーバーの URL (例 http://127.0.0.1:8765) または --export のファイルから受け取って表示する")
+    parser.add_argument("--log-level", default="INFO", choices=("DEBUG", "INFO", "WARNING", "ERROR"), help="コンソールに出すログの詳しさ")
+    parser.add_argument("--memory-trace", action="store_true", help="メモリを確保した箇所を記録する(調査用, 遅くなる)")
+    args = parser.parse_args(argv)
+    from .logs import setup_logging
+
+    setup_logging(args.log_level)
+    if args.serve is not None:
+        from .registry import load_lines
+        from .server import DEFAULT_HOST, DEFAULT_PORT, serve
+
+        host, _, port = args.serve.rpartition(":") if ":" in args.serve else (args.serve, "", "")
+        return serve(
+                    host or DEFAULT_HOST,
+                    int(port) if port else DEFAULT_PORT,
+                    load_lines(args.lines) if args.lines else None,
+                    export_path=args.export
+                    )
+    if args.history is not None:
+        return show_history(args.history)
+    if args.headless:
+        return run_headless(args.lines)
+    from .board import main as board_main
+    board_main(config_path=args.lines, upstream=args.upstream, memory_trace=args.memory_trace)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,1626 @@
+"""
+列車運行情報(データ引用：Yahoo路線情報) の画面 (Tk)
+
+[ 参考サイト ]  
+Quita:  
+https://qiita.com/y_sayama/items/f73d1f50ed4041d14c16  
+Yahoo路線情報:  
+https://transit.yahoo.co.jp/
+
+取得・解析・状態の処理は traffic_info の他のモジュール (UI 非依存) にあり、
+この画面はその利用者の1つ。起動は main() から
+
+"""
+
+import tkinter.ttk as ttk
+import tkinter.font
+import os
+import time
+import sys
+import threading
+import logging
+from tkinter import *
+from tkinter import messagebox
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+# requests / bs4 / PIL / webbrowser は起動を速くするため使う時に import する
+from .fetcher import FetchEngine, CycleDone
+from .transport import HttpTransport, is_network_error
+from .listing import AreaStatusFetch
+from .icons import load_icon
+from .logs import dump_recent_events, get_logger, setup_logging, shutdown_logging
+from .memory import MemoryGovernor, widget_census
+from .startup import STARTUP
+from .resilience import CircuitOpenError, ResilientFetch
+from .status import build_line_state, diff_line_state, mark_stale
+from .ticker import FrameClock, ScrollTask, TickerChain
+from .layout import LayoutCache
+from .metrics import DEFAULT_METRICS_HOST, DEFAULT_METRICS_PORT, METRICS, MetricsServer
+from .news import NEWS_SELECTOR_LEARNER, NEWS_URL, fetch_news_headlines
+from .scheduler import PollScheduler
+from .snapshot import SnapshotStore
+from .subscriber import open_feed
+from .history import DEFAULT_HISTORY_DIR, StatusHistory
+from .registry import DEFAULT_CONFIG_PATH, DEFAULT_STYLE, RegistryWatcher, default_lines, diff_lines, load_lines
+
+# img/ フォルダがあるディレクトリ(このパッケージの1つ上)
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LOG_DUMP_DIR = os.path.join(APP_DIR, "cache", "logs") # Lキーで直近のログを書き出す場所
+
+fetch_log = get_logger("fetch")
+news_log = get_logger("news")
+scheduler_log = get_logger("scheduler")
+ui_log = get_logger("ui")
+
+# MainFrame クラス
+class MainFrame(ttk.Frame):
+
+    # コンストラクタ
+    # lines: LineConfig のリスト(省略時は設定ファイル config_path を読み込み、実行中の変更も反映する)
+    # upstream: 配信サーバーの URL または共有ファイル。指定すると自分では取得せず、配信された変更だけを反映する
+    # memory_trace: tracemalloc で確保した箇所を記録し、メモリの確認時に増えた箇所を表示する(調査用)
+    def __init__(self, master=None, lines=None, config_path=None, upstream=None, memory_trace=False, **kwargs):
+        # 親クラスのコンストラクタを呼び出す
+        super().__init__(master, **kwargs)
+        # --- ↓↓↓ 路線設定ファイル(無ければ traffic_info/registry.py の設定) ---
+        self.REGISTRY_POLL_INTERVAL_MS = 2000 # 設定ファイルの変更確認間隔(ミリ秒)
+        self.registry_watcher = None
+        if lines is None:
+            config_path = config_path or DEFAULT_CONFIG_PATH
+            try:
+                lines = load_lines(config_path)
+            except Exception as e: # 書式の誤りなど
+                ui_log.error("路線設定ファイルの読み込みに失敗しました(%s)：%s", config_path, e)
+                lines = default_lines()
+            self.registry_watcher = RegistryWatcher(config_path)
+        self.lines = list(lines) # 運行情報対象路線
+        # --- ↑↑↑ ここまで ---
+        self.is_fullscreen_active = False # フルスクリーン状態
+        self.initial_geometry = "1300x750" # 初期ウィンドウサイズ
+        self.running = True # メインループの実行状態フラグ
+        self.scrolling_tasks = {} # タスクキー -> ScrollTask
+        self.canvas_geometry = {} # Canvas -> (幅, 高さ) ( <Configure> で更新)
+        self.layout_cache = LayoutCache(maxsize=1024) # 文字幅・折り返し・フォント情報のキャッシュ
+        self.WRAP_WIDTH = 10 # 折り返し幅
+        self.MAX_LINES = 2 # 最大表示行数
+        self.SCROLL_VELOCITY = 40 # スクロール速度(ピクセル/秒)
+        self.NEWS_SCROLL_VELOCITY = 25 # ニューススクロール速度(ピクセル/秒)
+        self.TARGET_FPS = 30 # スクロールの目標フレームレート
+        # --- ↓↓↓ ページ表示(路線が多い場合) ---
+        self.MAX_ROWS_PER_PAGE = 5 # 1画面に表示する路線数(ウィジェットはこの数だけ作る)
+        self.PAGE_ROTATE_INTERVAL_MS = 15 * 1000 # ページ切り替え間隔(ミリ秒)
+        self.SORT_TROUBLE_FIRST = True # トラブル中の路線を先頭のページに表示する
+        self.page_index = 0 # 表示中のページ
+        self.slot_lines = [] # 表示行 -> 表示中の路線名(空き行は None)
+        self.slot_rendered = {} # 表示行 -> 反映済みの (LineConfig, LineState)
+        # --- ↑↑↑ ここまで ---
+        self.FETCH_MAX_WORKERS = 4 # 運行情報の同時取得数の上限
+        self.FETCH_DRAIN_INTERVAL_MS = 50 # 取得結果キューの確認間隔(ミリ秒単位)
+        self.FETCH_TIMEOUT = (3.05, 10.0) # 1回の通信のタイムアウト (接続, 読み込み) 秒
+        self.FETCH_RETRIES = 2 # 接続エラー・5xx の再試行回数
+        self.FETCH_JOB_TIMEOUT_SEC = 35 # 1路線の持ち時間(再試行を含む)。過ぎたら前回の情報のまま
+        # 共有 HTTP セッション(keep-alive・圧縮・条件付き GET)
+        self.transport = HttpTransport(pool_maxsize=self.FETCH_MAX_WORKERS)
+        # エリア別の一覧ページは LISTING_TTL_SEC 秒に1回だけ取得し, 一覧で分かる路線は路線のページを取得しない
+        self.LISTING_TTL_SEC = 60 # 一覧ページを使い回す秒数(トラブル中の路線の取得間隔と同じ)
+        self.area_fetch = AreaStatusFetch(self.transport, self.lines, ttl=self.LISTING_TTL_SEC)
+        # タイムアウト・再試行・ホスト毎のサーキットブレーカー付きの取得
+        self.resilient_fetch = ResilientFetch(
+                                            self.area_fetch,
+                                            timeout=self.FETCH_TIMEOUT,
+                                            retries=self.FETCH_RETRIES
+                                            )
+        self.fetch_engine = FetchEngine(
+                                        fetch_func=self.resilient_fetch,
+                                        max_workers=self.FETCH_MAX_WORKERS,
+                                        job_timeout=self.FETCH_JOB_TIMEOUT_SEC
+                                        ) # バックグラウンド取得エンジン
+        self.line_fetched_at = {} # 路線名 -> 最後に取得できた時刻(古い情報の表示用)
+        # --- ↓↓↓ 路線毎の取得間隔(トラブル中は短く, 変化の無い路線は長く) ---
+        self.REQUEST_BUDGET_PER_MINUTE = 30 # 1分あたりのリクエスト数の上限(再試行・一覧ページ・ニュースを含む)
+        self.SCHEDULER_MAX_SLEEP_MS = 30 * 1000 # 取得時刻の確認間隔の上限(ミリ秒)
+        self.poll_scheduler = PollScheduler(
+                                            [line.name for line in self.lines],
+                                            budget_per_minute=self.REQUEST_BUDGET_PER_MINUTE
+                                            )
+        self.transport.request_hooks.append(self.poll_scheduler.record_sent) # 実際に送ったリクエストを数える
+        # --- ↑↑↑ ここまで ---
+        self.fetch_drain_after_id = None # キュー確認の after_id
+        self.cycle_urls = {} # 取得中のサイクルの 路線名 -> URL
+        self.pending_fetch_jobs = {} # 取得中に追加された路線(サイクル終了後に取得)
+        self.line_states = {} # 路線名 -> 表示状態( LineState )
+        # --- ↓↓↓ 購読モード(配信サーバー・共有ファイルから受け取る) ---
+        self.FEED_DRAIN_INTERVAL_MS = 200 # 受信キューの確認間隔(ミリ秒)
+        self.feed = open_feed(upstream) if upstream else None
+        self.feed_lines = {} # 路線名 -> 配信された最新の状態(辞書)
+        # --- ↑↑↑ ここまで ---
+        # 全ティッカー共通のアニメーションクロック
+        self.frame_clock = FrameClock(self, self._advance_tickers, fps=self.TARGET_FPS)
+        # --- ↓↓↓ 計測( http://127.0.0.1:8766/metrics と定期的な集計の表示) ---
+        self.METRICS_PORT = DEFAULT_METRICS_PORT # None で /metrics を出さない
+        self.METRICS_PROBE_INTERVAL_MS = 1000 # after() の遅れ・ティッカー数の確認間隔(ミリ秒)
+        self.METRICS_SUMMARY_INTERVAL_SEC = 5 * 60 # 集計を表示する間隔(秒)
+        self.metrics_probe_due = None # 次の確認の予定時刻
+        self.metrics_summary_at = time.monotonic() + self.METRICS_SUMMARY_INTERVAL_SEC
+        self.metrics_server = None
+        if self.METRICS_PORT is not None:
+            try:
+                self.metrics_server = MetricsServer(DEFAULT_METRICS_HOST, self.METRICS_PORT).start()
+            except OSError as e: # 同じポートを使う画面が起動済みなど
+                ui_log.warning("計測用のポートを開けませんでした(%s)：%s", self.METRICS_PORT, e)
+        # --- ↑↑↑ ここまで ---
+        # --- ↓↓↓ メモリ管理(定期的な gc.collect() の代わりに, 取得していない時に若い世代だけ回収) ---
+        self.MEMORY_CHECK_INTERVAL_MS = 60 * 1000 # RSS・Canvas アイテム数・after() の予約数の確認間隔(ミリ秒)
+        self.MEMORY_BUDGET = {
+            "rss_mb": 400, # プロセスのメモリ使用量
+            "canvas_items": 500, # 全 Canvas のアイテム数の合計
+            "after_callbacks": 40, # 予約中の after() の数
+            "images": 64, # Tk の画像の数
+        } # 超えたら警告(ログ)
+        self.memory = MemoryGovernor(self.MEMORY_BUDGET, trace=memory_trace)
+        # --- ↑↑↑ ここまで ---
+        
+        # img/ フォルダがあるディレクトリの絶対パス
+        self.scr_path = APP_DIR
+        # 路線情報アイコンパス(ディクショナリ)
+        self.icon_dict = {
+            "normal": self.scr_path + "/img/train.png",
+            "trouble": self.scr_path + "/img/warning.png",
+            "shinkansen": self.scr_path + "/img/jnr_0.png"
+        }
+        # リサイズ済みアイコンの保存先(元画像が変わると作り直す)
+        self.icon_cache_dir = os.path.join(self.scr_path, "cache", "icons")
+        # 前回終了時までの運行状況とニュース見出し(起動直後に通信より先に表示する)
+        self.snapshot_store = SnapshotStore(os.path.join(self.scr_path, "cache", "snapshot.json")).load()
+        # 運行状況の履歴(障害の開始・終了, 日毎のトラブル時間)
+        self.history = StatusHistory(DEFAULT_HISTORY_DIR).load()
+        
+        # ニュース関連設定
+        self.news_scroll_task_key = "news_headlines_scroll"
+        self.news_font_size = 24
+        self.news_font = "MS Gothic", self.news_font_size
+        self.news_font_object = tkinter.font.Font(font=self.news_font)
+        # ニュース更新間隔(ミリ秒) (15分に1回更新)
+        self.NEWS_UPDATE_INTERVAL_MS = 15 * 60 * 1000
+        # ニュースURL: Yahoo国内ニュース
+        self.NEWS_URL = NEWS_URL
+        # ニュースの取得・解析は別スレッドで行い、結果は after() で確認して反映する
+        self.news_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="traffic_news")
+        self.news_future = None # 取得中の Future
+        self.NEWS_CHECK_INTERVAL_MS = 200 # 取得結果の確認間隔(ミリ秒)
+
+        # 路線情報用アイコンを読み込み(リサイズ済みのキャッシュを優先)
+        for key, value in self.icon_dict.items():
+            icon = load_icon(self, value, self.icon_cache_dir)
+            self.icon_dict[key] = icon if icon is not None else "" # 読み込めない場合は画像無し( None だと configure() で前の画像が残る)
+        
+        # --- ↓↓↓ Windows の場合のみディスプレイスリープ防止設定 ---
+        self._initialize_styles_and_urls() # スタイルとURLを初期化
+        if sys.platform == "win32":
+            try:
+                self.ctypes = __import__("ctypes") # Windows の場合 ctypes をインポート
+                self.ES_CONTINUOUS = 0x80000000 # Windows のフルスクリーン定数
+                self.ES_DISPLAY_REQUIRED = 0x00000002 # ディスプレイを常にオンにする定数
+                self.ctypes.windll.kernel32.SetThreadExecutionState(
+                    self.ES_CONTINUOUS | self.ES_DISPLAY_REQUIRED
+                ) # ディスプレイを常にオンにする
+            except Exception as e:
+                ui_log.warning("ディスプレイのスリープ防止設定に失敗しました：%s", e)
+        # --- ↑↑↑ ここまで ---
+        
+        # create_widgets を呼び出す
+        self.create_widgets()
+        # 保存しておいた運行状況を表示してから、最初のページに路線を割り当てる
+        self._restore_snapshot()
+        self._show_page(0)
+        
+    # 路線名を指定幅で折り返し、最大指定行数で返す
+    def _format_routename_for_display(self, routename):
+        if not routename:
+            return ""
+        # routename が None の場合や空文字列の場合の処理
+        wrapped_lines = self.layout_cache.wrap(str(routename), self.WRAP_WIDTH, self.MAX_LINES)
+        return "\n".join(wrapped_lines) # 最大行数まで折り返し
+    
+    # 手動で運行情報を更新
+    def trigger_manual_update(self):
+        scheduler_log.info("手動で運行情報を更新します")
+        if self.feed is not None: # 購読モードは全体を受け取り直す
+            self.feed.resync()
+            return
+        if self.running: # 実行中のみ更新
+            try:
+                self.update_train_info_internal() # 運行情報を更新
+            except Exception as e:
+                scheduler_log.exception("手動更新中にエラーが発生しました：%s", e)
+
+    # ウィジェットを作成
+    def create_widgets(self):
+        # フレームを作成
+        self.header_frame = Frame(self, bg="AntiqueWhite2", bd=0, relief="flat")
+
+        # フレームを配置
+        self.header_frame.grid(row=0, column=0, columnspan=3, sticky="news")
+        
+        # header_frame (内部 grid 設定)
+        self.header_frame.columnconfigure(0, weight=0) # タイトル列(コンテンツ幅)
+        self.header_frame.columnconfigure(1, weight=0) # 日時列(コンテンツ幅)
+        self.header_frame.columnconfigure(2, weight=1) # スペーサー列(伸縮)
+        self.header_frame.columnconfigure(3, weight=0) # 更新ボタン列(コンテンツ幅)
+        
+        #タイトルの表示
+        self.title_lbl = Label(self.header_frame,
+                             text=" 鉄道路線運行情報 ", 
+                             bg="aqua", # 背景色 
+                             font=("", 50) # フォント
+                             )
+
+        # タイトルの配置
+        self.title_lbl.grid(row=0, # 行
+                            column=0, # 列
+                            sticky="w", # 位置
+                            # 時刻ラベルとの位置調整用
+                            padx=(40, 50), # 左パディング、右パディング
+                            pady=15
+                            )
+        
+        # 現在時刻とカスタムテキスト用のコンテナフレーム
+        datetime_area_frame = Frame(self.header_frame, bg="AntiqueWhite2") # 背景色( header_frame と同色 )
+        # datetime_frame と同じ grid 配置で設定
+        datetime_area_frame.grid(row=0, column=1, sticky="w", padx=(0, 20), pady=15)        
+        # 現在時刻を表示するラベル
+        self.datetime_label = Label(datetime_area_frame, text="0",bg="AntiqueWhite2", font=("", 30))
+        self.datetime_label.pack(side=TOP, anchor="w")
+        self.update_datetime()
+        # 時刻の下に表示するテキストラベル
+        self.custom_masseage_label = Label(
+                                            datetime_area_frame,
+                                            text="情報提供：Yahoo路線情報", # 任意のテキスト
+                                            bg="AntiqueWhite2", # 背景色
+                                            font=("", 20), # フォント
+                                            fg="midnightblue" # 文字色
+                                        )
+        self.custom_masseage_label.pack(side=TOP, anchor="e", pady=(5,0)) # datetime_label の下に配置
+        # ページ番号(路線が1ページに収まる場合は空欄)
+        self.page_label = Label(datetime_area_frame, text="", bg="AntiqueWhite2", font=("", 18), fg="midnightblue")
+        self.page_label.pack(side=TOP, anchor="e")
+        
+        # ボタン用コンテナフレームを header_frame に作成
+        buttons_container = Frame(self.header_frame, bg=self.header_frame.cget("bg"))
+        # stycky="ne" でコンテナをセル(右上)に配置
+        # padx で 左右, pady で 上下 を調整(余白)
+        buttons_container.grid(row=0, column=3, sticky="ne", padx=(30, 30), pady=5)
+        
+        # --- ↓↓↓ タッチパネル対応ボタンを作成(PCでも使用可) ---
+        # 構造はほぼ同一
+        # 手動更新ボタン
+        self.update_button = Button(
+                                    buttons_container, 
+                                    text="手動更新", 
+                                    bg=self.header_frame.cget("bg"), # ボタンの背景色
+                                    fg="navy", # 文字色
+                                    bd=2, # 境界線
+                                    font=("", 10), # フォント
+                                    relief="raised", # 3D効果
+                                    activebackground="lightgray", # ホバー時の背景色
+                                    highlightthickness=0, # ハイライト時の境界線
+                                    command=self.trigger_manual_update, # 既存のメソッドを呼び出す
+                                    padx=3,
+                                    pady=3
+                                    )
+
+        # pack でボタンを配置, fill=X は横幅を コンテナの幅に合わせ, pady で上下のボタンとの間を調整
+        self.update_button.pack(side=TOP, fill=X, pady=(0,2)) # 下に配置, 上にスペース
+        
+        # フルスクリーンボタン
+        self.fullscreen_button = Button(
+                                        buttons_container,
+                                        text="フルスクリーン", 
+                                        bg=self.header_frame.cget("bg"),
+                                        bd=2,
+                                        font=("", 10),
+                                        relief="raised", 
+                                        activebackground="lightgray",
+                                        highlightthickness=0,
+                                        command=self.toggle_fullscreen,
+                                        padx=3,
+                                        pady=3
+                                        )
+        
+        self.fullscreen_button.pack(side=TOP, fill=X, pady=2)
+        
+        # フルスクリーン解除ボタン
+        self.restore_fullscreen_button = Button(
+                                                buttons_container,
+                                                text="フルスクリーン解除", 
+                                                bg=self.header_frame.cget("bg"),
+                                                bd=2, 
+                                                font=("", 10),
+                                                relief="raised", 
+                                                activebackground="lightgray",
+                                                highlightthickness=0,
+                                                command=self.restore_to_original_size,
+                                                padx=3,
+                                                pady=3
+                                                )
+        
+        self.restore_fullscreen_button.pack(side=TOP, fill=X, pady=2)
+        
+        # 終了ボタン
+        self.quit_button = Button(
+                                buttons_container,
+                                text="終了", 
+                                bg=self.header_frame.cget("bg"),
+                                fg="red",
+                                bd=2, 
+                                font=("", 10),
+                                relief="raised", 
+                                activebackground="lightgray",
+                                highlightthickness=0,
+                                command=self.on_close,
+                                padx=3,
+                                pady=3
+                                )
+        
+        self.quit_button.pack(side=TOP, fill=X, pady=(2,0))
+        # --- ↑↑↑ ここまで ---
+        
+        # ヘッダーの下に罫線 sticky="ew"は左右(eastwest)寄せ
+        header_separator = ttk.Separator(self, orient=HORIZONTAL)
+        header_separator.grid(row=1, column=0, columnspan=3, sticky="ew", pady=(1, 1))
+        
+        
+    # スタイル情報とURL情報を初期化, インスタンス変数として保持        
+    def _initialize_styles_and_urls(self):
+        self._index_lines()
+        
+        # 表示行(1画面分)のウィジェットだけを作成し、表示する路線はページ毎に割り当てる
+        # 路線の追加・削除で表示行の数が変わる場合は _resize_slots で増減する
+        self.wwl = [] # 路線名のリスト
+        self.wws = [] # 対象区間のリスト
+        self.wwi = [] # 運転状況用ラベル
+        self.wwt_canvas = [] # 運転状況用 Canvas
+        self.slot_separators = [] # 表示行毎の罫線
+        self.status_font = ("MS Gothic", 40)
+        self.status_font_object = tkinter.font.Font(font=self.status_font) # フォントオブジェクト
+        self.rows_per_page = 0
+        self._resize_slots(max(1, min(len(self.lines), self.MAX_ROWS_PER_PAGE)))
+                         
+        self.rowconfigure(0, weight=0) # header_frame(固定または内容に依存)
+        self.rowconfigure(1, weight=0) # ヘッダー下の罫線
+                
+        # メインフレームの列判定(路線名・アイコン・状況)
+        self.columnconfigure(0, weight=0) # 路線名列の幅を内容に合わせて伸縮
+        self.columnconfigure(1, weight=0) # アイコン列は固定がいい場合がある
+        self.columnconfigure(2, weight=1) # 運行状況
+        
+        # メインフレームにニュース表示を追加
+        add_news_display_to_mainframe(self)
+
+    # 路線レジストリ( self.lines )から路線名毎の設定を引けるようにする
+    def _index_lines(self):
+        self.line_index = {line.name: i for i, line in enumerate(self.lines)} # 路線名 -> 登録順
+        self.railway_company_urls = {line.name: line.company_url for line in self.lines if line.company_url}
+        # 路線名表示スタイル(変更は設定ファイル lines.json または traffic_info/registry.py で)
+        self.train_styles = {line.name: line.style for line in self.lines}
+
+    # 表示行1つ分のウィジェットを作成
+    def _create_slot(self, slot):
+        # 路線名用ラベル(路線名と配色は _bind_slot_line で設定)
+        label = Label(
+                    self, # self はインスタンス変数 
+                    text="", 
+                    bg=DEFAULT_STYLE["bg"],
+                    font=("", 26, "bold"), 
+                    fg=DEFAULT_STYLE["fg"]
+                    )
+        # 区間用ラベル
+        section_label = Label(
+                            self, 
+                            text="", 
+                            bg=DEFAULT_STYLE["bg"], 
+                            font=("", 22, "bold"), 
+                            fg=DEFAULT_STYLE["fg"]
+                            )
+        # イベントバインディング
+        # クリック時に表示中の路線を調べ、URL が設定されている場合のみ動作する
+        label.bind(
+                    "<ButtonPress-1>", # 左クリック 
+                    lambda e, # イベントオブジェクト
+                    lbl=label, # イベントバインドするラベル
+                    idx=slot: self._on_slot_routename_press(lbl, idx) # イベントバインドする関数
+                    ) 
+        label.bind(
+                    "<ButtonRelease-1>",
+                    lambda e,
+                    lbl=label,
+                    idx=slot: self._on_slot_routename_release(lbl, idx))
+        self.wwl.append(label) # 路線名用ラベルをリストに追加
+        self.wws.append(section_label) # 区間用ラベルをリストに追加
+
+        # 運転状況用ラベル
+        self.wwi.append(Label(self, image=self.icon_dict["normal"], bg="white"))
+
+        # 運転状況用 Canvas
+        # Canvasの高さをフォントメトリクスから計算
+        canvas_height = self.layout_cache.line_height(self.status_font_object) + 4 # fallback 高さを計算
+        canvas = Canvas(self, bg="white", height=canvas_height, highlightthickness=0)
+        # configure をバインド
+        canvas.bind("<Configure>", # キャンバスのサイズが変更されたとき
+            lambda event, # イベントオブジェクト
+            c=canvas, # イベントバインドするCanvas
+            idx=slot: self._on_canvas_configure(event, c, idx) # _on_canvas_configure を呼び出す
+        )
+        self.wwt_canvas.append(canvas) # Canvas をリストに追加
+
+        # アイコンの左右の垂直罫線( orient=VERTICAL )と、路線直下の水平罫線( orient=HORIZONTAL )
+        self.slot_separators.append((
+            ttk.Separator(self, orient=VERTICAL),
+            ttk.Separator(self, orient=VERTICAL),
+            ttk.Separator(self, orient=HORIZONTAL),
+        ))
+
+    # 表示行を grid に配置(路線情報を縦に並べる, 各路線の情報を1行に表示)
+    def _grid_slot(self, slot):
+        base_row_for_trains = 2 # 路線情報表示の開始行
+        current_display_row = base_row_for_trains + (slot * 3) 
+        # ↑↑↑ 
+        # example: current_display_row = 1 + (i * 2) #ヘッダーの下行から開始 各路線2行
+        # 各路線ブロックは、路線情報2行 + 下の罫線1行と合わせて3行占めるという考え
+        # ↑↑↑
+        
+        # 路線情報を表示 sticky="news"は上下左右(north, south, east, west)
+        self.wwl[slot].grid(row=current_display_row, column=0, sticky="news") # 路線名
+        self.wws[slot].grid(row=current_display_row + 1, column=0, sticky="news") # 路線名の下に対象区間
+        self.wwi[slot].grid(row=current_display_row, column=1, rowspan=2, sticky="news") # アイコン
+        self.wwt_canvas[slot].grid(row=current_display_row, column=2, rowspan=2, sticky="news") # 運行状況
+        left_vertical_separator, right_vertical_separator, train_separator = self.slot_separators[slot]
+        # アイコンの左に垂直罫線を表示 sticky="nsw"は上下左(north,south west)
+        left_vertical_separator.grid(row=current_display_row, column=1, sticky="nsw", rowspan=2)    
+        # アイコンの右に垂直罫線を表示
+        right_vertical_separator.grid(row=current_display_row, column=2, sticky="nsw", rowspan=2)    
+        # 各路線直下に水平方向に罫線を表示
+        train_separator.grid(row=current_display_row + 2, column=0, columnspan=3, sticky="ew", pady=(1, 1))
+        # 各路線ブロックが使用する2行に weight を設定
+        self.rowconfigure(current_display_row, weight=1) # 路線名行
+        self.rowconfigure(current_display_row + 1, weight=1) # 区間名
+        # 罫線行は常に固定( weight=0 )
+        self.rowconfigure(current_display_row + 2, weight=0) # 罫線行
+
+    # 表示行を画面から外す(ウィジェットは再利用するため破棄しない)
+    def _ungrid_slot(self, slot):
+        self.stop_scrolling(slot)
+        self.slot_rendered.pop(slot, None)
+        for widget in (self.wwl[slot], self.wws[slot], self.wwi[slot], self.wwt_canvas[slot]) + self.slot_separators[slot]:
+            widget.grid_remove()
+        current_display_row = 2 + (slot * 3)
+        self.rowconfigure(current_display_row, weight=0)
+        self.rowconfigure(current_display_row + 1, weight=0)
+
+    # 表示行の数を変更(増えた分だけ作成・配置し、減った分は外す)
+    def _resize_slots(self, count):
+        while len(self.wwl) < count:
+            self._create_slot(len(self.wwl))
+        for slot in range(self.rows_per_page, count): # 増えた行
+            self._grid_slot(slot)
+        for slot in range(count, self.rows_per_page): # 減った行
+            self._ungrid_slot(slot)
+        self.rows_per_page = count
+        self.slot_lines = (self.slot_lines + [None] * count)[:count]
+        
+    def _on_canvas_configure(self, event, canvas_widget, index):
+        # Canvasのサイズが変更されたときに呼び出される
+        # サイズを保持しておき、スクロール処理では winfo_width() を呼ばない
+        canvas_width = event.width
+        canvas_height = event.height
+        if canvas_width <= 1 or canvas_height <= 1:
+            # サイズがまだ決まっていない場合は何もしない
+            return
+        self.canvas_geometry[canvas_widget] = (canvas_width, canvas_height)
+        # スクロール中でないテキストの位置を更新
+        task = self.scrolling_tasks.get(index) # index = 路線情報の場合は数値, ニュースの場合文字列キー
+        if task and not task.active and task.text_item_id: # 静的表示の場合
+            # text_item は anchor = "center" で作成されている
+            # x座標は canvas の幅半分に設定することで中央揃えになる
+            task.x = canvas_width / 2 # 水平中央揃え
+            task.y = canvas_height / 2 # 垂直中央揃え
+            canvas_widget.coords(task.text_item_id, task.x, task.y)
+
+    # Canvas の (幅, 高さ) を返す( <Configure> で保持した値を優先)
+    def _canvas_size(self, canvas_widget):
+        size = self.canvas_geometry.get(canvas_widget)
+        if size is None:
+            # まだ <Configure> が来ていない場合のみ問い合わせる
+            canvas_widget.update_idletasks() # サイズ取得前にUIイベントを処理
+            size = (canvas_widget.winfo_width(), canvas_widget.winfo_height())
+            if size[0] > 1 and size[1] > 1:
+                self.canvas_geometry[canvas_widget] = size
+        return size
+
+    # 共通クロックから1フレーム毎に呼ばれ、全ティッカーを dt 秒分進める
+    def _advance_tickers(self, dt):
+        any_active = False
+        for task_key in list(self.scrolling_tasks.keys()):
+            if self._scroll_text_step(task_key, dt):
+                any_active = True
+        return any_active # スクロール中のものが無ければクロックを止める
+
+    # スクロール処理(スクロール中なら True を返す)
+    def _scroll_text_step(self, task_key, dt):
+        task = self.scrolling_tasks.get(task_key)
+        if task is None:
+            return False # スクロールが停止されたか、タスクが存在しない
+        if not task.active: # スクロールが不要または停止した場合
+            return False # 何もしない
+
+        # テキストを左にスクロール(速度 × 経過時間), 左端で消えたら右端に再配置
+        size = self.canvas_geometry.get(task.canvas)
+        canvas_width = size[0] if size else task.canvas.winfo_width()
+        task.advance(dt, canvas_width)
+        return True
+
+    # スクロール開始
+    def start_scrolling(
+                        self,
+                        canvas_widget,
+                        original_text,
+                        task_key, 
+                        text_fill_color="black",
+                        font_object=None,
+                        scroll_velocity=None,
+                        is_trouble_scroll=False
+                        ):
+
+        # 既存のスクロールを停止
+        self.stop_scrolling(task_key)
+
+        # スクロールさせるための1行テキスト（元テキストの改行はスペースに置換されている想定）
+        text_for_scrolling = original_text.strip()
+        
+        # フォントオブジェクトとスクロールパラメータの取得
+        current_font_object = font_object if font_object else self.status_font_object
+        current_velocity = scroll_velocity if scroll_velocity is not None else self.SCROLL_VELOCITY
+        # --- ↓↓↓ 三項演算子 ---
+        # if scroll_velocity is not None:
+        #   current_velocity = scroll_velocity
+        # else:
+        #   current_velocity = self.SCROLL_VELOCITY
+        # --- ↑↑↑ ---
+        # create_text は (family, size, weight) のタプルを期待(キャッシュから取得)
+        font_for_canvas = self.layout_cache.font_spec(current_font_object)
+        
+
+        # Canvasの 幅と高さ を取得
+        # grid されているので ある程度は値が取れるはず
+        canvas_width, canvas_height = self._canvas_size(canvas_widget)
+        if canvas_width <= 1: # まだ描画されていない場合 デフォルトや推定値を使う
+            canvas_width = 300 # 仮
+        if canvas_height <= 1:
+            # フォントメトリクスから fallback 高さを計算
+            canvas_height = self.layout_cache.line_height(current_font_object) + 4
+
+        # テキストの pixel を計算
+        text_width_pixels = self.layout_cache.measure(current_font_object, text_for_scrolling)
+        # ↓↓↓ y 座標は Canvas 垂直方向中央を基準
+        # example: 上に表示したい場合 canvas_height // 2 - 5
+        # example: 下に表示したい場合 canvas_height // 2 + 5
+        initial_y_pos = canvas_height // 2 # オフセットを削除、中央基準
+        # ↑↑↑
+        
+        # 既存のアイテムがあれば削除
+        # stop_scrolling メソッドで削除されるので、ここでは削除しない
+        # 基本的には削除
+        # canvas_widget.delete("scroll_text_" + str(index))
+        
+        # is_trouble_scroll = (text_fill_color == "red") # トラブルかどうかのフラグ
+    
+        # タグ名は task_key を含め統一する
+        canvas_item_tag = str(task_key) + "_text"
+        canvas_widget.delete(canvas_item_tag)
+    
+        if text_width_pixels > canvas_width:
+            # スクロールを要する場合
+            scroll_separator = "  ◆◆◆  " # 区切り文字
+            display_text = scroll_separator + text_for_scrolling + scroll_separator 
+            text_width_pixels = self.layout_cache.measure(current_font_object, display_text) # 区切り文字を含めた幅で再計算
+            
+            # anchor="center" の場合, text中央が initial_x_pos に来る
+            # text全体を 右からスクロールさせるには
+            initial_x_pos = canvas_width + (text_width_pixels / 2) # canvasの右端 + text幅の半分
+            text_item_id = canvas_widget.create_text( # Canvasにテキストを追加
+                initial_x_pos, # 初期X座標 (text中央)
+                initial_y_pos, # 初期Y座標
+                text=display_text, # 区切り文字を含めたテキスト
+                font=font_for_canvas, # フォント
+                anchor="center", # 中央寄せで座標指定
+                fill=text_fill_color, # 文字色
+                tags=canvas_item_tag # タグ
+            )
+            
+            self.scrolling_tasks[task_key] = ScrollTask( # タスク情報を保存
+                canvas_widget, # Canvas Widget
+                text_item_id, # テキストアイテムID
+                display_text, # 表示テキスト
+                text_width_pixels, # 表示テキストの幅
+                initial_x_pos, # 初期X座標
+                initial_y_pos, # 初期Y座標
+                True, # スクロール中
+                is_trouble_scroll, # トラブルかどうか
+                current_font_object, # フォント
+                current_velocity, # スクロール速度(ピクセル/秒)
+            )
+            self.frame_clock.start() # 共通クロックで動かす(動作中なら何もしない)
+        else:
+            # label_widget.configure(text=text_for_scrolling)
+            # スクロール不要 静的表示( anchor="w" と initial_x_pos の計算で水平中央揃え)
+            initial_x_pos = canvas_width / 2 # 水平中央
+            text_item_id = canvas_widget.create_text(
+                initial_x_pos, 
+                initial_y_pos, 
+                text=text_for_scrolling,
+                font=font_for_canvas,
+                anchor="center", # 中央寄せで座標指定
+                fill=text_fill_color,
+                tags=canvas_item_tag
+            )
+            
+            self.scrolling_tasks[task_key] = ScrollTask(
+                canvas_widget, 
+                text_item_id,
+                text_for_scrolling, # 表示テキスト
+                text_width_pixels,
+                initial_x_pos, # 水平中央揃えのための初期X座標
+                initial_y_pos, # 垂直方向中央揃えのための初期Y座標
+                False, # スクロール中フラグ
+                is_trouble_scroll, # トラブルかどうか
+                current_font_object,
+                current_velocity
+            )
+
+    # スクロール停止
+    def stop_scrolling(self, task_key):
+        # 指定されたインデックスのスクロールを停止
+        if task_key in self.scrolling_tasks: # インデックスが存在する場合
+            # タスクの構造に合わせてアンパックを調整
+            # キーが存在しない場合は None を返す
+            task = self.scrolling_tasks.pop(task_key, None) # タスク情報を取得
+            
+            if isinstance(task, TickerChain): # 複数アイテムのティッカー(ニュース)
+                try:
+                    task.clear()
+                except TclError:
+                    pass
+                return
+            if task: # タスク情報が存在する場合
+                canvas_widget, text_item_id = task.canvas, task.text_item_id
+                # 共通クロックはスクロール中のタスクが無くなると自動で止まる
+                if canvas_widget and text_item_id: # Canvas Widget とテキストアイテムIDが存在する場合
+                    try:
+                        # タグ名は task_key を含めて統一する
+                        canvas_item_tag = str(task_key) + "_text"
+                        # find_withtag はアイテムIDのタプルを返す, アイテムIDは数値
+                        # text_item_id が canvas_widget.find_withtag(canvas_item_tag) に存在するかを確認
+                        if text_item_id in canvas_widget.find_withtag(canvas_item_tag):
+                            canvas_widget.delete(text_item_id) # Canvasのアイテムを削除
+                    except TclError:
+                        pass # エラーが発生しても無視する
+    
+    # ニュース表示用関数(別スレッドで実行するため Tk には触らない)
+    # (見出し, 取得できたか) を返す。取得できなかった場合は見出しの代わりにメッセージ
+    def _scrape_news_headlines(self):
+        try:
+            headlines = fetch_news_headlines(self.transport, self.NEWS_URL, timeout=10)
+            if not headlines:
+                return ["現在、ニュースを取得できません。サイト構造が変更された可能性があります。"], False
+            return headlines, True
+        except Exception as e:
+            if is_network_error(e):
+                news_log.warning("ニュースの取得に失敗しました(ネットワークエラー)：%s", e)
+                return ["ニュースの取得に失敗しました。(ネットワークエラー)"], False
+            news_log.exception("ニュースの解析中にエラーが発生しました：%s", e)
+            return ["ニュースの解析中にエラーが発生しました。"], False
+        
+    # ニュースを更新する関数(取得は別スレッドで開始し、結果は _check_news_result で反映)
+    def _update_news_display(self):
+        if not self.running:
+            return
+        if self.news_future is not None: # 前回の取得がまだ終わっていない
+            news_log.info("ニュースを取得中のため, 今回の更新はスキップします")
+            return
+        news_log.debug("ニュースを更新します")
+        self.news_future = self.news_executor.submit(self._scrape_news_headlines)
+        self.after(self.NEWS_CHECK_INTERVAL_MS, self._check_news_result)
+
+    # ニュースの取得結果を確認して反映(終わっていなければ再確認)
+    def _check_news_result(self):
+        future = self.news_future
+        if not self.running or future is None:
+            return
+        if not future.done():
+            self.after(self.NEWS_CHECK_INTERVAL_MS, self._check_news_result)
+            return
+        self.news_future = None
+        headlines, fetched = future.result()
+        if fetched:
+            self.snapshot_store.update_news(headlines) # 次回起動時用に保存
+        elif self.snapshot_store.news is not None:
+            # 取得できなかった場合は前回の見出しを取得時刻付きで流し続ける
+            news = self.snapshot_store.news
+            headlines = news["headlines"]
+            self._show_news(headlines, fetched_at=datetime.fromtimestamp(news["fetched_at"]))
+            return
+        self._show_news(headlines)
+        self._save_snapshot()
+
+    # ニュース見出しをスクロール表示(保存しておいた見出しの場合は取得時刻を付ける)
+    # 見出しは1件ずつ流し、内容が変わった場合も表示中の見出しはそのまま流れ続ける
+    # (新しい見出しは次に右端から出てくる分から。同じ見出しなら何もしない)
+    def _show_news(self, headlines, fetched_at=None):
+        news_prefix = "【Yahoo国内ニュース】"
+        if fetched_at is not None:
+            news_prefix = f"【Yahoo国内ニュース {self._format_age(fetched_at)}時点】"
+        if not headlines:
+            headlines = ["現在、ニュースを取得できません。"]
+        scroll_separator = "  ◆◆◆  " # 一巡の区切り
+        segments = [scroll_separator + news_prefix]
+        segments += [headline + " ／ " for headline in headlines[:-1]] + [headlines[-1]]
+
+        task = self.scrolling_tasks.get(self.news_scroll_task_key)
+        if isinstance(task, TickerChain):
+            task.set_texts(segments)
+            return
+        news_bg_color = "antiquewhite2"
+        news_text_color = "black"
+        self.news_canvas.configure(bg=news_bg_color)
+        self.stop_scrolling(self.news_scroll_task_key)
+        canvas_width, canvas_height = self._canvas_size(self.news_canvas)
+        if canvas_height <= 1:
+            canvas_height = self.layout_cache.line_height(self.news_font_object) + 4
+        self.scrolling_tasks[self.news_scroll_task_key] = TickerChain(
+                                                        self.news_canvas,
+                                                        str(self.news_scroll_task_key) + "_text", # タグ
+                                                        segments,
+                                                        canvas_height // 2, # 垂直方向中央
+                                                        self.news_font_object,
+                                                        self.layout_cache.font_spec(self.news_font_object),
+                                                        self.layout_cache.measure,
+                                                        news_text_color,
+                                                        self.NEWS_SCROLL_VELOCITY
+                                                        )
+        self.frame_clock.start() # 共通クロックで動かす(動作中なら何もしない)
+    # ニュースの定期更新をスケジュール    
+    def schedule_news_updates(self):
+        if self.running:
+            self._update_news_display() # とりあえず一度更新を実行
+            # 次回の更新をスケジュール
+            self.after(self.NEWS_UPDATE_INTERVAL_MS, self.schedule_news_updates)
+                    
+    # 現在時刻を更新する関数
+    def update_datetime(self):
+        now = datetime.now() # 現在日時
+        # 日時をフォーマット
+        formatted_datetime = now.strftime("%Y/%m/%d %H:%M:%S" + " 現在 ")
+        # ラベルに日時を表示
+        self.datetime_label.config(text=formatted_datetime)
+        # 1秒ごとに更新
+        self.after(1000, self.update_datetime)
+    
+    # 定期更新実行
+    def schedule_updates(self):
+        # 路線毎の取得時刻( PollScheduler )になった路線を更新
+        # (取得はバックグラウンドで行い変わった行だけ更新するので, スクロール中でも保留しない)
+        if self.running:
+            self._poll_due_lines()
+            # 次に取得時刻になる路線まで待つ(取得中でも確認が止まらないよう上限あり)
+            delay_ms = int(self.poll_scheduler.next_due_in() * 1000)
+            self.after(min(max(delay_ms, 1000), self.SCHEDULER_MAX_SLEEP_MS), self.schedule_updates)
+
+    # 取得時刻になった路線だけを取得
+    def _poll_due_lines(self):
+        if not self.running or self.fetch_engine.busy: # 取得中の場合は次の確認で
+            return
+        due = [name for name in self.poll_scheduler.due() if name not in self.pending_fetch_jobs]
+        if due:
+            self._submit_fetch({name: self.lines[self.line_index[name]].url for name in due})
+
+    # 路線毎の次回取得時刻と、固定間隔との比較を表示
+    def print_poll_stats(self, event=None):
+        scheduler_log.info("取得間隔：\n%s", self.poll_scheduler.format_stats())
+        news_stats = NEWS_SELECTOR_LEARNER.stats()
+        news_log.info(
+            "ニュース解析：セレクタ %s, %s回 (打ち切り %s回, 切り替え %s回, 見つからず %s回)",
+            news_stats["preferred"], news_stats["parses"],
+            news_stats["early_stops"], news_stats["fallbacks"], news_stats["misses"]
+            )
+
+    # 運行情報を更新する関数
+    # 取得はバックグラウンドで行い、結果は _drain_fetch_results で UI に反映する
+    def update_train_info_internal(self):
+        # 呼出確認用ログ(時刻はログに付く)
+        scheduler_log.debug("update_train_info を実行します")
+        if not self.running: # アプリケーションが終了しようとしている場合は何もしない
+            return
+        if self.fetch_engine.busy: # 前回の取得がまだ終わっていない
+            scheduler_log.info("運行情報を取得中のため, 今回の更新はスキップします")
+            return
+        # 登録路線の運行情報をまとめて取得(同時取得数は FETCH_MAX_WORKERS まで)
+        self.pending_fetch_jobs.clear() # 全路線を取得するので保留分は不要
+        self._submit_fetch({line.name: line.url for line in self.lines})
+
+    # jobs ( {路線名: URL} ) の取得を開始(取得中の場合はサイクル終了後に回す)
+    def _submit_fetch(self, jobs):
+        if self.fetch_engine.busy:
+            self.pending_fetch_jobs.update(jobs)
+            return
+        self.cycle_urls = dict(jobs)
+        self.transport.begin_cycle() # 通信量の集計をリセット
+        self.area_fetch.begin_cycle() # 一覧ページの集計をリセット(一覧は LISTING_TTL_SEC 秒まで使い回す)
+        self.fetch_engine.submit_cycle(jobs)
+        self.poll_scheduler.dispatched(jobs)
+        if self.fetch_drain_after_id is None:
+            self.fetch_drain_after_id = self.after(self.FETCH_DRAIN_INTERVAL_MS, self._drain_fetch_results)
+
+    # 取得結果キューを取り出して UI に反映
+    def _drain_fetch_results(self):
+        self.fetch_drain_after_id = None
+        if not self.running:
+            return
+        cycle_done = False
+        for result in self.fetch_engine.drain():
+            if isinstance(result, CycleDone):
+                cycle_done = True
+                scheduler_log.info("定期処理を実行しました(%.2f秒)", result.elapsed)
+                if scheduler_log.isEnabledFor(logging.DEBUG):
+                    scheduler_log.debug(self.poll_scheduler.format_stats().splitlines()[0])
+                self._save_snapshot()
+                self._flush_history()
+                stats = self.transport.cycle_stats()
+                fetch_log.info(
+                    "通信：%s件 (304: %s件, 途中で打ち切り: %s件), 受信 %s bytes, 節約 %s bytes (打ち切り分 %s), 接続再利用 %s回",
+                    stats["requests"], stats["not_modified"], stats["stopped_early"],
+                    stats["bytes_received"], stats["bytes_saved"], stats["bytes_saved_stream"],
+                    stats["connections_reused"]
+                    )
+                if self.area_fetch.area_count:
+                    shared = self._apply_shared_listing()
+                    area_stats = self.area_fetch.cycle_stats()
+                    fetch_log.info(
+                        "一覧ページ：%s件 (失敗 %s件), 一覧で確定 %s路線, 詳細を取得 %s路線, 一覧に無い %s路線, "
+                        "路線毎 %s路線, 取得時刻前の路線に反映 %s路線",
+                        area_stats["listing_requests"], area_stats["listing_errors"], area_stats["resolved"],
+                        area_stats["detail"], area_stats["unresolved"], area_stats["direct"], shared
+                        )
+                layout_stats = self.layout_cache.stats()
+                ui_log.debug(
+                    "レイアウトキャッシュ：%s件, hit %s回, miss %s回",
+                    layout_stats["size"], layout_stats["hits"], layout_stats["misses"]
+                    )
+                # トラブル中の路線の並び替えを反映(同じ路線が表示されている行は更新しない)
+                self._show_page(self.page_index)
+                if not STARTUP.reported: # 起動後最初のデータ表示
+                    STARTUP.mark("first_data")
+                    STARTUP.reported = True
+                    ui_log.info(STARTUP.report())
+                continue
+            item = result.key
+            # 取得中に設定から削除された路線や, URL が変わった路線の結果は使わない
+            if item not in self.line_index or self.lines[self.line_index[item]].url != self.cycle_urls.get(item):
+                continue
+            # ネットワークエラーやHTTPエラー
+            # 失敗した路線は前回の情報に「古い情報」の印を付けて表示し続ける
+            if isinstance(result.error, CircuitOpenError): # 失敗が続いているホスト
+                fetch_log.warning("取得を見合わせました(%s)：%s", item, result.error)
+                self.poll_scheduler.record_error(item) # 取得間隔を延ばす
+                self._mark_line_stale(item)
+                continue
+            elif isinstance(result.error, TimeoutError) or is_network_error(result.error):
+                fetch_log.warning("ネットワークエラーまたはリクエストエラーが発生しました(%s)：%s", item, result.error)
+                self.poll_scheduler.record_error(item)
+                self._mark_line_stale(item)
+                continue
+            elif result.error is not None: # それ以外のエラー
+                fetch_log.error("運行情報更新中にエラーが発生しました(%s)：%s", item, result.error)
+                self.poll_scheduler.record_error(item)
+                self._mark_line_stale(item)
+                continue
+            status, trouble_text = result.value
+            self._record_line_result(item, status, trouble_text)
+        if cycle_done and self.pending_fetch_jobs:
+            # 取得中に追加された路線を取得
+            jobs, self.pending_fetch_jobs = self.pending_fetch_jobs, {}
+            self._submit_fetch(jobs)
+        elif not cycle_done:
+            # 取得が終わるまでキューの確認を続ける
+            self.fetch_drain_after_id = self.after(self.FETCH_DRAIN_INTERVAL_MS, self._drain_fetch_results)
+
+    # 取得できた1路線分を取得間隔・保存・履歴・表示に反映
+    def _record_line_result(self, item, status, trouble_text):
+        try:
+            self.poll_scheduler.record_result(item, status, trouble_text)
+            self.line_fetched_at[item] = datetime.now()
+            self.snapshot_store.update_line(item, status, trouble_text)
+            self.history.record(item, status)
+            self._apply_train_status(item, status, trouble_text)
+        except Exception as e:
+            ui_log.exception("運行情報の表示中にエラーが発生しました(%s)：%s", item, e)
+
+    # 今回取得した一覧ページで分かった, 取得していない路線を反映する(反映した路線数を返す)
+    # 平常運転はそのまま反映し, 新たにトラブルになった路線は詳細(路線のページ)を次の確認で取得する
+    def _apply_shared_listing(self):
+        applied = 0
+        for item, (url, entry) in self.area_fetch.take_resolved().items():
+            if item in self.cycle_urls or item in self.pending_fetch_jobs or item not in self.line_index:
+                continue # 今回取得した路線・取得待ちの路線はその結果を使う
+            if self.lines[self.line_index[item]].url != url: # 取得中に URL が変わった
+                continue
+            if entry.status == "normal":
+                self._record_line_result(item, entry.status, entry.text)
+                applied += 1
+            else:
+                state = self.line_states.get(item)
+                if state is None or state.status != "trouble":
+                    self.poll_scheduler.expedite([item])
+        return applied
+
+    # 1路線分の運行状況を記録し、表示中の路線であればウィジェットに反映
+    def _apply_train_status(self, item, status, trouble_text):
+        started = time.perf_counter()
+        try:
+            self._apply_line_state(item, status, trouble_text)
+        finally:
+            METRICS.ui_apply_seconds.observe(time.perf_counter() - started)
+
+    def _apply_line_state(self, item, status, trouble_text):
+        line = self.lines[self.line_index[item]]
+        new_state = build_line_state(
+                                    item,
+                                    status,
+                                    trouble_text,
+                                    section=line.section, # 区間情報
+                                    company_url=line.company_url # 関連URL
+                                    )
+        old_state = self.line_states.get(item)
+        if old_state == new_state: # 変化なし(スクロール位置もそのまま)
+            return
+        self.line_states[item] = new_state
+        if old_state is not None and old_state.status != new_state.status:
+            ui_log.info("%s：運行状況が変わりました %s → %s", item, old_state.status, new_state.status)
+        if item in self.slot_lines: # 表示中の路線のみ
+            self._render_slot(self.slot_lines.index(item))
+
+    # 取得に失敗した路線を「古い情報」にする(未取得の路線は何もしない)
+    def _mark_line_stale(self, item):
+        old_state = self.line_states.get(item)
+        new_state = mark_stale(old_state)
+        if new_state is old_state:
+            return
+        self.line_states[item] = new_state
+        if item in self.slot_lines: # 表示中の路線のみ
+            self._render_slot(self.slot_lines.index(item))
+
+    # 取得時刻の表示(今日なら時刻のみ, それ以前は日付も)
+    def _format_age(self, fetched_at):
+        if fetched_at.date() == datetime.now().date():
+            return f"{fetched_at:%H:%M}"
+        return f"{fetched_at:%m/%d %H:%M}"
+
+    # 前回保存した運行状況とニュースを「古い情報」として表示(通信より先に表示する)
+    # 最初の取得が終わった路線から通常の表示に切り替わる
+    def _restore_snapshot(self):
+        restored = 0
+        for line in self.lines:
+            entry = self.snapshot_store.lines.get(line.name)
+            if entry is None:
+                continue
+            try:
+                state = build_line_state(
+                                        line.name,
+                                        entry["status"],
+                                        entry["text"],
+                                        section=line.section,
+                                        company_url=line.company_url
+                                        )
+                self.line_fetched_at[line.name] = datetime.fromtimestamp(entry["fetched_at"])
+            except (KeyError, TypeError, ValueError, OSError) as e:
+                ui_log.warning("保存した運行状況を表示できませんでした(%s)：%s", line.name, e)
+                continue
+            self.line_states[line.name] = mark_stale(state)
+            restored += 1
+        news = self.snapshot_store.news
+        if news is not None:
+            try:
+                self._show_news(news["headlines"], fetched_at=datetime.fromtimestamp(news["fetched_at"]))
+            except (KeyError, TypeError, ValueError, OSError) as e:
+                ui_log.warning("保存したニュースを表示できませんでした：%s", e)
+        if restored:
+            ui_log.info("保存した運行状況を表示しました：%s路線", restored)
+
+    # 履歴をファイルに書き出す
+    def _flush_history(self):
+        try:
+            self.history.flush()
+        except OSError as e:
+            ui_log.warning("運行状況の履歴を保存できませんでした：%s", e)
+
+    # 路線毎のトラブル時間と最近の状況の変化を表示
+    def print_history(self, event=None):
+        ui_log.info("運行状況の履歴：\n%s", self.history.summary([line.name for line in self.lines]))
+
+    # 直近のログを cache/logs/ に書き出す(不具合の調査用)
+    def dump_recent_logs(self, event=None):
+        try:
+            path = dump_recent_events(LOG_DUMP_DIR)
+        except OSError as e:
+            ui_log.warning("ログを書き出せませんでした：%s", e)
+            return
+        if path is not None:
+            ui_log.info("直近のログを書き出しました：%s", path)
+
+    # 運行状況とニュースを保存(状況が変わった時, または1分以上経った時)
+    def _save_snapshot(self, max_age=60.0):
+        self.snapshot_store.retain(line.name for line in self.lines)
+        try:
+            self.snapshot_store.save(max_age=max_age)
+        except OSError as e:
+            ui_log.warning("運行状況を保存できませんでした：%s", e)
+
+    # 区間ラベルのテキスト(古い情報の場合は最後に取得できた時刻を付ける)
+    def _section_text(self, line, state):
+        if state is not None and state.stale:
+            fetched_at = self.line_fetched_at.get(line.name)
+            if fetched_at is not None:
+                return f"{line.section} ※{self._format_age(fetched_at)}時点"
+            return f"{line.section} ※更新失敗"
+        return line.section
+
+    # 表示行に割り当てた路線の状態をウィジェットに反映
+    # 前回反映した状態( self.slot_rendered )と比べて変わった部分だけを更新する
+    def _render_slot(self, slot):
+        line_name = self.slot_lines[slot]
+        line = self.lines[self.line_index[line_name]] if line_name else None
+        new_state = self.line_states.get(line_name) if line_name else None
+        rendered = self.slot_rendered.get(slot)
+        if rendered is not None and rendered[0] == line: # 同じ路線・同じ設定
+            rendered_state = rendered[1]
+        elif rendered is not None and line is not None and getattr(rendered[0], "name", None) == line.name:
+            # 同じ路線の設定だけが変わった(スクロールは続けたまま, 変わった項目だけ反映)
+            self._bind_slot_line(slot, line) # 路線名・区間・配色
+            rendered_state = rendered[1]
+        else: # 路線の割り当てが変わった
+            self._bind_slot_line(slot, line) # 路線名・区間・配色
+            rendered = None
+            rendered_state = None # 全項目を反映
+        self.slot_rendered[slot] = (line, new_state)
+        if new_state is None: # 未取得または空き行
+            if rendered is None or rendered_state is not None: # 表示中の運行状況を消す
+                self._clear_slot_status(slot)
+            return
+        changed = diff_line_state(rendered_state, new_state)
+        if not changed: # 変化なし(スクロール位置もそのまま)
+            return
+
+        target_canvas = self.wwt_canvas[slot] # 対象の Canvas
+        icon_widget = self.wwi[slot] # 対象のアイコンウィジェット
+
+        # Canvas 背景色
+        if "canvas_bg" in changed:
+            target_canvas.configure(bg=new_state.canvas_bg)
+        # アイコンの背景色と画像
+        if "icon_bg" in changed:
+            icon_widget.configure(bg=new_state.icon_bg)
+        if "icon" in changed:
+            icon_widget.configure(image=self.icon_dict.get(new_state.icon, self.icon_dict["normal"]))
+        # アイコンのイベントバインド(トラブル時かつURLが設定されている場合のみ)
+        if changed & {"status", "company_url", "icon_bg"}:
+            if new_state.status == "trouble" and new_state.company_url:
+                icon_widget.bind(
+                                "<ButtonPress-1>",
+                                lambda e,
+                                iw=icon_widget: self.on_icon_press(iw)
+                                )
+                icon_widget.bind(
+                                "<ButtonRelease-1>",
+                                lambda e,
+                                iw=icon_widget,
+                                url=new_state.company_url,
+                                tn=line_name,
+                                oib=new_state.icon_bg: self.on_icon_release(iw, url, tn, oib)
+                                )
+            else: # イベントバインド解除
+                icon_widget.unbind("<ButtonPress-1>")
+                icon_widget.unbind("<ButtonRelease-1>")
+        # 区間情報の表示(区間ラベルの背景色は _bind_slot_line で路線名に合わせる)
+        if changed & {"section", "stale"}:
+            self.wws[slot].configure(text=self._section_text(line, new_state))
+
+        # 運行状況テキスト: テキストが同じならスクロールを続けたまま文字色だけ変える
+        if changed & {"status", "text"}:
+            self.start_scrolling(
+                                target_canvas,
+                                new_state.text, 
+                                slot,
+                                text_fill_color=new_state.text_fill,
+                                font_object=self.status_font_object,
+                                is_trouble_scroll=(new_state.status == "trouble")
+                                )
+        elif "text_fill" in changed:
+            self._set_scroll_text_fill(slot, new_state.text_fill)
+
+    # 表示行に路線名・区間・配色を設定(空き行は無地)
+    def _bind_slot_line(self, slot, line):
+        if line is None:
+            style = DEFAULT_STYLE
+            formatted_name = ""
+            section_text = ""
+        else:
+            style = self.train_styles.get(line.name, DEFAULT_STYLE)
+            formatted_name = self._format_routename_for_display(line.name)
+            section_text = self._section_text(line, self.line_states.get(line.name))
+        self.wwl[slot].configure(text=formatted_name, bg=style["bg"], fg=style["fg"])
+        self.wws[slot].configure(text=section_text, bg=style["bg"], fg=style["fg"])
+
+    # 表示行の運行状況を消す(未取得または空き行)
+    def _clear_slot_status(self, slot):
+        self.stop_scrolling(slot)
+        self.wwt_canvas[slot].configure(bg="white")
+        icon_widget = self.wwi[slot]
+        icon_widget.configure(image=self.icon_dict["normal"], bg="white")
+        icon_widget.unbind("<ButtonPress-1>")
+        icon_widget.unbind("<ButtonRelease-1>")
+
+    # ページに表示する路線名の順番(トラブル中の路線を先頭にする場合は並べ替え)
+    def _page_order(self):
+        names = [line.name for line in self.lines]
+        if self.SORT_TROUBLE_FIRST:
+            # sorted は安定ソートなので、同じ状況の路線は登録順のまま
+            names = sorted(names, key=lambda name: getattr(self.line_states.get(name), "status", None) != "trouble")
+        return names
+
+    # ページ数
+    @property
+    def page_count(self):
+        return max(1, -(-len(self.lines) // self.rows_per_page)) # 切り上げ
+
+    # 指定のページを表示(表示行に路線を割り当て直し、変わった行だけ更新)
+    def _show_page(self, page_index):
+        self.page_index = page_index % self.page_count
+        order = self._page_order()
+        start = self.page_index * self.rows_per_page
+        page_names = order[start:start + self.rows_per_page]
+        page_names += [None] * (self.rows_per_page - len(page_names)) # 最後のページの空き行
+        for slot, line_name in enumerate(page_names):
+            self.slot_lines[slot] = line_name
+            self._render_slot(slot)
+        if self.page_count > 1:
+            self.page_label.configure(text=f"{self.page_index + 1} / {self.page_count} ページ")
+        else:
+            self.page_label.configure(text="")
+
+    # 路線設定を変更(変わった路線の行だけ更新し、追加・URL変更の路線だけ取得する)
+    def apply_lines(self, new_lines):
+        started = time.perf_counter()
+        diff = diff_lines(self.lines, new_lines)
+        self.lines = list(new_lines)
+        self._index_lines()
+        self.area_fetch.set_lines(self.lines)
+        self.poll_scheduler.set_lines([line.name for line in self.lines])
+        for name in diff["removed"] + diff["refetch"]:
+            self.line_states.pop(name, None)
+            self.line_fetched_at.pop(name, None)
+            self.pending_fetch_jobs.pop(name, None)
+        for name in diff["changed"]:
+            # 取得済みの運行状況はそのまま, 区間・関連URLだけ反映
+            state = self.line_states.get(name)
+            if state is not None:
+                line = self.lines[self.line_index[name]]
+                self.line_states[name] = state._replace(section=line.section, company_url=line.company_url)
+        self._resize_slots(max(1, min(len(self.lines), self.MAX_ROWS_PER_PAGE)))
+        self._show_page(self.page_index) # 表示中の行は設定・状態が変わった行だけ更新される
+        jobs = {name: self.lines[self.line_index[name]].url for name in diff["added"] + diff["refetch"]}
+        if self.feed is not None: # 購読モードは受信済みの状態を表示
+            for name in jobs:
+                if name in self.feed_lines:
+                    self._apply_feed_line(name, self.feed_lines[name])
+        elif jobs:
+            self._submit_fetch(jobs)
+        ui_log.info(
+            "路線設定を反映しました：追加 %s, 削除 %s, URL変更 %s, 表示変更 %s (%.1fms)",
+            len(diff["added"]), len(diff["removed"]), len(diff["refetch"]), len(diff["changed"]),
+            (time.perf_counter() - started) * 1000
+            )
+
+    # 路線設定ファイルの変更を定期確認
+    def schedule_registry_reload(self):
+        if not self.running or self.registry_watcher is None:
+            return
+        new_lines = self.registry_watcher.poll()
+        if new_lines is not None:
+            self.apply_lines(new_lines)
+        elif self.registry_watcher.last_error is not None:
+            ui_log.error("路線設定ファイルの読み込みに失敗しました(前の設定のまま)：%s", self.registry_watcher.last_error)
+            self.registry_watcher.last_error = None # 同じエラーは1回だけ表示
+        self.after(self.REGISTRY_POLL_INTERVAL_MS, self.schedule_registry_reload)
+
+    # ページの定期切り替え
+    def schedule_page_rotation(self):
+        if self.running:
+            if self.page_count > 1:
+                self._show_page(self.page_index + 1)
+            self.after(self.PAGE_ROTATE_INTERVAL_MS, self.schedule_page_rotation)
+
+    # 路線名ラベルクリック時(表示中の路線に URL がある場合のみ)
+    def _on_slot_routename_press(self, label_widget, slot):
+        line_name = self.slot_lines[slot]
+        if line_name and self.railway_company_urls.get(line_name):
+            self.on_routename_press(label_widget, line_name)
+
+    def _on_slot_routename_release(self, label_widget, slot):
+        line_name = self.slot_lines[slot]
+        url = self.railway_company_urls.get(line_name) if line_name else None
+        if url:
+            self.on_routename_release(label_widget, url, line_name)
+
+    # スクロール中のテキストの文字色だけを変更
+    def _set_scroll_text_fill(self, task_key, fill):
+        task = self.scrolling_tasks.get(task_key)
+        if isinstance(task, TickerChain):
+            task.set_fill(fill)
+        elif task and task.canvas and task.text_item_id:
+            task.canvas.itemconfigure(task.text_item_id, fill=fill)
+
+    # プログラム終了処理
+    def on_close(self, event=None):
+        # ↑↑↑  event引数 デフォルト= None
+        ui_log.info("プログラムを終了します")
+        if self.running:
+            self.running = False
+        # バックグラウンド取得を停止
+        if self.fetch_drain_after_id is not None:
+            self.after_cancel(self.fetch_drain_after_id)
+            self.fetch_drain_after_id = None
+        self.fetch_engine.shutdown()
+        self.transport.close()
+        if self.feed is not None:
+            self.feed.stop()
+        if self.metrics_server is not None:
+            self.metrics_server.close()
+        self.news_executor.shutdown(wait=False, cancel_futures=True) # 取得中のニュースは待たない
+        self._save_snapshot(max_age=0) # 最後の取得時刻を保存
+        try:
+            self.history.close()
+        except OSError as e:
+            ui_log.warning("運行状況の履歴を保存できませんでした：%s", e)
+        # スクロールタスクをすべて停止    
+        self.frame_clock.stop()
+        for index in list(self.scrolling_tasks.keys()):
+            self.stop_scrolling(index)
+        # ニューススクロールタスクも停止
+        if self.news_scroll_task_key in self.scrolling_tasks:
+            self.stop_scrolling(self.news_scroll_task_key)
+        if sys.platform == "win32" and hasattr(self, "ctypes"):
+            try:
+                # Windows の場合、ディスプレイのスリープ防止設定を解除
+                # (システムのスリープは許可されたまま)
+                self.ctypes.windll.kernel32.SetThreadExecutionState(self.ES_CONTINUOUS)
+            except Exception as e:
+                ui_log.warning("ディスプレイのスリープ防止設定に失敗しました：%s", e)
+            self.master.wm_iconify() 
+        # ウィンドウを破棄
+        self.master.destroy()
+
+    # ウインドウを最大化または元のサイズに戻す
+    def toggle_fullscreen(self, event=None):
+        self.is_fullscreen_active = not self.is_fullscreen_active
+        self.master.attributes("-fullscreen", self.is_fullscreen_active)
+        # フルスクリーン解除時は元のウィンドウサイズに戻すことを保証
+        if not self.is_fullscreen_active:
+            messagebox.showinfo("フルスクリーン解除", "フルスクリーンを解除しました")
+            self.master.geometry(self.initial_geometry)
+            self.master.resizable(False, False)
+        else:
+            messagebox.showinfo("フルスクリーン", "フルスクリーンに切り替えました\n解除はRキーまたは再度Fキーを押してください")
+        # フルスクリーン変更後、UIの更新を強制、configure イベントを発生させる
+        self.master.update_idletasks() 
+    
+    # ウインドウ最小化    
+    def minimize_window(self, event=None):
+        self.master.lift()
+        self.master.iconify()
+        ui_log.debug("ウィンドウを最小化しました")
+
+    # --- ↓↓↓ 使用機器によっては最小化から復元できない ---        
+    # def restore_window_from_minimize(self, event=None):
+    #     self.master.wm_state("normal")
+    #     self.master.focus_force()
+    #     print("ウィンドウを(最小化から)復元しました") # debug
+    # --- ↑↑↑ ---
+        
+    # フルスクリーンから元のウィンドウサイズに戻す
+    def restore_to_original_size(self, event=None):
+        if self.is_fullscreen_active: # full screen であれば解除する
+            self.is_fullscreen_active = False
+            self.master.attributes("-fullscreen", False)
+            messagebox.showinfo("フルスクリーン解除", "フルスクリーンを解除しました") # debug
+        else:
+            messagebox.showinfo("ウィンドウサイズ", "ウィンドウサイズを元に戻しました") # debug
+        self.master.geometry(self.initial_geometry)
+        self.master.resizable(False, False) # ウインドウサイズを固定を再確認
+        ui_log.debug("ウィンドウサイズを元に戻しました")
+        self.master.update_idletasks() # ウィンドウサイズ変更後、UIの更新を強制、configure イベントを発生させる
+        
+    # 路線名ラベルクリック時のアクション    
+    def on_routename_press(self, label_widget, train_name):
+        original_style = self.train_styles.get(train_name, DEFAULT_STYLE) # self.train_styles を参照
+        # クリック時のハイライト背景色(元の文字色が見えるように)
+        highlight_bg="lightgray"
+        # 元の背景色を維持しつつ背景色を変更する
+        label_widget.configure(bg=highlight_bg, fg=original_style["fg"])
+    
+    # 路線名ラベルクリック解放時のアクション
+    def on_routename_release(self, label_widget, url, train_name):
+        # 元のスタイルに戻す
+        original_style = self.train_styles.get(train_name, DEFAULT_STYLE) # fallback
+        label_widget.configure(bg=original_style["bg"], fg=original_style["fg"])
+        # メッセージボックスで確認
+        confirm_open = messagebox.askyesno(
+                                            title=f"{train_name}関連リンク確認",
+                                            message=f"{train_name}の関連リンクをブラウザで開きますか？？\nURL:{url}"
+                                            )
+        if confirm_open: # [はい]を選択した場合
+            import webbrowser
+            webbrowser.open(url)
+            ui_log.info("ブラウザでリンクを開きました：%s", url)
+        else:
+            ui_log.debug("キャンセルしました：%s", url)
+            
+    # トラブルアイコンクリック時のアクション
+    def on_icon_press(self, icon_label_widget):
+        # 背景色を一時的に変更
+        icon_label_widget.configure(bg="lightgray")
+    
+    # トラブルアイコンクリック解放時のアクション
+    def on_icon_release(self, icon_label_widget, url, train_name, original_icon_bg):
+        # アイコンラベルの背景を元に戻す
+        icon_label_widget.configure(bg=original_icon_bg)
+        
+        if url:
+            # メッセージボックスで確認
+            comfirm_open = messagebox.askyesno(
+                                                title=f"{train_name}関連リンク確認",
+                                                message=f"{train_name}の関連リンクをブラウザで開きますか？？\nURL:{url}"
+                                                )
+            if comfirm_open: # [はい]を選択した場合
+                import webbrowser
+                webbrowser.open(url)
+                ui_log.info("ブラウザでリンクを開きました：%s", url)
+            else:
+                ui_log.debug("キャンセルしました：%s", url)
+               
+    # 購読モード：受信キューを定期確認して反映(届いていなければ何もしない)
+    def schedule_feed_drain(self):
+        if not self.running or self.feed is None:
+            return
+        if self.feed.thread is None:
+            self.feed.start()
+        events = self.feed.drain()
+        if events:
+            for kind, version, payload in events:
+                try:
+                    self._apply_feed_event(kind, version, payload)
+                except Exception as e: # 1件の不正なデータで受信を止めない
+                    ui_log.exception("配信データの反映中にエラーが発生しました(版 %s)：%s", version, e)
+            # トラブル中の路線の並び替えを反映
+            self._show_page(self.page_index)
+            self._save_snapshot()
+            self._flush_history()
+            if not STARTUP.reported and self.line_states: # 起動後最初のデータ表示
+                STARTUP.mark("first_data")
+                STARTUP.reported = True
+                ui_log.info(STARTUP.report())
+        self.after(self.FEED_DRAIN_INTERVAL_MS, self.schedule_feed_drain)
+
+    # 配信された1件( snapshot / delta / 接続状態)を反映
+    def _apply_feed_event(self, kind, version, payload):
+        if kind == "disconnected":
+            # 再接続までは最後に受け取った情報に「古い情報」の印を付けて表示し続ける
+            ui_log.warning("配信元から切断されました：%s", payload)
+            for name in list(self.line_states):
+                self._mark_line_stale(name)
+            return
+        if kind == "connected":
+            # 続きから受け取れるので、切断中に付けた印を外す(変わった路線は続けて届く)
+            ui_log.info("配信元に接続しました：%s", self.feed.source)
+            for name, data in self.feed_lines.items():
+                if name in self.line_index:
+                    self._apply_feed_line(name, data)
+            return
+        if kind == "snapshot":
+            self.feed_lines.clear()
+        for name, data in (payload.get("lines") or {}).items():
+            self.feed_lines[name] = data
+            if name in self.line_index: # この画面の設定に無い路線は表示しない
+                self._apply_feed_line(name, data)
+        for name in payload.get("removed") or ():
+            self.feed_lines.pop(name, None)
+            if name in self.line_index:
+                self._mark_line_stale(name) # 配信元で取得しなくなった路線
+        news = payload.get("news")
+        if news and news.get("headlines"):
+            self.snapshot_store.update_news(news["headlines"], news.get("fetched_at"))
+            self._show_news(news["headlines"])
+
+    # 配信された1路線分の状態( LineState の辞書)を反映(区間・関連URLはこの画面の設定を使う)
+    def _apply_feed_line(self, name, data):
+        status, text = data["status"], data["text"]
+        if data.get("stale"): # 配信元でも取得に失敗している
+            if name not in self.line_states:
+                self._apply_train_status(name, status, text)
+            self._mark_line_stale(name)
+            return
+        self.line_fetched_at[name] = datetime.now()
+        self.snapshot_store.update_line(name, status, text)
+        self.history.record(name, status)
+        self._apply_train_status(name, status, text)
+
+    # 計測：after() の遅れ・スクロール中のティッカー数・Canvas アイテム数を記録し、定期的に集計を表示
+    def schedule_metrics_probe(self):
+        if not self.running:
+            return
+        now = time.monotonic()
+        if self.metrics_probe_due is not None:
+            METRICS.after_lag_seconds.observe(max(0.0, now - self.metrics_probe_due))
+        METRICS.active_tickers.set(sum(1 for task in self.scrolling_tasks.values() if task.active))
+        canvases = self.wwt_canvas[:self.rows_per_page] + [self.news_canvas]
+        METRICS.canvas_items.set(sum(len(canvas.find_all()) for canvas in canvases))
+        if now >= self.metrics_summary_at:
+            self.metrics_summary_at = now + self.METRICS_SUMMARY_INTERVAL_SEC
+            scheduler_log.info(METRICS.summary_line())
+        self.metrics_probe_due = time.monotonic() + self.METRICS_PROBE_INTERVAL_MS / 1000
+        self.after(self.METRICS_PROBE_INTERVAL_MS, self.schedule_metrics_probe)
+
+    # メモリ管理：RSS・Canvas アイテム数・after() の予約数を確認し、取得していなければ若い世代を回収
+    def schedule_memory_check(self):
+        if not self.running:
+            return
+        if not self.memory.tuned: # 起動処理(ウィジェット作成・最初の取得)の後に1回
+            self.memory.tune_gc()
+        self.memory.check(widget_census(self.master))
+        if not self.fetch_engine.busy and self.news_future is None:
+            self.memory.collect_idle()
+        self.after(self.MEMORY_CHECK_INTERVAL_MS, self.schedule_memory_check)
+
+    # メモリの使用状況(ウィジェット毎の after() の予約数・Canvas アイテム数など)を表示
+    def print_memory_report(self, event=None):
+        report = self.memory.check(widget_census(self.master))
+        ui_log.info("メモリ：\n%s", self.memory.format_report(report))
+                        
+# 残りのウィジェット作成( mainframeのcreate_widgets の最後に追加)
+def add_news_display_to_mainframe(main_frame_instance: MainFrame):
+    # 表示行は路線設定の変更で増減するため, 最大の行数の下に配置する(空いた行は高さ0)
+    num_trains = main_frame_instance.MAX_ROWS_PER_PAGE
+    base_row_for_trains = 2 # 運行情報の表示開始行
+
+    # ニュース表示エリアの上罫線
+    news_separator = ttk.Separator(main_frame_instance, orient=HORIZONTAL)
+    # 最後の路線の下の罫線の row + 1 に配置
+    last_train_content_row = base_row_for_trains + (((num_trains - 1) * 3) + 1 if num_trains > 0 else base_row_for_trains - 1)
+    # 最後の路線の下の罫線は last_train_content_row + 1 に配置
+    news_separator_row = last_train_content_row + 2
+    news_separator.grid(row=news_separator_row, column=0, columnspan=3, sticky="ew", pady=(5,1))
+    
+    # ニュース表示フレーム
+    news_display_row = news_separator_row + 1
+    main_frame_instance.news_frame = Frame(main_frame_instance, bg="AntiqueWhite2") # 背景色
+    main_frame_instance.news_frame.grid(row=news_display_row, column=0, columnspan=3, sticky="news")
+    
+    layout_cache = main_frame_instance.layout_cache
+    news_canvas_height = layout_cache.line_height(main_frame_instance.news_font_object) + 10 # 余白を追加
+    main_frame_instance.news_canvas = Canvas(
+                                        main_frame_instance.news_frame,
+                                        bg="ivory2",
+                                        height=news_canvas_height,
+                                        highlightthickness=0
+                                        ) # 精一杯, 高さを固定
+    main_frame_instance.news_canvas.pack(
+                                        fill=X,
+                                        expand=False,
+                                        padx=10,
+                                        pady=5
+                                        )
+    # サイズを保持するため configure をバインド
+    main_frame_instance.news_canvas.bind(
+        "<Configure>",
+        lambda event,
+        c=main_frame_instance.news_canvas,
+        key=main_frame_instance.news_scroll_task_key: main_frame_instance._on_canvas_configure(event, c, key)
+    )
+    
+    main_frame_instance.rowconfigure(news_separator_row, weight=0)
+    main_frame_instance.rowconfigure(news_display_row, weight=0) # ニュース表示フレームの高さを固定
+    
+    
+# 画面を起動する(メインループを抜けるまで戻らない)
+# upstream: 配信サーバーの URL または共有ファイル(指定すると自分では取得しない)
+# memory_trace: tracemalloc でメモリを確保した箇所を記録する(調査用, 遅くなる)
+def main(lines=None, config_path=None, upstream=None, memory_trace=False):
+    STARTUP.mark("imports") # ここまでが import の時間
+    setup_logging()
+    # メインウィンドウ作成
+    root = Tk()
+
+    # メインウィンドウサイズ(最低ライン)
+    root.geometry("1300x700")
+    # ウィンドウサイズを固定
+    root.resizable(False, False)
+    # メインウィンドウタイトル
+    root.title("列車運行情報")
+
+    # --- ↓↓↓ 任意 --- 
+    # アイコン画像とパスを設定：かなり小さくなるが任意のiconに変更可能
+    # icon_path = os.path.join(APP_DIR, "任意の .ico ファイル")
+    # アイコンをウィンドウに設定
+    # root.iconbitmap(icon_path)
+    # --- ↑↑↑ ここまで ---
+
+    # メインフレームを配置
+    app = MainFrame(root, lines=lines, config_path=config_path, upstream=upstream, memory_trace=memory_trace) # MainFrame をインスタンス化
+    app.pack(side=TOP, expand=1, fill=BOTH) # メインフレームを配置
+    STARTUP.mark("widgets")
+    # 最初の描画が終わった時点(描画は先に登録された idle 処理で行われる)
+    root.after_idle(STARTUP.mark, "first_paint")
+
+    # 起動時点で最前面表示
+    root.attributes("-fullscreen", False) # フルスクリーン解除状態
+    # ウインドウ"✖"ボタンによる終了
+    root.protocol("WM_DELETE_WINDOW", app.on_close)
+    # Qキーによる終了
+    root.bind("<q>", app.on_close)
+    # Escキーによる終了
+    root.bind("<Escape>", app.on_close)
+    # Fキーによるフルスクリーン
+    root.bind("<f>", app.toggle_fullscreen)
+    # Mキーによるウィンドウサイズ最小化
+    # (タスクバーに格納)
+    root.bind("<m>", app.minimize_window)
+
+    # --- ↓↓↓ 使用機器によっては復元不可(とりあえず残す) ---
+    # Nキーによるウィンドウ最小化からの復元
+    # (タスクバーからの復元)
+    # root.bind("<n>", app.restore_window_from_minimize)
+    # --- ↑↑↑ ここまで ---
+
+    # Rキーによるウィンドウサイズを元に戻す
+    root.bind("<r>", app.restore_to_original_size)
+    # Sキーで路線毎の次回取得時刻を表示(コンソール)
+    root.bind("<s>", app.print_poll_stats)
+    # Hキーで路線毎のトラブル時間と最近の状況の変化を表示(コンソール)
+    root.bind("<h>", app.print_history)
+    # Lキーで直近のログを書き出す( cache/logs/ )
+    root.bind("<l>", app.dump_recent_logs)
+    # Gキーでメモリの使用状況を表示(コンソール)
+    root.bind("<g>", app.print_memory_report)
+
+    # 定期更新スケジュール
+    # 初回起動時はUIが安定するまで少し遅延させてから開始
+    # サイズ確定後, text 位置が計算され text 表示されるまで少し遅延させる
+    # 路線情報更新
+    if app.feed is not None:
+        # 購読モード：路線・ニュースとも配信された変更だけを反映する
+        root.after(100, app.schedule_feed_drain)
+    else:
+        root.after(100, app.schedule_updates) # 100ミリ秒後に初回更新
+        # ニュース表示エリアを mainframe に追加
+        # add_news_display_to_mainframe は mainframe.create_widgets 内で呼び出される
+        root.after(500, app.schedule_news_updates) # 500ミリ秒後に初回ニュース更新
+    # 路線が1ページに収まらない場合のページ切り替え
+    root.after(app.PAGE_ROTATE_INTERVAL_MS, app.schedule_page_rotation)
+    # 路線設定ファイルの変更確認
+    root.after(app.REGISTRY_POLL_INTERVAL_MS, app.schedule_registry_reload)
+    # 計測(after() の遅れ・ティッカー数)
+    root.after(app.METRICS_PROBE_INTERVAL_MS, app.schedule_metrics_probe)
+    # メモリの確認(最初の確認で GC を設定するため, 最初の取得が終わる頃から)
+    root.after(app.MEMORY_CHECK_INTERVAL_MS, app.schedule_memory_check)
+
+    # メインループ
+    root.mainloop()
+    shutdown_logging() # 書き込み待ちのログを出力
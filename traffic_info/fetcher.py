@@ -0,0 +1,186 @@
+"""
+運行情報のバックグラウンド取得エンジン
+
+全路線のページをスレッドプールで同時に取得・解析し、
+結果をキューに積む。UI 側は after() でキューを取り出して反映する
+(Tk のウィジェットは UI スレッド以外から触らないこと)
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .metrics import METRICS
+from .parsers import StatusExtractor, extract_train_status
+
+
+# 1路線分の取得結果
+class FetchResult:
+    __slots__ = ("cycle_id", "key", "value", "error", "elapsed")
+
+    def __init__(self, cycle_id, key, value=None, error=None, elapsed=0.0):
+        self.cycle_id = cycle_id # どの更新サイクルの結果か
+        self.key = key # 路線名など、呼び出し側が指定したキー
+        self.value = value # fetch_func の戻り値
+        self.error = error # 例外が発生した場合はその例外
+        self.elapsed = elapsed # 取得にかかった秒数
+
+
+# 更新サイクル完了の通知
+class CycleDone:
+    __slots__ = ("cycle_id", "elapsed")
+
+    def __init__(self, cycle_id, elapsed):
+        self.cycle_id = cycle_id
+        self.elapsed = elapsed
+
+
+# 路線ページを解析して解析時間を記録する
+def _extract_timed(html):
+    started = time.perf_counter()
+    try:
+        return extract_train_status(html)
+    finally:
+        METRICS.status_parse_seconds.observe(time.perf_counter() - started)
+
+
+# 路線ページを取得して運行状況を返す(ワーカースレッドで実行)
+# transport (HttpTransport) を渡すと共有セッションと条件付き GET を使い、
+# 本文は少しずつ読みながら解析して、状況の <dd> を読み終えた時点で接続を閉じる(本文全体は保持しない)
+# timeout: 通信のタイムアウト秒 (接続, 読み込み)。None は無制限なので通常は指定する
+def fetch_line_status(url, transport=None, timeout=(3.05, 10.0)):
+    if transport is None:
+        import requests
+        web_requests = requests.get(url, timeout=timeout)
+        web_requests.raise_for_status() # ステータスコードが4xx or 5xxの場合は例外を発生
+        return _extract_timed(web_requests.text)
+    response = transport.get_extracted(url, StatusExtractor, timeout=timeout)
+    # 304 (変更なし) の場合は前回の解析結果をそのまま使う
+    if not response.not_modified:
+        METRICS.status_parse_seconds.observe(response.parse_seconds)
+    return response.page.parsed
+
+
+class FetchEngine:
+
+    # コンストラクタ
+    # job_timeout: 1件の持ち時間(秒)。取得開始からこの秒数を過ぎた路線は TimeoutError の結果にして
+    #              サイクルを終わらせる(遅れて届いた結果は捨てる)。None は無制限
+    def __init__(self, fetch_func=fetch_line_status, max_workers=4, job_timeout=None):
+        self.fetch_func = fetch_func
+        self.max_workers = max(1, int(max_workers)) # 同時取得数の上限
+        self.job_timeout = job_timeout
+        self.results = queue.Queue() # UI スレッドへ渡す結果キュー
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="traffic_fetch")
+        self._cycle_id = 0
+        self._cycle_started = 0.0
+        self._remaining = 0
+        self._waiting = set() # 今のサイクルで結果待ちのキー
+        self._started = {} # (サイクルID, キー) -> 取得開始時刻(ワーカースレッドが書き込む)
+        self._started_lock = threading.Lock()
+        self._closed = False
+
+    # 取得中のサイクルがあるか
+    @property
+    def busy(self):
+        return self._remaining > 0
+
+    # jobs ( {キー: URL} ) をまとめて取得する。サイクルIDを返す
+    def submit_cycle(self, jobs):
+        if self._closed:
+            return None
+        self._cycle_id += 1
+        cycle_id = self._cycle_id
+        self._cycle_started = time.monotonic()
+        self._remaining = len(jobs)
+        self._waiting = set(jobs)
+        with self._started_lock:
+            self._started = {}
+        if not jobs:
+            self.results.put(CycleDone(cycle_id, 0.0))
+            return cycle_id
+        for key, url in jobs.items():
+            self._executor.submit(self._run_job, cycle_id, key, url)
+        return cycle_id
+
+    # ワーカースレッドで1路線分を処理
+    def _run_job(self, cycle_id, key, url):
+        started = time.monotonic()
+        with self._started_lock:
+            self._started[(cycle_id, key)] = started
+        try:
+            value = self.fetch_func(url)
+            result = FetchResult(cycle_id, key, value=value, elapsed=time.monotonic() - started)
+        except Exception as e: # 1路線の失敗で他の路線を止めない
+            result = FetchResult(cycle_id, key, error=e, elapsed=time.monotonic() - started)
+            METRICS.fetch_errors.inc()
+        METRICS.fetch_seconds.observe(result.elapsed)
+        self.results.put(result)
+
+    # キューから取り出した1件を振り分ける(古いサイクル・持ち時間切れ後の結果は捨てる)
+    def _accept(self, item, items):
+        if isinstance(item, FetchResult) and item.cycle_id == self._cycle_id and item.key in self._waiting:
+            self._waiting.discard(item.key)
+            self._remaining -= 1
+            items.append(item)
+            if self._remaining == 0:
+                items.append(CycleDone(item.cycle_id, time.monotonic() - self._cycle_started))
+                return True
+        elif isinstance(item, CycleDone):
+            items.append(item)
+            return True
+        return False
+
+    # 持ち時間を過ぎた路線を TimeoutError の結果にする。サイクルが終わったら True
+    def _expire(self, items):
+        if self.job_timeout is None or not self._waiting:
+            return False
+        now = time.monotonic()
+        cycle_id = self._cycle_id
+        with self._started_lock:
+            started = dict(self._started)
+        finished = False
+        for key in list(self._waiting):
+            job_started = started.get((cycle_id, key))
+            if job_started is not None and now - job_started > self.job_timeout:
+                error = TimeoutError(f"{self.job_timeout:.0f}秒以内に取得できませんでした")
+                finished = self._accept(FetchResult(cycle_id, key, error=error, elapsed=now - job_started), items)
+        return finished
+
+    # キューに溜まった結果を取り出す(UI スレッドから呼ぶ)
+    def drain(self):
+        items = []
+        while True:
+            try:
+                item = self.results.get_nowait()
+            except queue.Empty:
+                break
+            self._accept(item, items)
+        self._expire(items)
+        return items
+
+    # 今のサイクルが終わるまで待って結果を返す(UI を持たない場合用)
+    def wait_cycle(self, timeout=None):
+        items = []
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            wait = remaining
+            if self.job_timeout is not None: # 持ち時間切れを確認するため定期的に起きる
+                wait = 0.5 if remaining is None else min(remaining, 0.5)
+            try:
+                item = self.results.get(timeout=wait)
+            except queue.Empty:
+                if self._expire(items):
+                    return items
+                if remaining is not None and deadline - time.monotonic() <= 0:
+                    return items # 時間切れ(CycleDone は含まれない)
+                continue
+            if self._accept(item, items) or self._expire(items):
+                return items
+
+    # 終了処理(未着手のジョブは破棄)
+    def shutdown(self):
+        self._closed = True
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,348 @@
+"""
+運行状況の履歴(メモリ上のリングバッファ + 追記のみのファイル)
+
+取得した運行状況を1件ずつ記録する。路線名と状況は小さな整数に置き換えて( intern )
+array に詰めるので、数百路線を1分毎に何か月記録してもメモリは一定量で済む
+    観測      : 最新 observation_capacity 件(全路線共通のリング)
+    状況の変化: 路線毎に最新 transition_capacity 件(障害の開始・終了, 日毎のトラブル時間の計算用)
+ファイル( history_dir )
+    observations-YYYYMMDD.bin : 観測 (時刻, 路線ID, 状況ID) を日毎に追記
+    transitions.bin           : 状況の変化を追記(起動時はこのファイルだけ読み込む)
+    index.json                : 路線名・状況の一覧(ID 順)と路線毎の最終観測時刻
+"""
+
+import json
+import os
+import struct
+import time
+from array import array
+from datetime import date, datetime, timedelta
+
+# 履歴の既定の保存先(アプリケーションのフォルダの cache/history)
+DEFAULT_HISTORY_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache", "history")
+RECORD = struct.Struct("<IHB") # 時刻(UNIX秒), 路線ID, 状況ID (7 bytes)
+UNKNOWN = "unknown" # 観測が途切れていた期間
+
+
+# array を列にした固定長のリングバッファ
+class _Ring:
+    __slots__ = ("capacity", "columns", "start", "size")
+
+    def __init__(self, capacity, typecodes):
+        self.capacity = capacity
+        self.columns = [array(code, bytes(array(code).itemsize * capacity)) for code in typecodes]
+        self.start = 0 # 最も古い要素の位置
+        self.size = 0
+
+    def append(self, *values):
+        index = (self.start + self.size) % self.capacity
+        if self.size < self.capacity:
+            self.size += 1
+        else: # 一杯なら最も古い要素を上書き
+            self.start = (self.start + 1) % self.capacity
+        for column, value in zip(self.columns, values):
+            column[index] = value
+
+    # i 番目(0 が最も古い)の要素
+    def row(self, i):
+        index = (self.start + i) % self.capacity
+        return tuple(column[index] for column in self.columns)
+
+    # 古い順
+    def rows(self):
+        for i in range(self.size):
+            yield self.row(i)
+
+    # 新しい順に最大 n 件
+    def tail(self, n):
+        for i in range(self.size - 1, max(-1, self.size - 1 - n), -1):
+            yield self.row(i)
+
+    # メモリ使用量(bytes)
+    def nbytes(self):
+        return sum(column.itemsize * len(column) for column in self.columns)
+
+
+class StatusHistory:
+
+    # コンストラクタ
+    # history_dir: 保存先(None ならメモリのみ)
+    # gap_seconds: この秒数以上観測が無かった路線は、その間を unknown として扱う
+    # keep_days: 観測ファイルを残す日数
+    def __init__(
+        self,
+        history_dir=None,
+        observation_capacity=1 << 18,
+        transition_capacity=4096,
+        recent_capacity=4096,
+        gap_seconds=3600,
+        keep_days=90,
+    ):
+        self.history_dir = history_dir
+        self.transition_capacity = transition_capacity
+        self.gap_seconds = gap_seconds
+        self.keep_days = keep_days
+        self.line_names = [] # 路線ID -> 路線名
+        self.line_ids = {} # 路線名 -> 路線ID
+        self.status_names = [UNKNOWN] # 状況ID -> 状況
+        self.status_ids = {UNKNOWN: 0}
+        self.observations = _Ring(observation_capacity, "IHB")
+        self.recent = _Ring(recent_capacity, "IHB") # 全路線の状況の変化(新しい順の問い合わせ用)
+        self.transitions = [] # 路線ID -> _Ring (時刻, 状況ID)
+        self.last_status = [] # 路線ID -> 最後の状況ID
+        self.last_seen = [] # 路線ID -> 最後の観測時刻
+        self._observation_file = None
+        self._observation_day = None
+        self._transition_file = None
+        self._index_dirty = False
+
+    # --- ↓↓↓ ID 化 ---
+    def _line_id(self, name):
+        line_id = self.line_ids.get(name)
+        if line_id is None:
+            line_id = len(self.line_names)
+            self.line_names.append(name)
+            self.line_ids[name] = line_id
+            self.transitions.append(_Ring(self.transition_capacity, "IB"))
+            self.last_status.append(0)
+            self.last_seen.append(0)
+            self._index_dirty = True
+        return line_id
+
+    def _status_id(self, status):
+        status_id = self.status_ids.get(status)
+        if status_id is None:
+            status_id = len(self.status_names)
+            self.status_names.append(status)
+            self.status_ids[status] = status_id
+            self._index_dirty = True
+        return status_id
+    # --- ↑↑↑ ここまで ---
+
+    # 保存済みの履歴を読み込む(状況の変化のみ。古い観測ファイルは削除)
+    def load(self):
+        if self.history_dir is None:
+            return self
+        try:
+            with open(os.path.join(self.history_dir, "index.json"), encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return self
+        for name in index.get("lines", []):
+            self._line_id(name)
+        for status in index.get("statuses", [])[1:]:
+            self._status_id(status)
+        try:
+            with open(os.path.join(self.history_dir, "transitions.bin"), "rb") as f:
+                data = f.read()
+        except OSError:
+            data = b""
+        usable = len(data) - len(data) % RECORD.size # 書きかけの末尾は無視
+        for timestamp, line_id, status_id in RECORD.iter_unpack(data[:usable]):
+            if line_id < len(self.line_names) and status_id < len(self.status_names):
+                self._add_transition(timestamp, line_id, status_id)
+        for key, timestamp in (index.get("last_seen") or {}).items():
+            line_id = int(key)
+            if line_id < len(self.last_seen):
+                self.last_seen[line_id] = int(timestamp)
+        self._index_dirty = False
+        self._remove_old_files()
+        return self
+
+    # 状況の変化をメモリに追加
+    def _add_transition(self, timestamp, line_id, status_id):
+        self.transitions[line_id].append(timestamp, status_id)
+        self.recent.append(timestamp, line_id, status_id)
+        self.last_status[line_id] = status_id
+
+    # 状況の変化を記録(ファイルにも追記)
+    def _transition(self, timestamp, line_id, status_id):
+        self._add_transition(timestamp, line_id, status_id)
+        if self.history_dir is not None:
+            if self._transition_file is None:
+                os.makedirs(self.history_dir, exist_ok=True)
+                self._transition_file = open(os.path.join(self.history_dir, "transitions.bin"), "ab")
+            self._transition_file.write(RECORD.pack(timestamp, line_id, status_id))
+
+    # 1件の観測を記録する。状況が変わった場合は True
+    def record(self, name, status, timestamp=None):
+        timestamp = int(time.time() if timestamp is None else timestamp)
+        line_id = self._line_id(name)
+        status_id = self._status_id(status)
+        last_seen = self.last_seen[line_id]
+        if last_seen and timestamp - last_seen >= self.gap_seconds and self.last_status[line_id] != 0:
+            # 観測が途切れていた間(アプリ停止中など)は不明とする
+            self._transition(last_seen, line_id, 0)
+        changed = self.last_status[line_id] != status_id
+        if changed:
+            self._transition(timestamp, line_id, status_id)
+        self.last_seen[line_id] = timestamp
+        self._index_dirty = True
+        self.observations.append(timestamp, line_id, status_id)
+        if self.history_dir is not None:
+            self._observation_log(timestamp).write(RECORD.pack(timestamp, line_id, status_id))
+        return changed
+
+    # 観測ファイル(日毎)
+    def _observation_log(self, timestamp):
+        day = date.fromtimestamp(timestamp)
+        if day != self._observation_day:
+            if self._observation_file is not None:
+                self._observation_file.close()
+            os.makedirs(self.history_dir, exist_ok=True)
+            path = os.path.join(self.history_dir, f"observations-{day:%Y%m%d}.bin")
+            self._observation_file = open(path, "ab")
+            self._observation_day = day
+            self._remove_old_files()
+        return self._observation_file
+
+    # keep_days より古い観測ファイルを削除
+    def _remove_old_files(self):
+        oldest = f"observations-{date.today() - timedelta(days=self.keep_days):%Y%m%d}.bin"
+        try:
+            names = os.listdir(self.history_dir)
+        except OSError:
+            return
+        for file_name in names:
+            if file_name.startswith("observations-") and file_name < oldest:
+                try:
+                    os.remove(os.path.join(self.history_dir, file_name))
+                except OSError:
+                    pass
+
+    # ファイルへ書き出す(更新サイクル毎に呼ぶ)
+    def flush(self):
+        if self.history_dir is None:
+            return
+        for f in (self._observation_file, self._transition_file):
+            if f is not None:
+                f.flush()
+        if self._index_dirty:
+            index = {
+                "lines": self.line_names,
+                "statuses": self.status_names,
+                "last_seen": {str(i): t for i, t in enumerate(self.last_seen) if t},
+            }
+            os.makedirs(self.history_dir, exist_ok=True)
+            path = os.path.join(self.history_dir, "index.json")
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(index, f, ensure_ascii=False)
+            os.replace(path + ".tmp", path)
+            self._index_dirty = False
+
+    def close(self):
+        self.flush()
+        for f in (self._observation_file, self._transition_file):
+            if f is not None:
+                f.close()
+        self._observation_file = None
+        self._transition_file = None
+
+    # --- ↓↓↓ 問い合わせ ---
+    # 最新 n 件の状況の変化 [(datetime, 路線名, 状況), ...] (新しい順, name 指定でその路線のみ)
+    def recent_transitions(self, n=20, name=None):
+        if name is not None:
+            line_id = self.line_ids.get(name)
+            if line_id is None:
+                return []
+            return [
+                (datetime.fromtimestamp(t), name, self.status_names[s])
+                for t, s in self.transitions[line_id].tail(n)
+            ]
+        return [
+            (datetime.fromtimestamp(t), self.line_names[line_id], self.status_names[s])
+            for t, line_id, s in self.recent.tail(n)
+        ]
+
+    # 路線の状況が続いた期間 [(開始, 終了, 状況ID), ...] (UNIX秒, 古い順)
+    # 最後の期間は観測が続いていれば now まで, 途切れていれば最後の観測時刻まで
+    def _spans(self, line_id, now):
+        ring = self.transitions[line_id]
+        spans = []
+        previous = None
+        for timestamp, status_id in ring.rows():
+            if previous is not None:
+                spans.append((previous[0], timestamp, previous[1]))
+            previous = (timestamp, status_id)
+        if previous is not None:
+            last_seen = self.last_seen[line_id]
+            end = now if now - last_seen < self.gap_seconds else last_seen
+            spans.append((previous[0], max(previous[0], end), previous[1]))
+        return spans
+
+    # 障害(トラブル)の期間 [(開始, 終了), ...] (datetime, 続いている場合の終了は None)
+    def outages(self, name, since=None, status="trouble", now=None):
+        line_id = self.line_ids.get(name)
+        status_id = self.status_ids.get(status)
+        if line_id is None or status_id is None:
+            return []
+        now = int(time.time() if now is None else now)
+        since_ts = since.timestamp() if since is not None else 0
+        current = self.last_status[line_id] == status_id and now - self.last_seen[line_id] < self.gap_seconds
+        spans = [span for span in self._spans(line_id, now) if span[2] == status_id and span[1] >= since_ts]
+        result = []
+        for i, (start, end, _) in enumerate(spans):
+            ongoing = current and i == len(spans) - 1
+            result.append((datetime.fromtimestamp(start), None if ongoing else datetime.fromtimestamp(end)))
+        return result
+
+    # 日毎のトラブル時間(分) {date: 分} (直近 days 日)
+    def trouble_minutes_by_day(self, name, days=7, status="trouble", now=None):
+        now = int(time.time() if now is None else now)
+        today = date.fromtimestamp(now)
+        result = {today - timedelta(days=i): 0.0 for i in range(days - 1, -1, -1)}
+        line_id = self.line_ids.get(name)
+        status_id = self.status_ids.get(status)
+        if line_id is None or status_id is None:
+            return result
+        first_day = today - timedelta(days=days - 1)
+        for start, end, span_status in self._spans(line_id, now):
+            if span_status != status_id:
+                continue
+            # 日付をまたぐ期間は日毎に分ける
+            while start < end:
+                day = date.fromtimestamp(start)
+                next_midnight = time.mktime((day + timedelta(days=1)).timetuple())
+                chunk_end = min(end, next_midnight)
+                if day >= first_day:
+                    result[day] = result.get(day, 0.0) + (chunk_end - start) / 60
+                start = chunk_end
+        return result
+
+    # 路線の最新の観測 [(datetime, 状況), ...] (新しい順, 最大 n 件)
+    def recent_observations(self, name, n=20):
+        line_id = self.line_ids.get(name)
+        if line_id is None:
+            return []
+        result = []
+        for t, observed_line, s in self.observations.tail(self.observations.size):
+            if observed_line == line_id:
+                result.append((datetime.fromtimestamp(t), self.status_names[s]))
+                if len(result) >= n:
+                    break
+        return result
+
+    # 路線毎の障害の状況を表示用の文字列にする
+    def summary(self, names=None, days=7, transitions=10):
+        names = self.line_names if names is None else list(names)
+        rows = [f"直近{days}日のトラブル時間(分)"]
+        for name in names:
+            minutes = self.trouble_minutes_by_day(name, days)
+            daily = " ".join(f"{day:%m/%d}:{value:.0f}" for day, value in minutes.items())
+            outages = self.outages(name)
+            current = "  ※トラブル継続中" if outages and outages[-1][1] is None else ""
+            rows.append(f"  {name}：{daily} (計 {sum(minutes.values()):.0f}分){current}")
+        rows.append(f"最近の状況の変化({transitions}件)")
+        for when, name, status in self.recent_transitions(transitions):
+            rows.append(f"  {when:%m/%d %H:%M} {name} → {status}")
+        return "\n".join(rows)
+
+    # メモリ使用量などの統計
+    def stats(self):
+        return {
+            "lines": len(self.line_names),
+            "observations": self.observations.size,
+            "transitions": sum(ring.size for ring in self.transitions),
+            "bytes": self.observations.nbytes() + self.recent.nbytes() + sum(r.nbytes() for r in self.transitions),
+        }
+    # --- ↑↑↑ ここまで ---
@@ -0,0 +1,75 @@
+"""
+路線情報アイコンの読み込み(リサイズ済みアイコンのキャッシュ)
+
+起動の度に PIL で LANCZOS リサイズするのをやめ、リサイズ済みの PNG を
+cache/icons/ に保存して次回から再利用する。ファイル名に元画像の内容のハッシュを含めるので、
+元画像を差し替えると自動で作り直される。
+キャッシュがあれば PIL を import せずに tkinter.PhotoImage で直接読み込む
+"""
+
+import hashlib
+import os
+import re
+
+from .logs import get_logger
+
+ui_log = get_logger("ui")
+
+ICON_SIZE = (64, 64) # 路線情報アイコンの大きさ
+
+
+# 元画像の内容のハッシュ(先頭12桁)
+def _content_hash(source_path):
+    with open(source_path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()[:12]
+
+
+# キャッシュ済みアイコンのパスを返す(無ければ作成する)
+def cached_icon_path(source_path, cache_dir, size=ICON_SIZE):
+    base_name = os.path.splitext(os.path.basename(source_path))[0]
+    digest = _content_hash(source_path)
+    file_name = f"{base_name}-{digest}-{size[0]}x{size[1]}.png"
+    cache_path = os.path.join(cache_dir, file_name)
+    if os.path.exists(cache_path):
+        return cache_path
+
+    from PIL import Image # キャッシュが無い場合のみ
+
+    os.makedirs(cache_dir, exist_ok=True)
+    with Image.open(source_path) as image:
+        resized = image.convert("RGBA").resize(size, Image.LANCZOS)
+    # 書き込み途中のファイルを読まないよう、一時ファイルに書いてから置き換える
+    tmp_path = cache_path + ".tmp"
+    resized.save(tmp_path, format="PNG")
+    os.replace(tmp_path, cache_path)
+
+    # 同じ元画像の古いキャッシュ(内容が変わる前のもの)を削除
+    # ( train の時に train-night のキャッシュを消さないよう、名前の形式 <元の名前>-<ハッシュ12桁>-<幅>x<高さ>.png で判定)
+    old_pattern = re.compile(rf"{re.escape(base_name)}-[0-9a-f]{{12}}-{size[0]}x{size[1]}\.png")
+    for old_name in os.listdir(cache_dir):
+        if old_name != file_name and old_pattern.fullmatch(old_name):
+            try:
+                os.remove(os.path.join(cache_dir, old_name))
+            except OSError:
+                pass
+    return cache_path
+
+
+# アイコンを Tk の PhotoImage として読み込む(読み込めない場合は None: アイコン無しで表示する)
+def load_icon(master, source_path, cache_dir, size=ICON_SIZE):
+    import tkinter
+
+    try:
+        path = cached_icon_path(source_path, cache_dir, size)
+    except (ImportError, OSError) as e:
+        # PIL が無い・キャッシュを書き込めない場合は PIL で直接リサイズ
+        ui_log.warning("アイコンのキャッシュを作成できませんでした：%s", e)
+        try:
+            from PIL import Image, ImageTk
+
+            with Image.open(source_path) as image:
+                return ImageTk.PhotoImage(image.resize(size, Image.LANCZOS), master=master)
+        except (ImportError, OSError) as e: # PIL が無く、キャッシュも無い
+            ui_log.warning("アイコンを読み込めませんでした(アイコン無しで表示します)：%s %s", source_path, e)
+            return None
+    return tkinter.PhotoImage(file=path, master=master)
@@ -0,0 +1,103 @@
+"""
+文字列の計測・レイアウトのキャッシュ
+
+font.measure() / font.actual() / font.metrics() は毎回 Tcl への問い合わせになり、
+textwrap.wrap() も同じ路線名に対して何度も実行される。
+表示するテキストはほとんど変わらないので、結果を件数上限つきの LRU で保持する
+(キーは実際のフォント(font.actual())なので、フォントの大きさなどを変更すると別のキーになる。
+古い結果は LRU で押し出される。すぐに破棄する場合は invalidate_font() / clear())
+"""
+
+import textwrap
+from collections import OrderedDict
+
+
+class LayoutCache:
+
+    # コンストラクタ
+    def __init__(self, maxsize=256):
+        self.maxsize = max(1, int(maxsize))
+        self._entries = OrderedDict() # キー -> 値 (末尾が最近使ったもの)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # キャッシュにあれば返し、無ければ compute() の結果を保存して返す
+    def _get(self, key, compute):
+        entries = self._entries
+        if key in entries:
+            entries.move_to_end(key)
+            self.hits += 1
+            return entries[key]
+        self.misses += 1
+        value = compute()
+        entries[key] = value
+        if len(entries) > self.maxsize:
+            entries.popitem(last=False) # 一番古いものを破棄
+            self.evictions += 1
+        return value
+
+    # フォントを識別するキー(実際のフォントの属性)
+    # (名前付きフォントは configure() で変更しても名前が同じなので、名前ではなく font.actual() で区別する)
+    @staticmethod
+    def _font_key(font_object):
+        return tuple(sorted(font_object.actual().items()))
+
+    # テキストの幅(ピクセル)
+    def measure(self, font_object, text):
+        return self._get(
+            (self._font_key(font_object), "measure", text),
+            lambda: font_object.measure(text),
+        )
+
+    # フォントメトリクス(ascent / descent / linespace など)
+    def metrics(self, font_object):
+        return self._get(
+            (self._font_key(font_object), "metrics"),
+            lambda: font_object.metrics(),
+        )
+
+    # フォントの行の高さ(ascent + descent)
+    def line_height(self, font_object):
+        font_metrics = self.metrics(font_object)
+        return font_metrics["ascent"] + font_metrics["descent"]
+
+    # create_text 用の (family, size, weight) タプル
+    def font_spec(self, font_object):
+        def compute():
+            current_font_spec = font_object.actual() # フォント指定を取得(辞書)
+            return (
+                current_font_spec.get("family", "MS Gothic"),
+                current_font_spec.get("size", 24),
+                current_font_spec.get("weight", "normal"),
+            )
+        return self._get((self._font_key(font_object), "spec"), compute)
+
+    # 指定幅で折り返し、最大 max_lines 行に切り詰めた行のタプル
+    def wrap(self, text, width, max_lines=None):
+        return self._get(
+            ("wrap", width, max_lines, text),
+            lambda: tuple(textwrap.wrap(text, width=width)[:max_lines]),
+        )
+
+    # 指定フォントの結果を破棄(フォントのサイズなどを変更した場合)
+    def invalidate_font(self, font_object):
+        font_key = self._font_key(font_object)
+        for key in [key for key in self._entries if key[0] == font_key]:
+            del self._entries[key]
+
+    # すべて破棄
+    def clear(self):
+        self._entries.clear()
+
+    # 統計を辞書で返す
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
@@ -0,0 +1,197 @@
+"""
+エリア別の一覧ページからまとめて運行状況を取得する
+
+路線毎のページ( diainfo/<路線ID>/0 )を路線の数だけ取得する代わりに、
+LineConfig.area (Yahoo路線情報のエリア別一覧ページのURL)が設定された路線は
+    - 一覧ページは ttl 秒に1回だけ取得し(その間は同じエリアの路線で結果を共有)、路線ID・路線名で探す
+      (取得時刻は路線毎にずれる(PollScheduler)ので、サイクル毎ではなく時間で使い回す)
+    - 平常運転の路線は一覧だけで確定する
+    - トラブル中の路線は、詳細(全文)を路線のページから取得する(失敗した場合は一覧の要約を表示)
+    - 一覧に無い路線・一覧を取得できなかった場合は、路線のページを取得する
+      (取得できなかった一覧は error_ttl 秒後に取得し直す。他の路線が取得中の一覧は timeout まで待つ)
+area の無い路線は従来どおり路線のページを取得する
+一覧ページを取得した時は、取得時刻になっていない同じエリアの路線の結果も take_resolved() で渡す
+(呼び出し側で平常運転の路線はそのまま反映し、新たにトラブルになった路線は取得を早める)
+通信数は、エリアの数 x (経過時間 / ttl) + トラブル中・一覧に無い路線の数になる
+"""
+
+import threading
+import time
+from collections import namedtuple
+
+from .fetcher import fetch_line_status
+from .logs import get_logger
+from .metrics import METRICS
+from .parsers import ListingExtractor, line_id_from_url
+
+fetch_log = get_logger("fetch")
+
+LISTING_TTL_SEC = 60.0 # 一覧ページを使い回す秒数(トラブル中の路線の取得間隔と同じ)
+LISTING_ERROR_TTL_SEC = 5.0 # 取得できなかった一覧ページを取得し直すまでの秒数
+
+# 一覧ページで探す路線(路線ページのURL -> 探し方)
+ListingTarget = namedtuple("ListingTarget", ["area", "line_id", "name"])
+
+
+# 一覧ページ1件分の取得結果( ttl 秒の間共有)
+class _Listing:
+    __slots__ = ("fetched_at", "ready", "by_id", "by_name", "error")
+
+    def __init__(self, fetched_at):
+        self.fetched_at = fetched_at # 取得を始めた時刻
+        self.ready = threading.Event()
+        self.by_id = {}
+        self.by_name = {}
+        self.error = None
+
+
+class AreaStatusFetch:
+
+    # コンストラクタ
+    # transport: HttpTransport (一覧ページ・路線のページの両方に使う)
+    # lines: LineConfig のリスト(set_lines() で変更)
+    # detail: トラブル中の路線は路線のページから詳細を取得する( False は一覧の要約のまま)
+    # ttl: 一覧ページを使い回す秒数, error_ttl: 取得できなかった一覧ページを取得し直すまでの秒数
+    # clock: 現在時刻を返す関数(秒)
+    def __init__(self, transport, lines=(), detail=True, ttl=LISTING_TTL_SEC, error_ttl=LISTING_ERROR_TTL_SEC,
+                 clock=time.monotonic):
+        self.transport = transport
+        self.detail = detail
+        self.ttl = ttl
+        self.error_ttl = error_ttl
+        self.clock = clock
+        self._targets = {}
+        self._lock = threading.Lock()
+        self._listings = {} # 一覧ページのURL -> _Listing (最後に取得したもの)
+        self._resolved = {} # 路線名 -> (路線ページのURL, ListingEntry) (take_resolved() で渡す分)
+        self.set_lines(lines)
+        self.begin_cycle()
+
+    # 路線設定を変更(路線ページのURL -> 一覧ページ・路線ID・路線名)
+    def set_lines(self, lines):
+        targets = {}
+        for line in lines:
+            if line.area:
+                targets[line.url] = ListingTarget(line.area, line_id_from_url(line.url), line.name)
+        self._targets = targets
+
+    # エリアの数(一覧ページの数)
+    @property
+    def area_count(self):
+        return len({target.area for target in self._targets.values()})
+
+    # 更新サイクルの始めに呼ぶ(集計をリセット。一覧ページは ttl 秒が過ぎるまで使い回す)
+    def begin_cycle(self):
+        with self._lock:
+            self._listing_requests = 0 # 取得した一覧ページの数
+            self._listing_errors = 0
+            self._resolved_count = 0 # 一覧だけで確定した路線
+            self._detail = 0 # 詳細を路線のページから取得した路線
+            self._unresolved = 0 # 一覧に無い・一覧を取得できなかった路線
+            self._direct = 0 # area の無い路線
+
+    # 今のサイクルの集計
+    def cycle_stats(self):
+        with self._lock:
+            return {
+                "listing_requests": self._listing_requests,
+                "listing_errors": self._listing_errors,
+                "resolved": self._resolved_count,
+                "detail": self._detail,
+                "unresolved": self._unresolved,
+                "direct": self._direct,
+            }
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    # 一覧ページの結果を返す( ttl 秒を過ぎていれば最初に呼んだスレッドだけが取得し、他は結果を待つ)
+    # 取得中の結果を timeout 以内に得られない場合は None
+    def _listing(self, area, timeout):
+        with self._lock:
+            now = self.clock()
+            listing = self._listings.get(area)
+            owner = listing is None or (
+                listing.ready.is_set()
+                and now - listing.fetched_at >= (self.error_ttl if listing.error is not None else self.ttl)
+            )
+            if owner:
+                listing = _Listing(now)
+                self._listings[area] = listing
+                self._listing_requests += 1
+        if not owner:
+            # 取得中のスレッドが止まっても待ち続けないよう、通信のタイムアウト(接続 + 読み込み)までで諦める
+            wait_sec = sum(timeout) if isinstance(timeout, tuple) else timeout
+            return listing if listing.ready.wait(wait_sec) else None
+        try:
+            response = self.transport.get_extracted(area, ListingExtractor, timeout=timeout)
+            for entry in response.page.parsed:
+                if entry.line_id is not None:
+                    listing.by_id.setdefault(entry.line_id, entry)
+                listing.by_name.setdefault(entry.name, entry)
+            if not response.not_modified:
+                METRICS.status_parse_seconds.observe(response.parse_seconds)
+            self._share(area, listing)
+        except Exception as e: # 一覧が取れなくても路線のページで取得できる
+            listing.error = e
+            self._count("_listing_errors")
+            fetch_log.warning("一覧ページを取得できませんでした(路線毎に取得します)：%s %s", area, e)
+        finally:
+            listing.ready.set()
+        return listing
+
+    # 取得した一覧で分かる同じエリアの路線を記録する( take_resolved() で渡す)
+    def _share(self, area, listing):
+        resolved = {}
+        for url, target in list(self._targets.items()):
+            if target.area != area:
+                continue
+            entry = self._lookup(listing, target)
+            if entry is not None:
+                resolved[target.name] = (url, entry)
+        with self._lock:
+            self._resolved.update(resolved)
+
+    # 前回から取得した一覧で分かった路線 {路線名: (路線ページのURL, ListingEntry)} を返す
+    # (取得時刻になっていない路線にも反映するため。トラブル中の行は一覧の要約)
+    def take_resolved(self):
+        with self._lock:
+            resolved, self._resolved = self._resolved, {}
+        return resolved
+
+    @staticmethod
+    def _lookup(listing, target):
+        entry = listing.by_id.get(target.line_id) if target.line_id is not None else None
+        if entry is None:
+            entry = listing.by_name.get(target.name)
+        return entry
+
+    # 路線ページのURLの運行状況 (status, trouble_text) を返す(ワーカースレッドで実行)
+    # ResilientFetch の fetch_func として使う(再試行しても一覧ページは ttl 秒に1回だけ取得)
+    def __call__(self, url, timeout=(3.05, 10.0)):
+        target = self._targets.get(url)
+        if target is None:
+            self._count("_direct")
+            return fetch_line_status(url, transport=self.transport, timeout=timeout)
+        listing = self._listing(target.area, timeout)
+        entry = self._lookup(listing, target) if listing is not None else None
+        if entry is None:
+            if listing is None:
+                fetch_log.debug("一覧ページの取得を待ちきれませんでした(路線のページを取得します)：%s %s", target.name, target.area)
+            elif listing.error is None:
+                fetch_log.debug("一覧ページに路線がありません：%s %s", target.name, target.area)
+            self._count("_unresolved")
+            METRICS.listing_fallbacks.inc()
+            return fetch_line_status(url, transport=self.transport, timeout=timeout)
+        if entry.status == "normal" or not self.detail:
+            self._count("_resolved_count")
+            METRICS.listing_resolved.inc()
+            return entry.status, entry.text
+        # トラブル中: 一覧は要約なので路線のページから詳細を取得する
+        self._count("_detail")
+        try:
+            return fetch_line_status(url, transport=self.transport, timeout=timeout)
+        except Exception as e:
+            fetch_log.warning("詳細を取得できませんでした(一覧の要約を表示します)：%s %s", target.name, e)
+            return entry.status, entry.text
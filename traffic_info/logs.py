@@ -0,0 +1,173 @@
+"""
+ログ出力(画面のスレッドを止めない)
+
+print() の代わりに分野毎のロガーを使う
+    traffic_info.fetch      取得(通信・再試行・エラー)
+    traffic_info.parse      解析(ニュースのセレクタなど)
+    traffic_info.ui         画面(ページ・ウィンドウ操作・保存)
+    traffic_info.news       ニュースの更新
+    traffic_info.scheduler  取得間隔・定期処理
+    traffic_info.server     配信サーバー・購読
+    traffic_info.memory     メモリ使用量・上限の超過
+ロガーはキューに積むだけで、コンソールへの書き込みは別スレッド( QueueListener )で行う
+(Windows のコンソールは書き込みで数十ミリ秒止まることがある)
+同じ警告・エラーは RATE_LIMIT_SEC 秒に1回だけ出し、省略した件数を次の出力に付ける
+直近 RING_CAPACITY 件は記憶しておき、dump_recent_events() でファイルに書き出せる
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from collections import deque
+
+ROOT_LOGGER = "traffic_info"
+RATE_LIMIT_SEC = 60 # 同じ警告・エラーを出す間隔
+RING_CAPACITY = 2000 # 記憶しておく件数
+
+_lock = threading.Lock()
+_listener = None
+_ring = None
+
+
+# 分野毎のロガー( fetch / parse / ui / news / scheduler / server / memory )
+def get_logger(subsystem):
+    return logging.getLogger(f"{ROOT_LOGGER}.{subsystem}")
+
+
+# 同じ警告・エラー(ロガー・レベル・メッセージが同じもの)を一定時間に1回だけ通す
+class RateLimitFilter(logging.Filter):
+
+    # コンストラクタ
+    def __init__(self, interval=RATE_LIMIT_SEC, min_level=logging.WARNING, clock=time.monotonic):
+        super().__init__()
+        self.interval = interval
+        self.min_level = min_level
+        self.clock = clock
+        self._last = {} # キー -> [最後に出した時刻, 省略した件数]
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno < self.min_level:
+            return True
+        key = (record.name, record.levelno, record.getMessage())
+        now = self.clock()
+        with self._lock:
+            entry = self._last.get(key)
+            if entry is not None and now - entry[0] < self.interval:
+                entry[1] += 1
+                return False
+            suppressed = entry[1] if entry is not None else 0
+            self._last[key] = [now, 0]
+            if len(self._last) > 1024: # 古いキーを捨てる
+                for old_key in [k for k, v in self._last.items() if now - v[0] >= self.interval]:
+                    del self._last[old_key]
+        record.suppressed = suppressed
+        return True
+
+
+# 呼び出し側では書式の組み立てだけ行い、書き込みは QueueListener に任せる
+class _QueueHandler(logging.handlers.QueueHandler):
+
+    def prepare(self, record):
+        record.msg = record.getMessage() # 引数は呼び出し時点の値で確定させる
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+# 時刻 レベル 分野 メッセージ key=value ...
+class StructuredFormatter(logging.Formatter):
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(subsystem)-9s %(message)s", "%Y-%m-%d %H:%M:%S")
+
+    def format(self, record):
+        record.subsystem = record.name.rpartition(".")[2]
+        text = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            text += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            text += f" (同じメッセージ {suppressed}件を省略)"
+        return text
+
+
+# 直近の記録を保持する(書き出しは dump_recent_events)
+class RingBufferHandler(logging.Handler):
+
+    def __init__(self, capacity=RING_CAPACITY):
+        super().__init__()
+        self.records = deque(maxlen=capacity)
+
+    def emit(self, record):
+        self.records.append({
+            "time": record.created,
+            "level": record.levelname,
+            "subsystem": record.name.rpartition(".")[2],
+            "message": record.getMessage(),
+            "fields": {key: str(value) for key, value in (getattr(record, "fields", None) or {}).items()},
+            "suppressed": getattr(record, "suppressed", 0),
+            "exception": record.exc_text,
+        })
+
+
+# ログ出力を開始する(2回目以降は何もしない)
+# level: コンソールに出す最低レベル("DEBUG" などの名前も可)。stream: 出力先(省略時は標準エラー)
+def setup_logging(level=logging.INFO, stream=None):
+    global _listener, _ring
+    if isinstance(level, str):
+        level = logging.getLevelName(level.upper())
+    with _lock:
+        if _listener is not None:
+            return
+        console = logging.StreamHandler(stream or sys.stderr)
+        console.setFormatter(StructuredFormatter())
+        console.setLevel(level)
+        _ring = RingBufferHandler()
+        _ring.setLevel(logging.DEBUG if level <= logging.DEBUG else logging.INFO)
+        log_queue = queue.SimpleQueue()
+        handler = _QueueHandler(log_queue)
+        handler.addFilter(RateLimitFilter())
+        root = logging.getLogger(ROOT_LOGGER)
+        root.setLevel(min(level, logging.INFO))
+        root.addHandler(handler)
+        root.propagate = False
+        _listener = logging.handlers.QueueListener(log_queue, console, _ring, respect_handler_level=True)
+        _listener.start()
+    atexit.register(shutdown_logging) # 終了時に書き込み待ちを出力する
+
+
+# 書き込み待ちを出力して終了する
+def shutdown_logging():
+    global _listener
+    with _lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        _listener = None
+        root = logging.getLogger(ROOT_LOGGER)
+        for handler in list(root.handlers):
+            if isinstance(handler, _QueueHandler):
+                root.removeHandler(handler)
+
+
+# 直近の記録を JSON Lines で書き出してファイルのパスを返す(記録が無ければ None)
+def dump_recent_events(directory):
+    if _ring is None or not _ring.records:
+        return None
+    records = list(_ring.records)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, time.strftime("events-%Y%m%d-%H%M%S.jsonl"))
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    return path
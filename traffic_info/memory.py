@@ -0,0 +1,263 @@
+"""
+長時間稼働(数週間)のメモリ管理
+
+一定間隔の gc.collect() (全世代の回収で画面が止まる)の代わりに
+    - 起動処理で作ったオブジェクトを gc.freeze() で回収の対象外にし、若い世代の閾値を上げる
+    - 取得・ニュース更新をしていない時に若い世代(0, 1)だけを回収する
+    - 定期的に RSS・Canvas アイテム数・ウィジェット毎の after() の予約数・Tk の画像数を調べ、
+      上限 (budget) を超えたら警告する
+    - RSS が上限を超えている場合だけ、取得などをしていない時に全世代を回収する
+      (解放したメモリは OS に返らないことが多いので、FULL_GC_MIN_CHECKS 回の確認に1回まで)
+    - trace=True の場合は tracemalloc のスナップショットを比べ、増えた箇所を表示する
+全世代の回収の時間は METRICS.gc_pause_seconds に記録する
+"""
+
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+from .logs import get_logger
+from .metrics import METRICS
+
+memory_log = get_logger("memory")
+
+GC_THRESHOLDS = (2000, 20, 20) # 世代 0 / 1 / 2 の閾値(既定は 700, 10, 10)
+TRACE_FRAMES = 10 # tracemalloc で記録する呼び出し元の深さ
+FULL_GC_MIN_CHECKS = 30 # RSS の上限超過による全世代の回収は check() この回数に1回まで
+
+# 上限の既定値( MemoryGovernor の budget で上書き)
+DEFAULT_BUDGET = {
+    "rss_mb": 400, # プロセスのメモリ使用量( RSS )
+    "canvas_items": 1500, # 全 Canvas のアイテム数の合計
+    "after_callbacks": 40, # 予約中の after() の数(全ウィジェットの合計)
+    "images": 64, # Tk の画像( PhotoImage )の数
+    "traced_growth_mb": 64, # tracemalloc: 基準(起動後)からの増加量
+}
+
+
+# プロセスのメモリ使用量(バイト)。取得できない環境では None
+def rss_bytes():
+    if sys.platform.startswith("linux"):
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError, IndexError):
+            return None
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [
+                ("cb", wintypes.DWORD),
+                ("PageFaultCount", wintypes.DWORD),
+                ("PeakWorkingSetSize", ctypes.c_size_t),
+                ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t),
+                ("PeakPagefileUsage", ctypes.c_size_t),
+            ]
+
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return counters.WorkingSetSize
+    return None
+
+
+# ウィジェットとその子孫(自分を含む)
+def _walk_widgets(widget):
+    stack = [widget]
+    while stack:
+        widget = stack.pop()
+        yield widget
+        stack.extend(widget.winfo_children())
+
+
+# Tk 側の資源の数を調べる(UI スレッドで呼ぶこと)
+# 戻り値: {"widgets": ウィジェット数, "canvas_items": {パス: アイテム数}, "after": {パス: 予約数},
+#          "after_total": 予約中の after() の合計, "images": Tk の画像数}
+# tkinter の after() は呼び出したウィジェットにコールバック(Tcl コマンド)を登録するので、
+# 予約中のコマンド名と各ウィジェットの登録済みコマンドを突き合わせて数える
+def widget_census(root):
+    tk = root.tk
+    scripts = {}
+    after_ids = tk.splitlist(tk.call("after", "info"))
+    for after_id in after_ids:
+        try:
+            script = str(tk.splitlist(tk.call("after", "info", after_id))[0])
+        except Exception: # 調べている間に実行された
+            continue
+        scripts[script] = scripts.get(script, 0) + 1
+    widgets = 0
+    canvas_items = {}
+    after = {}
+    for widget in _walk_widgets(root):
+        widgets += 1
+        pending = sum(scripts.get(name, 0) for name in (getattr(widget, "_tclCommands", None) or ()))
+        if pending:
+            after[str(widget)] = pending
+        if widget.winfo_class() == "Canvas":
+            canvas_items[str(widget)] = len(widget.find_all())
+    return {
+        "widgets": widgets,
+        "canvas_items": canvas_items,
+        "after": after,
+        "after_total": len(after_ids),
+        "images": len(tk.splitlist(tk.call("image", "names"))),
+    }
+
+
+# tracemalloc の差分を1行ずつの文字列に
+def format_top_stats(stats, limit=10):
+    lines = []
+    for stat in stats[:limit]:
+        frame = stat.traceback[0]
+        lines.append(
+            f"  {os.path.basename(frame.filename)}:{frame.lineno} "
+            f"{stat.size_diff / 1024:+.1f} KiB ({stat.count_diff:+d}件, 計 {stat.size / 1024:.1f} KiB)"
+        )
+    return lines
+
+
+class MemoryGovernor:
+
+    # コンストラクタ
+    # budget: DEFAULT_BUDGET の一部を上書きする辞書
+    # trace: tracemalloc で確保した箇所を記録する(遅くなるため調査時のみ)
+    def __init__(self, budget=None, trace=False, top=10):
+        self.budget = dict(DEFAULT_BUDGET, **(budget or {}))
+        self.trace = trace
+        self.top = top
+        self.tuned = False
+        self.baseline_rss = None # tune_gc() 時点の RSS
+        self._baseline_snapshot = None # tune_gc() 時点の tracemalloc スナップショット
+        self._last_snapshot = None # 前回の check() のスナップショット
+        self._gc_started = None
+        self.checks = 0
+        self.idle_collections = 0
+        self.full_collections = 0
+        self._full_gc_wanted = False # RSS が上限を超えた(次の collect_idle() で全世代を回収する)
+        self._last_full_check = None # 最後に全世代を回収した時の checks
+        self.alarms = {} # 上限の名前 -> 超えた回数
+
+    # 起動処理の後に1回呼ぶ: それまでのオブジェクトを回収の対象外にして閾値を設定する
+    def tune_gc(self, thresholds=GC_THRESHOLDS):
+        if self.tuned:
+            return
+        self.tuned = True
+        gc.collect()
+        gc.freeze() # モジュール・ウィジェットなど終了まで残るものを全世代の回収で毎回たどらない
+        gc.set_threshold(*thresholds)
+        gc.callbacks.append(self._on_gc)
+        if self.trace and not tracemalloc.is_tracing():
+            tracemalloc.start(TRACE_FRAMES)
+        if tracemalloc.is_tracing():
+            self._baseline_snapshot = self._take_snapshot()
+            self._last_snapshot = self._baseline_snapshot
+        self.baseline_rss = rss_bytes()
+
+    # 全世代の回収にかかった時間を記録( gc.callbacks )
+    def _on_gc(self, phase, info):
+        if info.get("generation") != 2:
+            return
+        if phase == "start":
+            self._gc_started = time.perf_counter()
+        elif self._gc_started is not None:
+            METRICS.gc_pause_seconds.observe(time.perf_counter() - self._gc_started)
+            self._gc_started = None
+
+    # 取得などをしていない時に呼ぶ: 若い世代だけを回収する(全世代は閾値による自動回収に任せる)
+    # RSS が上限を超えている場合は全世代を回収する( FULL_GC_MIN_CHECKS 回の確認に1回まで)
+    def collect_idle(self):
+        if self._full_gc_wanted and (
+            self._last_full_check is None or self.checks - self._last_full_check >= FULL_GC_MIN_CHECKS
+        ):
+            self._full_gc_wanted = False
+            self._last_full_check = self.checks
+            self.full_collections += 1
+            return gc.collect()
+        if gc.get_count()[0] == 0:
+            return 0
+        self.idle_collections += 1
+        return gc.collect(1)
+
+    @staticmethod
+    def _take_snapshot():
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ))
+
+    # 現在の状態を調べ、上限を超えた項目を警告する
+    # census: widget_census() の結果(画面が無い場合は省略)
+    # 戻り値: {"rss": バイト, "census": census, "traced_growth": バイト, "top": 増えた箇所, "alarms": [...]}
+    def check(self, census=None):
+        self.checks += 1
+        report = {"rss": rss_bytes(), "census": census, "traced_growth": None, "top": [], "alarms": []}
+        if report["rss"] is not None:
+            METRICS.rss_bytes.set(report["rss"])
+            if report["rss"] > self.budget["rss_mb"] * 1024 * 1024:
+                # ここでは回収しない(画面のスレッドを止めない)。回収は次の collect_idle() で
+                self._full_gc_wanted = True
+                report["alarms"].append(("rss_mb", report["rss"] / 1024 / 1024))
+        if census is not None:
+            canvas_items = sum(census["canvas_items"].values())
+            METRICS.pending_after.set(census["after_total"])
+            METRICS.tk_images.set(census["images"])
+            if canvas_items > self.budget["canvas_items"]:
+                report["alarms"].append(("canvas_items", canvas_items))
+            if census["after_total"] > self.budget["after_callbacks"]:
+                report["alarms"].append(("after_callbacks", census["after_total"]))
+            if census["images"] > self.budget["images"]:
+                report["alarms"].append(("images", census["images"]))
+        if tracemalloc.is_tracing() and self._baseline_snapshot is not None:
+            snapshot = self._take_snapshot()
+            report["traced_growth"] = sum(
+                stat.size_diff for stat in snapshot.compare_to(self._baseline_snapshot, "filename"))
+            report["top"] = snapshot.compare_to(self._last_snapshot, "lineno")[:self.top]
+            self._last_snapshot = snapshot
+            if report["traced_growth"] > self.budget["traced_growth_mb"] * 1024 * 1024:
+                report["alarms"].append(("traced_growth_mb", report["traced_growth"] / 1024 / 1024))
+        for name, value in report["alarms"]:
+            self.alarms[name] = self.alarms.get(name, 0) + 1
+            METRICS.memory_alarms.inc()
+            memory_log.warning("メモリの上限を超えました：%s %.0f (上限 %s)", name, value, self.budget[name])
+        if report["alarms"] and report["top"]:
+            memory_log.warning("前回から増えた箇所：\n%s", "\n".join(format_top_stats(report["top"], self.top)))
+        return report
+
+    # check() の結果を複数行の文字列に
+    def format_report(self, report):
+        lines = []
+        rss = report["rss"]
+        if rss is not None:
+            base = f" (起動後 {(rss - self.baseline_rss) / 1024 / 1024:+.1f} MiB)" if self.baseline_rss else ""
+            lines.append(f"RSS {rss / 1024 / 1024:.1f} MiB{base}")
+        lines.append(
+            f"GC：世代毎 {gc.get_count()}, 閾値 {gc.get_threshold()}, 対象外 {gc.get_freeze_count()}件, "
+            f"若い世代の回収 {self.idle_collections}回, 全世代の回収(RSS の上限超過時) {self.full_collections}回"
+        )
+        census = report["census"]
+        if census is not None:
+            lines.append(
+                f"ウィジェット {census['widgets']}個, Canvas アイテム {sum(census['canvas_items'].values())}個, "
+                f"after() の予約 {census['after_total']}件, 画像 {census['images']}個"
+            )
+            for path, count in sorted(census["after"].items(), key=lambda item: -item[1]):
+                lines.append(f"  after {path}: {count}件")
+            for path, count in sorted(census["canvas_items"].items(), key=lambda item: -item[1])[:self.top]:
+                if count:
+                    lines.append(f"  canvas {path}: {count}個")
+        if report["traced_growth"] is not None:
+            lines.append(f"tracemalloc：起動後 {report['traced_growth'] / 1024 / 1024:+.2f} MiB, 前回から増えた箇所")
+            lines.extend(format_top_stats(report["top"], self.top))
+        if self.alarms:
+            lines.append("上限超過：" + ", ".join(f"{name} {count}回" for name, count in self.alarms.items()))
+        return "\n".join(lines)
@@ -0,0 +1,255 @@
+"""
+処理時間・状態の計測(ヒストグラム・ゲージ・カウンター)
+
+取得・解析・画面への反映・ニュースの更新にかかった時間や、スクロールのフレーム間隔、
+after() の遅れ、ティッカー・Canvas アイテムの数、GC の時間・メモリ使用量を記録する
+    METRICS.exposition()    Prometheus のテキスト形式 (GET /metrics で返す)
+    METRICS.summary_line()  前回からの集計を1行で(定期的にコンソールへ)
+記録はワーカースレッドからも行うため、値毎にロックを持つ
+"""
+
+import math
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# バケットの上限(秒)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0) # 通信を含む処理
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0) # 解析・画面の処理
+FRAME_BUCKETS = (0.02, 0.03, 0.034, 0.04, 0.05, 0.067, 0.1, 0.25, 0.5, 1.0) # フレーム間隔(30fps は 0.033)
+
+DEFAULT_METRICS_HOST = "127.0.0.1"
+DEFAULT_METRICS_PORT = 8766
+
+
+class Histogram:
+    kind = "histogram"
+
+    # コンストラクタ
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1) # 最後は +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    # 値を1件記録
+    def observe(self, value):
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    # 現在の (バケット毎の件数, 合計)
+    def snapshot(self):
+        with self._lock:
+            return list(self.counts), self.sum
+
+    @property
+    def count(self):
+        with self._lock:
+            return sum(self.counts)
+
+    # q 分位点の近似値(そのバケットの上限)。since: 以前の snapshot() からの差分で計算
+    def quantile(self, q, since=None):
+        counts, _ = self.snapshot()
+        if since is not None:
+            counts = [now - before for now, before in zip(counts, since[0])]
+        total = sum(counts)
+        if total == 0:
+            return None
+        rank = q * total
+        seen = 0
+        for i, count in enumerate(counts):
+            seen += count
+            if seen >= rank and count:
+                return self.buckets[i] if i < len(self.buckets) else math.inf
+        return math.inf
+
+    def exposition(self):
+        counts, total_sum = self.snapshot()
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, counts):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{{le="{bound:g}"}} {cumulative}')
+        cumulative += counts[-1]
+        lines.append(f'{self.name}_bucket{{le="+Inf"}} {cumulative}')
+        lines.append(f"{self.name}_sum {total_sum:.6f}")
+        lines.append(f"{self.name}_count {cumulative}")
+        return lines
+
+
+class Gauge:
+    kind = "gauge"
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self.value = 0
+
+    def set(self, value):
+        self.value = value
+
+    def exposition(self):
+        return [f"{self.name} {self.value:g}"]
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def exposition(self):
+        return [f"{self.name} {self.value:g}"]
+
+
+# 計測項目の一覧
+class MetricsRegistry:
+
+    # コンストラクタ
+    def __init__(self):
+        self._metrics = []
+        self._summary_base = {} # 名前 -> 前回の summary_line() 時点の snapshot()
+        self.fetch_seconds = self._add(Histogram(
+            "traffic_fetch_seconds", "1路線の取得にかかった時間(再試行・解析を含む)", LATENCY_BUCKETS))
+        self.status_parse_seconds = self._add(Histogram(
+            "traffic_status_parse_seconds", "路線ページの解析時間", FAST_BUCKETS))
+        self.news_parse_seconds = self._add(Histogram(
+            "traffic_news_parse_seconds", "ニュースページの解析時間", FAST_BUCKETS))
+        self.news_refresh_seconds = self._add(Histogram(
+            "traffic_news_refresh_seconds", "ニュースの更新にかかった時間(取得 + 解析)", LATENCY_BUCKETS))
+        self.ui_apply_seconds = self._add(Histogram(
+            "traffic_ui_apply_seconds", "取得結果を画面に反映する時間(1路線)", FAST_BUCKETS))
+        self.frame_interval_seconds = self._add(Histogram(
+            "traffic_frame_interval_seconds", "スクロールのフレーム間隔", FRAME_BUCKETS))
+        self.frame_drift_seconds = self._add(Histogram(
+            "traffic_frame_drift_seconds", "フレームの予定からの遅れ", FAST_BUCKETS))
+        self.after_lag_seconds = self._add(Histogram(
+            "traffic_after_lag_seconds", "after() が予定より遅れて実行された時間", FAST_BUCKETS))
+        self.fetch_errors = self._add(Counter(
+            "traffic_fetch_errors_total", "取得に失敗した回数"))
+        self.news_selector_fallbacks = self._add(Counter(
+            "traffic_news_selector_fallbacks_total", "ニュースの見出しのセレクタを切り替えた回数(ページの構成の変更)"))
+        self.news_selector_misses = self._add(Counter(
+            "traffic_news_selector_misses_total", "ニュースの見出しがどのセレクタでも見つからなかった回数"))
+        self.listing_resolved = self._add(Counter(
+            "traffic_listing_resolved_total", "エリア別の一覧ページだけで運行状況が確定した路線の数"))
+        self.listing_fallbacks = self._add(Counter(
+            "traffic_listing_fallbacks_total", "一覧ページで見つからず路線のページを取得した路線の数"))
+        self.active_tickers = self._add(Gauge(
+            "traffic_active_tickers", "スクロール中のティッカーの数"))
+        self.canvas_items = self._add(Gauge(
+            "traffic_canvas_items", "Canvas アイテムの数"))
+        self.gc_pause_seconds = self._add(Histogram(
+            "traffic_gc_pause_seconds", "全世代のガーベジコレクションにかかった時間", FAST_BUCKETS))
+        self.rss_bytes = self._add(Gauge(
+            "traffic_rss_bytes", "プロセスのメモリ使用量 (RSS)"))
+        self.pending_after = self._add(Gauge(
+            "traffic_pending_after", "予約中の after() の数"))
+        self.tk_images = self._add(Gauge(
+            "traffic_tk_images", "Tk の画像の数"))
+        self.memory_alarms = self._add(Counter(
+            "traffic_memory_alarms_total", "メモリの上限を超えた回数"))
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    # Prometheus のテキスト形式
+    def exposition(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.exposition())
+        return "\n".join(lines) + "\n"
+
+    # 前回呼ばれた時からの集計を1行で返す(分位点はバケットの上限による近似)
+    def summary_line(self):
+        parts = []
+        for metric in self._metrics:
+            if isinstance(metric, Histogram):
+                base = self._summary_base.get(metric.name)
+                snapshot = metric.snapshot()
+                self._summary_base[metric.name] = snapshot
+                count = sum(snapshot[0]) - (sum(base[0]) if base else 0)
+                if not count:
+                    continue
+                p50 = metric.quantile(0.5, since=base)
+                p95 = metric.quantile(0.95, since=base)
+                label = metric.name.replace("traffic_", "").replace("_seconds", "")
+                parts.append(f"{label} n={count} p50≤{_format_seconds(p50)} p95≤{_format_seconds(p95)}")
+            elif metric.name.endswith("_bytes"):
+                parts.append(f"{metric.name.replace('traffic_', '').replace('_bytes', '')}={metric.value / 1024 / 1024:.1f}MiB")
+            else:
+                parts.append(f"{metric.name.replace('traffic_', '')}={metric.value:g}")
+        return "計測：" + ", ".join(parts)
+
+
+def _format_seconds(value):
+    if value is None:
+        return "-"
+    if math.isinf(value):
+        return "inf"
+    return f"{value * 1000:g}ms" if value < 1 else f"{value:g}s"
+
+
+# プロセス全体で1つ
+METRICS = MetricsRegistry()
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.server.registry.exposition().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+# GET /metrics だけを返すサーバー(画面から別スレッドで起動する)
+class MetricsServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    # コンストラクタ
+    def __init__(self, host=DEFAULT_METRICS_HOST, port=DEFAULT_METRICS_PORT, registry=METRICS):
+        self.registry = registry
+        super().__init__((host, port), MetricsRequestHandler)
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, name="traffic_metrics", daemon=True)
+        self.thread.start()
+        return self
+
+    def close(self):
+        self.shutdown()
+        self.server_close()
+
+    # 取得側が途中で切断した場合はトレースバックを出さない
+    def handle_error(self, request, client_address):
+        if isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError, ConnectionAbortedError)):
+            return
+        super().handle_error(request, client_address)
@@ -0,0 +1,400 @@
+"""
+Yahooニュースの見出しの取得
+
+画面(board)とサーバー(server)の両方から使う
+
+ページ全体の木構造は作らずに html.parser.HTMLParser で NEWS_SELECTORS の全セレクタを
+1回の走査で同時に照合する (NewsExtractor)。<body> より前は読まず、
+前回見出しが取れたセレクタ( SelectorLearner が記憶)で MAX_HEADLINES 件そろった時点で解析を打ち切る
+parse_news_headlines は従来の BeautifulSoup 版(結果比較・ベンチマーク用)
+"""
+
+import re
+import threading
+import time
+from html.parser import HTMLParser
+
+from .logs import get_logger
+from .metrics import METRICS
+
+parse_log = get_logger("parse")
+
+NEWS_URL = "https://news.yahoo.co.jp/categories/domestic"
+MAX_HEADLINES = 8 # 8件まで
+
+# Yahooニュースの主要ニュースのセレクタ(都度調整)
+NEWS_SELECTORS = [
+    'div[data-ual-view-type="list"] li a', # 主要トピックスリスト (2024/05時点の例)
+    'a[href*="/pickup/"]', # pickup 記事へのリンク
+    'section[data-ylk*="news_topics"] li a' # 別のトピックスセクションの可能性
+]
+
+# 見出しから除外する語
+_EXCLUDE_KEYWORDS = ["もっと見る","一覧","関連情報"]
+
+# get_text() に含まれないテキストを持つタグ(BeautifulSoup と同じ扱い)
+_SKIP_TEXT_TAGS = ("script", "style", "template")
+# 閉じタグの無い要素(親子関係の記録に積まない)
+_VOID_TAGS = frozenset((
+    "area", "base", "br", "col", "embed", "hr", "img", "input",
+    "link", "meta", "param", "source", "track", "wbr",
+))
+# セレクタの1段分 tag / tag[attr="value"] / tag[attr*="value"]
+_SELECTOR_STEP_PATTERN = re.compile(r'^([A-Za-z][\w-]*)?(?:\[([\w:-]+)(\*?=)"([^"]*)"\])?$')
+_BODY_TAG_PATTERN = re.compile(r"<body[\s>]", re.IGNORECASE)
+_SKIP_TAG_PATTERN = re.compile(r"<(/?)(?:script|style|template)\b", re.IGNORECASE)
+_FEED_CHUNK_SIZE = 16 * 1024 # 少しずつ渡す(打ち切った後の部分はコピーも解析もしない)
+
+
+# 解析を打ち切るための内部例外
+class _StopParsing(Exception):
+    pass
+
+
+# CSS セレクタを段毎の (tag, 属性名, 演算子, 値) に分解する
+# (このモジュールで使う範囲: 子孫結合子と 属性の完全一致 "=" / 部分一致 "*=")
+def compile_selector(selector):
+    steps = []
+    for token in selector.split():
+        match = _SELECTOR_STEP_PATTERN.match(token)
+        if match is None or not (match.group(1) or match.group(2)):
+            raise ValueError(f"対応していないセレクタです：{selector}")
+        tag, attr, op, value = match.groups()
+        steps.append(((tag or "").lower() or None, attr, op, value))
+    return tuple(steps)
+
+
+# 要素が1段分の条件に合うか
+def _step_matches(step, tag, attrs):
+    step_tag, attr, op, value = step
+    if step_tag is not None and step_tag != tag:
+        return False
+    if attr is None:
+        return True
+    actual = attrs.get(attr)
+    if actual is None:
+        return False
+    return actual == value if op == "=" else value in actual
+
+
+# 見出しとして使うか判定しながら、セレクタ毎に見出しを集める(従来の処理と同じ条件)
+class _HeadlineCollector:
+    __slots__ = ("elements", "headlines", "processed_urls", "full")
+
+    def __init__(self):
+        self.elements = 0 # セレクタに合った要素の数
+        self.headlines = []
+        self.processed_urls = set() # 重複記事を避けるためのセット
+        self.full = False # MAX_HEADLINES 件そろった
+
+    def add(self, href, title, aria_label, max_headlines):
+        self.elements += 1
+        if self.full or href in self.processed_urls:
+            return
+        # aria-label や内部の特定タグからタイトルを取得
+        if aria_label and len(aria_label) > len(title):
+            title = aria_label
+        # 短すぎたり不要なモノを除外
+        if title and len(title) > 8 and not any(kw in title for kw in _EXCLUDE_KEYWORDS):
+            self.headlines.append(title)
+            self.processed_urls.add(href)
+        if len(self.headlines) >= max_headlines:
+            self.full = True
+
+    def result(self):
+        return list(dict.fromkeys(self.headlines)) # 重複を避ける
+
+
+# 全セレクタを1回の走査で照合する HTMLParser
+# stop_index のセレクタで max_headlines 件そろった時点で解析を打ち切る
+class NewsExtractor(HTMLParser):
+
+    # コンストラクタ
+    # selectors: compile_selector() 済みのセレクタのリスト
+    def __init__(self, selectors, max_headlines=MAX_HEADLINES, stop_index=None):
+        super().__init__(convert_charrefs=True)
+        self.selectors = selectors
+        self.max_headlines = max_headlines
+        self.stop_index = stop_index
+        self.done = False # 打ち切ったか
+        self.collectors = [_HeadlineCollector() for _ in selectors]
+        self._stack = [] # 開いている要素 (tag, 属性の辞書)
+        self._open = [] # 開いている見出し候補 [深さ, セレクタ番号のリスト, href, aria-label, テキスト]
+        self._skip_depth = 0 # script / style / template の中
+        self._buffer = [] # タグとタグの間のテキスト(連続する data をまとめる)
+
+    # 要素が各セレクタの最後の段に合い、祖先が残りの段に順に合うか
+    def _matching_selectors(self, tag, attrs):
+        matched = []
+        for index, steps in enumerate(self.selectors):
+            if not _step_matches(steps[-1], tag, attrs):
+                continue
+            depth = len(self._stack)
+            for step in reversed(steps[:-1]):
+                depth -= 1
+                while depth >= 0 and not _step_matches(step, *self._stack[depth]):
+                    depth -= 1
+                if depth < 0:
+                    break
+            else:
+                matched.append(index)
+        return matched
+
+    # ひとまとまりのテキストを確定する( get_text(strip=True) と同じく前後の空白を除いて連結)
+    def _flush_text(self):
+        if self._buffer:
+            text = "".join(self._buffer).strip()
+            self._buffer.clear()
+            if text:
+                for candidate in self._open:
+                    candidate[4].append(text)
+
+    def handle_starttag(self, tag, attrs):
+        self._flush_text()
+        if tag in _SKIP_TEXT_TAGS:
+            self._skip_depth += 1
+        attrs = {key: value or "" for key, value in attrs}
+        matched = self._matching_selectors(tag, attrs) if not self._skip_depth else []
+        if tag in _VOID_TAGS:
+            if matched: # 中身の無い見出し候補
+                self._close_candidate([len(self._stack), matched, attrs.get("href", ""), attrs.get("aria-label"), []])
+            return
+        self._stack.append((tag, attrs))
+        if matched:
+            self._open.append([len(self._stack), matched, attrs.get("href", ""), attrs.get("aria-label"), []])
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in _VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        self._flush_text()
+        # 対応する開始タグまで閉じる(無ければ無視)
+        for depth in range(len(self._stack) - 1, -1, -1):
+            if self._stack[depth][0] == tag:
+                break
+        else:
+            return
+        for closed_tag, _ in self._stack[depth:]:
+            if closed_tag in _SKIP_TEXT_TAGS and self._skip_depth:
+                self._skip_depth -= 1
+        del self._stack[depth:]
+        while self._open and self._open[-1][0] > depth:
+            self._close_candidate(self._open.pop())
+
+    def handle_data(self, data):
+        if self._open and not self._skip_depth:
+            self._buffer.append(data)
+
+    # コメント・宣言などはテキストに含めないが、文字列の区切りにはなる
+    def handle_comment(self, data):
+        self._flush_text()
+
+    def handle_decl(self, decl):
+        self._flush_text()
+
+    # 見出し候補の要素を読み終えた
+    def _close_candidate(self, candidate):
+        _, matched, href, aria_label, parts = candidate
+        title = "".join(parts)
+        for index in matched:
+            collector = self.collectors[index]
+            collector.add(href, title, aria_label, self.max_headlines)
+            if index == self.stop_index and collector.full:
+                self.done = True
+                raise _StopParsing
+
+    # 解析済みでなければ続けて解析する
+    def feed(self, data):
+        if self.done:
+            return
+        try:
+            super().feed(data)
+        except _StopParsing:
+            pass
+
+    def close(self):
+        if self.done:
+            return
+        try:
+            super().close()
+            self._flush_text()
+            while self._open: # 閉じタグが無いまま終わった候補(末尾まで含める)
+                self._close_candidate(self._open.pop())
+        except _StopParsing:
+            pass
+
+
+# 見出しが取れたセレクタを記憶し、次回はそのセレクタを先に試す
+# 記憶したセレクタで見出しが取れなくなった場合(サイト構造の変更)は fallbacks に数える
+class SelectorLearner:
+
+    # コンストラクタ
+    def __init__(self, selectors):
+        self.selectors = list(selectors)
+        self.compiled = [compile_selector(selector) for selector in self.selectors]
+        self.preferred = None # 前回見出しが取れたセレクタの番号
+        self._lock = threading.Lock() # 画面とサーバーのスレッドから使う
+        self.parses = 0 # 解析回数
+        self.early_stops = 0 # 途中で打ち切った回数
+        self.fallbacks = 0 # 記憶したセレクタ以外に切り替わった回数
+        self.misses = 0 # どのセレクタでも見つからなかった回数
+        self.hits = [0] * len(self.selectors) # セレクタ毎の採用回数
+        self._missing = False # 前回も見つからなかった(同じメッセージを繰り返さない)
+
+    # 試す順番(記憶したセレクタを先頭に, 残りは NEWS_SELECTORS の順)
+    def order(self):
+        indexes = list(range(len(self.selectors)))
+        if self.preferred is not None:
+            indexes.remove(self.preferred)
+            indexes.insert(0, self.preferred)
+        return indexes
+
+    # 解析結果を記録して、採用したセレクタの番号を返す(見つからなければ None)
+    def record(self, extractor):
+        with self._lock:
+            order = self.order()
+            self.parses += 1
+            if extractor.done:
+                self.early_stops += 1
+            winner = next((index for index in order if extractor.collectors[index].elements), None)
+            if winner is None:
+                self.misses += 1
+                METRICS.news_selector_misses.inc()
+                if not self._missing:
+                    parse_log.warning("ニュースの見出しが見つかりません(全セレクタ不一致)")
+                self._missing = True
+                return None
+            self._missing = False
+            if self.preferred is not None and winner != self.preferred:
+                self.fallbacks += 1
+                METRICS.news_selector_fallbacks.inc()
+                parse_log.info(
+                    "ニュースのセレクタを切り替えました：%s → %s",
+                    self.selectors[self.preferred], self.selectors[winner]
+                    )
+            self.preferred = winner
+            self.hits[winner] += 1
+            return winner
+
+    # 集計を辞書で返す
+    def stats(self):
+        with self._lock:
+            return {
+                "preferred": self.selectors[self.preferred] if self.preferred is not None else None,
+                "parses": self.parses,
+                "early_stops": self.early_stops,
+                "fallbacks": self.fallbacks,
+                "misses": self.misses,
+                "hits": dict(zip(self.selectors, self.hits)),
+            }
+
+
+# 画面・サーバーで共有する記憶
+NEWS_SELECTOR_LEARNER = SelectorLearner(NEWS_SELECTORS)
+
+
+# 解析を始める位置( <body の位置)を返す。判断できなければ先頭から
+# (コメント・script / style・タグの途中にある <body は飛ばす。<head> 部分はコピーしない)
+def _body_start_offset(html):
+    match = _BODY_TAG_PATTERN.search(html)
+    while match is not None:
+        pos = match.start()
+        in_skip_tag = False
+        for skip_match in _SKIP_TAG_PATTERN.finditer(html, 0, pos):
+            in_skip_tag = not skip_match.group(1)
+        inside = (
+            html.rfind("<!--", 0, pos) > html.rfind("-->", 0, pos)
+            or html.rfind("<", 0, pos) > html.rfind(">", 0, pos)
+            or in_skip_tag
+        )
+        if not inside:
+            return pos
+        match = _BODY_TAG_PATTERN.search(html, pos + 5)
+    return 0
+
+
+# ニュースページの HTML から見出しを取り出す(見つからなければ空のリスト)
+# learner: 記憶したセレクタで MAX_HEADLINES 件そろったら打ち切る( None の場合は全体を読み、NEWS_SELECTORS の順)
+def extract_news_headlines(html, learner=NEWS_SELECTOR_LEARNER):
+    started = time.perf_counter()
+    try:
+        return _extract_news_headlines(html, learner)
+    finally:
+        METRICS.news_parse_seconds.observe(time.perf_counter() - started)
+
+
+def _extract_news_headlines(html, learner):
+    if learner is None:
+        selectors = [compile_selector(selector) for selector in NEWS_SELECTORS]
+        order = list(range(len(selectors)))
+        stop_index = None
+    else:
+        selectors = learner.compiled
+        order = learner.order()
+        stop_index = learner.preferred
+    extractor = NewsExtractor(selectors, stop_index=stop_index)
+    for start in range(_body_start_offset(html), len(html), _FEED_CHUNK_SIZE):
+        extractor.feed(html[start:start + _FEED_CHUNK_SIZE])
+        if extractor.done:
+            break
+    extractor.close()
+    if learner is None:
+        winner = next((index for index in order if extractor.collectors[index].elements), None)
+    else:
+        winner = learner.record(extractor)
+    return extractor.collectors[winner].result() if winner is not None else []
+
+
+# 従来の BeautifulSoup 版(結果比較・ベンチマーク用)
+def parse_news_headlines(html):
+    from bs4 import BeautifulSoup # 最初のニュース更新時に import
+    soup = BeautifulSoup(html, "html.parser")
+
+    news_elements = []
+    for selector in NEWS_SELECTORS:
+        news_elements = soup.select(selector)
+        if news_elements:
+            break # 要素が見つかったらループを抜ける
+
+    headlines = []
+    processed_urls = set() # 重複記事を避けるためのセット
+    for item in news_elements:
+        href = item.get("href", "")
+        if href in processed_urls:
+            continue
+
+        title = item.get_text(strip=True)
+        # aria-label や内部の特定タグからタイトルを取得
+        aria_label = item.get("aria-label")
+        if aria_label and len(aria_label) > len(title):
+            title = aria_label
+
+        # 短すぎたり不要なモノを除外
+        if title and len(title) > 8 and not any(kw in title for kw in _EXCLUDE_KEYWORDS):
+            headlines.append(title)
+            processed_urls.add(href)
+        if len(headlines) >= MAX_HEADLINES:
+            break
+    return list(dict.fromkeys(headlines)) # 重複を避ける
+
+
+# ニュースページを取得して見出しを返す(通信エラーは例外のまま)
+# 前回から変更がなければ( 304 )解析せずに前回の見出しを使う
+def fetch_news_headlines(transport, url=NEWS_URL, timeout=10):
+    started = time.perf_counter()
+    try:
+        return _fetch_news_headlines(transport, url, timeout)
+    finally:
+        METRICS.news_refresh_seconds.observe(time.perf_counter() - started)
+
+
+def _fetch_news_headlines(transport, url, timeout):
+    response = transport.get(url, timeout=timeout)
+    if response.not_modified and response.page.parsed is not None:
+        return response.page.parsed
+    headlines = extract_news_headlines(response.text)
+    if headlines:
+        response.page.parsed = headlines # 304 の場合に再利用
+    return headlines
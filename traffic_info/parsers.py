@@ -0,0 +1,339 @@
+"""
+Yahoo路線情報ページの解析処理
+
+運行状況は <dd class="normal"> / <dd class="trouble"> の1か所だけ分かればよいので、
+ページ全体の木構造は作らずに html.parser.HTMLParser で状況の <dd> だけを探す (StatusExtractor)
+normal の dd が見つかった時点で解析を打ち切る。trouble の dd は最初のもののテキストを記録し、
+後に normal の dd が無いか最後まで読む(BeautifulSoup 版と同じく normal がページのどこにあっても優先)
+ページ全体がある場合 (extract_train_status) は、先にコメント・script / style の外の <dd> の開始タグだけを
+先頭から1回の走査で探し、normal が無ければ最初の trouble の dd から解析する
+
+エリア別の一覧ページ(路線・状況・詳細の表)は ListingExtractor で表の行だけを読み、
+路線毎の (路線ID, 路線名, 状況, 詳細) にする
+
+parse_train_status は従来の BeautifulSoup 版(結果比較・ベンチマーク用)
+"""
+
+import re
+from collections import namedtuple
+from html.parser import HTMLParser
+
+
+TROUBLE_TEXT_FALLBACK = "情報取得エラー" # trouble の dd が見つからない場合
+NORMAL_TEXT = "平常運転"
+
+# get_text() に含まれないテキストを持つタグ(BeautifulSoup と同じ扱い)
+_SKIP_TEXT_TAGS = ("script", "style", "template")
+_DD_SCAN_PATTERN = re.compile(r"<(?:!--|script\b|style\b|dd\b)", re.IGNORECASE) # <dd> を探す時に読み飛ばす部分の始まり
+_RAW_TEXT_END_PATTERNS = { # script / style の終わり( HTMLParser と同じ判定)
+    tag: re.compile(r"</\s*%s\s*>" % tag, re.IGNORECASE) for tag in ("script", "style")
+}
+_OPEN_TAG_TAIL_PATTERN = re.compile(r"<[a-z/!?][^>]*\Z", re.IGNORECASE) # 閉じていないタグ(属性値の中の <dd を除くため)
+_LINE_ID_PATTERN = re.compile(r"/diainfo/(\d+)(?:/|$|\?)") # 路線ページのURLの路線ID
+
+
+# 一覧ページの1行分
+ListingEntry = namedtuple(
+    "ListingEntry",
+    [
+        "line_id", # 路線ID(路線ページのURLの数字。分からなければ None)
+        "name", # 一覧に表示されている路線名
+        "status", # "normal" / "trouble"
+        "text", # 一覧の詳細(トラブル時は要約。平常時は NORMAL_TEXT)
+    ],
+)
+
+
+# 路線ページのURLから路線ID を取り出す(分からなければ None)
+def line_id_from_url(url):
+    match = _LINE_ID_PATTERN.search(url or "")
+    return match.group(1) if match else None
+
+
+# 解析を打ち切るための内部例外
+class _StopParsing(Exception):
+    pass
+
+
+# 状況の <dd> だけを探す HTMLParser
+# feed() は何度でも呼べる(ストリーミング取得で少しずつ渡す場合)
+class StatusExtractor(HTMLParser):
+
+    # コンストラクタ
+    # stop_at_trouble: 後に normal の dd が無いと分かっている場合は trouble の dd を読み終えた時点で打ち切る
+    def __init__(self, stop_at_trouble=False):
+        super().__init__(convert_charrefs=True)
+        self.stop_at_trouble = stop_at_trouble
+        self.done = False # 結果が確定したか( normal の dd が見つかった・stop_at_trouble で打ち切った)
+        self.status = None
+        self.trouble_text = None # 最初の trouble の dd のテキスト(読み終えるまでは None)
+        self._trouble_depth = 0 # trouble の dd 内の dd の入れ子の深さ(0 は外)
+        self._skip_depth = 0 # trouble の dd 内の script / style / template
+        self._parts = [] # trouble の dd 内のテキスト(strip 済み)
+        self._buffer = [] # タグとタグの間のテキスト(連続する data をまとめる)
+
+    # class 属性に指定のクラスが含まれるか( BeautifulSoup の class_= と同じ判定)
+    @staticmethod
+    def _has_class(attrs, name):
+        for key, value in attrs:
+            if key == "class" and value and name in value.split():
+                return True
+        return False
+
+    # ひとまとまりのテキストを確定する(BeautifulSoup の1つの文字列に相当)
+    def _flush_text(self):
+        if self._buffer:
+            text = "".join(self._buffer).strip()
+            self._buffer.clear()
+            if text:
+                self._parts.append(text)
+
+    def handle_starttag(self, tag, attrs):
+        if self._trouble_depth:
+            self._flush_text()
+            if tag in _SKIP_TEXT_TAGS:
+                self._skip_depth += 1
+            elif tag == "dd":
+                if self._has_class(attrs, "normal"): # normal が優先
+                    self._finish("normal", NORMAL_TEXT)
+                self._trouble_depth += 1
+            return
+        if tag != "dd":
+            return
+        if self._has_class(attrs, "normal"):
+            self._finish("normal", NORMAL_TEXT)
+        elif self._has_class(attrs, "trouble") and self.trouble_text is None:
+            self._trouble_depth = 1
+
+    def handle_startendtag(self, tag, attrs):
+        # <br/> などの空要素
+        if self._trouble_depth:
+            self._flush_text()
+        if tag != "dd":
+            return
+        if self._has_class(attrs, "normal"):
+            self._finish("normal", NORMAL_TEXT)
+        elif not self._trouble_depth and self._has_class(attrs, "trouble") and self.trouble_text is None:
+            self._end_trouble("") # 中身の無い trouble の dd
+
+    def handle_endtag(self, tag):
+        if not self._trouble_depth:
+            return
+        self._flush_text()
+        if tag in _SKIP_TEXT_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+        elif tag == "dd":
+            self._trouble_depth -= 1
+            if self._trouble_depth == 0:
+                self._end_trouble(" ".join(self._parts))
+
+    def handle_data(self, data):
+        if self._trouble_depth and not self._skip_depth:
+            self._buffer.append(data)
+
+    # コメント・宣言などはテキストに含めないが、文字列の区切りにはなる
+    def handle_comment(self, data):
+        if self._trouble_depth:
+            self._flush_text()
+
+    def handle_decl(self, decl):
+        if self._trouble_depth:
+            self._flush_text()
+
+    def handle_pi(self, data):
+        if self._trouble_depth:
+            self._flush_text()
+
+    # <![CDATA[...]]> は1つの文字列として含める
+    def unknown_decl(self, data):
+        if self._trouble_depth:
+            self._flush_text()
+            if data.upper().startswith("CDATA[") and not self._skip_depth:
+                self._buffer.append(data[len("CDATA["):])
+                self._flush_text()
+
+    # trouble の dd を読み終えた(後に normal の dd があればそちらが優先なので続けて読む)
+    def _end_trouble(self, text):
+        if self.stop_at_trouble:
+            self._finish("trouble", text) # 解析を打ち切る(例外で抜ける)
+        self.trouble_text = text
+        self._parts.clear()
+
+    def _finish(self, status, text):
+        self.status = status
+        self.trouble_text = text
+        self.done = True
+        raise _StopParsing
+
+    # 解析済みでなければ続けて解析する
+    def feed(self, data):
+        if self.done:
+            return
+        try:
+            super().feed(data)
+        except _StopParsing:
+            pass
+
+    # (status, trouble_text) を返す。途中で終わった場合も従来と同じ値にそろえる
+    def result(self):
+        if self.done:
+            return self.status, self.trouble_text
+        if self.trouble_text is not None:
+            return "trouble", self.trouble_text
+        if self._trouble_depth:
+            # 閉じタグが無いまま終わった trouble の dd (BeautifulSoup は末尾まで含める)
+            self._flush_text()
+            return "trouble", " ".join(self._parts)
+        return "trouble", TROUBLE_TEXT_FALLBACK
+
+    def close(self):
+        if not self.done:
+            try:
+                super().close()
+            except _StopParsing:
+                pass
+
+
+# コメント・script / style・他のタグの属性値の外にある <dd> の開始タグを (位置, タグ) で順に返す
+# (先頭から1回だけ走査する。読み飛ばす部分は閉じる位置まで一度に進める)
+def _dd_start_tags(html):
+    pos = 0 # 次に探す位置
+    checked = 0 # 閉じていないタグが無いことを確かめていない範囲の始まり
+    while True:
+        match = _DD_SCAN_PATTERN.search(html, pos)
+        if match is None:
+            return
+        start = match.start()
+        token = match.group().lower()
+        if token == "<!--":
+            end = html.find("-->", start + 4)
+            pos = checked = len(html) if end < 0 else end + 3
+        elif token == "<dd":
+            end = html.find(">", start)
+            end = len(html) if end < 0 else end + 1
+            if not _OPEN_TAG_TAIL_PATTERN.search(html, checked, start):
+                yield start, html[start:end]
+            pos = checked = end
+        else:
+            end_match = _RAW_TEXT_END_PATTERNS[token[1:]].search(html, start)
+            pos = checked = len(html) if end_match is None else end_match.end()
+
+
+# <dd ...> の開始タグの状況("normal" / "trouble" / None)。属性は HTMLParser と同じ読み方にする
+def _dd_tag_status(tag):
+    probe = StatusExtractor(stop_at_trouble=True)
+    probe.feed(tag)
+    if probe.done:
+        return probe.status
+    return "trouble" if probe._trouble_depth else None
+
+
+# 路線ページの運行状況を解析して (status, trouble_text) を返す
+# (<dd> の開始タグを1回の走査で集め、解析するのは最初の trouble の dd からその閉じタグまで)
+def extract_train_status(html):
+    trouble_start = None
+    for start, tag in _dd_start_tags(html):
+        status = _dd_tag_status(tag)
+        if status == "normal": # normal の dd がページのどこかにあれば平常運転
+            return "normal", NORMAL_TEXT
+        if status == "trouble" and trouble_start is None:
+            trouble_start = start
+    if trouble_start is None: # 状況の dd が無いページ
+        return "trouble", TROUBLE_TEXT_FALLBACK
+    extractor = StatusExtractor(stop_at_trouble=True)
+    extractor.feed(html[trouble_start:])
+    extractor.close()
+    return extractor.result()
+
+
+# 一覧ページの表を読む HTMLParser( get_extracted() で少しずつ渡せる)
+# 1列目に路線ページへのリンクがある行を、路線名・状況(2列目)・詳細(3列目)として記録する
+# (閉じタグの省略された <td> / <tr> にも対応。1ページに複数の表があってもよい)
+class ListingExtractor(HTMLParser):
+
+    # コンストラクタ
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.done = False # 一覧は最後まで読む(途中で打ち切らない)
+        self.entries = []
+        self._cells = None # 読んでいる行のセルのテキスト(行の外は None)
+        self._href = None # 読んでいる行の1列目のリンク
+        self._cell = None # 読んでいるセルのテキスト(セルの外は None)
+        self._skip_depth = 0 # script / style / template
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _SKIP_TEXT_TAGS:
+            self._skip_depth += 1
+        elif tag == "tr":
+            self._end_row()
+            self._cells = []
+            self._href = None
+        elif tag in ("td", "th") and self._cells is not None:
+            self._end_cell()
+            self._cell = []
+        elif tag == "a" and self._cell is not None and not self._cells and self._href is None:
+            self._href = dict(attrs).get("href")
+        elif tag == "br" and self._cell is not None:
+            self._cell.append(" ")
+
+    def handle_endtag(self, tag):
+        if tag in _SKIP_TEXT_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+        elif tag in ("td", "th"):
+            self._end_cell()
+        elif tag in ("tr", "table", "tbody"):
+            self._end_row()
+
+    def handle_data(self, data):
+        if self._cell is not None and not self._skip_depth:
+            self._cell.append(data)
+
+    def _end_cell(self):
+        if self._cell is not None and self._cells is not None:
+            self._cells.append(" ".join("".join(self._cell).split()))
+        self._cell = None
+
+    # 行を読み終えた: 路線ページへのリンクと状況がある行だけ記録する
+    def _end_row(self):
+        self._end_cell()
+        cells, href = self._cells, self._href
+        self._cells = None
+        self._href = None
+        if not cells or len(cells) < 2 or href is None or "/diainfo/" not in href:
+            return
+        line_id = line_id_from_url(href)
+        name = cells[0]
+        if NORMAL_TEXT in cells[1]:
+            self.entries.append(ListingEntry(line_id, name, "normal", NORMAL_TEXT))
+        else:
+            text = cells[2] if len(cells) > 2 and cells[2] else cells[1]
+            self.entries.append(ListingEntry(line_id, name, "trouble", text))
+
+    # 記録した行 (ListingEntry のタプル)
+    def result(self):
+        self._end_row()
+        return tuple(self.entries)
+
+
+# 一覧ページを解析して ListingEntry のタプルを返す
+def extract_listing(html):
+    extractor = ListingExtractor()
+    extractor.feed(html)
+    extractor.close()
+    return extractor.result()
+
+
+# 従来の BeautifulSoup 版(結果比較・ベンチマーク用)
+def parse_train_status(html):
+    from bs4 import BeautifulSoup
+
+    # BeautifulSoupを利用してWebページを解析する
+    soup = BeautifulSoup(html, "html.parser")
+
+    # .findでnormalクラスのddタグを探す
+    if soup.find("dd", class_="normal"):
+        return "normal", NORMAL_TEXT
+
+    trouble_node = soup.find("dd", class_="trouble")
+    original_trouble_text = trouble_node.get_text(separator=" ", strip=True) if trouble_node else TROUBLE_TEXT_FALLBACK
+    return "trouble", original_trouble_text
@@ -0,0 +1,86 @@
+"""
+画面を持たない運行情報の取得処理
+
+StatusPipeline.refresh() で全路線を同時に取得し、路線名 -> LineState を返す
+(ベンチマークや、画面以外への出力に使う)
+"""
+
+from .fetcher import FetchEngine, FetchResult
+from .listing import AreaStatusFetch
+from .registry import load_lines
+from .resilience import ResilientFetch
+from .status import build_line_state, mark_stale
+
+
+class StatusPipeline:
+
+    # コンストラクタ
+    # lines: LineConfig のリスト(省略時は路線設定ファイル, 無ければ registry の設定)
+    # transport: HttpTransport (省略時は作成する)
+    # job_timeout: 1路線の持ち時間(秒, 再試行を含む)
+    def __init__(self, lines=None, max_workers=4, transport=None, job_timeout=35.0):
+        self.lines = list(lines) if lines is not None else load_lines()
+        if transport is None:
+            from .transport import HttpTransport
+            transport = HttpTransport(pool_maxsize=max_workers)
+        self.transport = transport
+        self.area_fetch = AreaStatusFetch(self.transport, self.lines) # エリア別の一覧ページでまとめて取得
+        self.fetch = ResilientFetch(self.area_fetch)
+        self.engine = FetchEngine(
+            fetch_func=self.fetch,
+            max_workers=max_workers,
+            job_timeout=job_timeout,
+        )
+        self.states = {} # 路線名 -> 最後に取得できた LineState (失敗した路線は stale)
+        self.errors = {} # 路線名 -> 最後の取得で発生した例外
+        self.shared = {} # 取得していない路線のうち一覧ページで分かったもの 路線名 -> (状況, テキスト)
+
+    # 全路線を取得して {路線名: LineState} を返す(取得できなかった路線は前回の値を stale にする)
+    # names: 取得する路線名(省略時は全路線)
+    # 一覧ページを取得した場合, 同じエリアの他の路線は shared に入れ, 平常運転なら LineState も更新する
+    # (トラブル中は一覧の要約なので LineState は変えない。詳細は呼び出し側で取得を早める)
+    def refresh(self, timeout=None, names=None):
+        lines_by_name = {line.name: line for line in self.lines}
+        targets = self.lines if names is None else [lines_by_name[name] for name in names if name in lines_by_name]
+        self.transport.begin_cycle()
+        self.area_fetch.begin_cycle()
+        self.engine.submit_cycle({line.name: line.url for line in targets})
+        self.errors = {}
+        for result in self.engine.wait_cycle(timeout=timeout):
+            if not isinstance(result, FetchResult):
+                continue
+            if result.error is not None:
+                self.errors[result.key] = result.error
+                if result.key in self.states:
+                    self.states[result.key] = mark_stale(self.states[result.key])
+                continue
+            line = lines_by_name[result.key]
+            status, text = result.value
+            self.states[line.name] = build_line_state(
+                line.name,
+                status,
+                text,
+                section=line.section,
+                company_url=line.company_url,
+            )
+        requested = {line.name for line in targets}
+        self.shared = {}
+        for name, (url, entry) in self.area_fetch.take_resolved().items():
+            line = lines_by_name.get(name)
+            if name in requested or line is None or line.url != url:
+                continue
+            self.shared[name] = (entry.status, entry.text)
+            if entry.status == "normal":
+                self.states[name] = build_line_state(
+                    name,
+                    entry.status,
+                    entry.text,
+                    section=line.section,
+                    company_url=line.company_url,
+                )
+        return dict(self.states)
+
+    # 終了処理
+    def close(self):
+        self.engine.shutdown()
+        self.transport.close()
@@ -0,0 +1,235 @@
+"""
+運行情報の対象路線(路線レジストリ)
+
+路線毎の Yahoo路線情報URL・鉄道会社公式サイトURL・区間・配色を LineConfig にまとめる
+外部の設定ファイル( lines.json / lines.toml )があればそちらを優先し、
+RegistryWatcher で実行中の変更を検出する
+"""
+
+import json
+import os
+from collections import namedtuple
+
+
+# 1路線分の設定
+LineConfig = namedtuple(
+    "LineConfig",
+    [
+        "name", # 路線名
+        "url", # Yahoo路線情報URL
+        "company_url", # 鉄道会社公式サイトURL (無ければ None)
+        "section", # 区間情報(運行情報対象区間)
+        "style", # 路線名表示スタイル {"bg": 背景色, "fg": 文字色}
+        "area", # Yahoo路線情報のエリア別一覧ページURL (無ければ None: 路線のページを取得)
+    ],
+    defaults=(None,),
+)
+
+# 路線設定ファイルの既定の場所(アプリケーションのフォルダ)
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "lines.json")
+
+# 路線名表示スタイルのデフォルト
+DEFAULT_STYLE = {"bg": "lightgray", "fg": "black"}
+
+# --- ↓↓↓ 路線の設定は自由に… ↓↓↓ ---
+# Yahoo路線情報URL
+url_dict = {
+    "東海道新幹線": "https://transit.yahoo.co.jp/diainfo/7/0", 
+    "大阪環状線": "https://transit.yahoo.co.jp/diainfo/263/0",
+    "南海本線": "https://transit.yahoo.co.jp/diainfo/339/0", 
+    "大和路(関西本)線": "https://transit.yahoo.co.jp/diainfo/277/0",
+    "サンライズ出雲・瀬戸": "https://transit.yahoo.co.jp/diainfo/1052/0"
+}
+
+# 鉄道会社公式サイトURL
+railway_company_urls = {
+    "東海道新幹線": "https://jr-central.co.jp/",
+    "大阪環状線": "https://www.jr-odekake.net/",
+    "南海本線": "https://www.nankai.co.jp/",
+    "大和路(関西本)線": "https://www.jr-odekake.net/",
+    "サンライズ出雲・瀬戸": "https://www.jreast.co.jp/"
+}
+
+# 運行情報対象路線
+train_list = [
+    "東海道新幹線",
+    "大阪環状線", 
+    "南海本線", 
+    "大和路(関西本)線",
+    "サンライズ出雲・瀬戸"
+]
+
+# 路線の区間情報(運行情報対象区間)
+train_section = {
+    "東海道新幹線": "新大阪 ～ 東京", 
+    "大阪環状線": "内回り・外回り",
+    "南海本線": "なんば ～ 和歌山市",
+    "大和路(関西本)線": "JR難波 ～ 加茂",
+    "サンライズ出雲・瀬戸": "東京 ～ 出雲市・高松(琴平)"
+}
+
+# Yahoo路線情報のエリア別一覧ページURL
+# 同じ一覧ページの路線はまとめて1回の通信で取得する(トラブル中の路線だけ詳細を路線のページから取得)
+# ※ 一覧に無い路線・ここに無い路線は路線のページを取得する
+line_areas = {
+    "東海道新幹線": "https://transit.yahoo.co.jp/diainfo/area/6",
+    "大阪環状線": "https://transit.yahoo.co.jp/diainfo/area/6",
+    "南海本線": "https://transit.yahoo.co.jp/diainfo/area/6",
+    "大和路(関西本)線": "https://transit.yahoo.co.jp/diainfo/area/6",
+}
+
+# 路線名表示スタイル
+# ※ このリストも編集しないと、bg, fg ともにデフォルトで表示される
+train_styles = {
+    "東海道新幹線":{"bg":"blue2", "fg":"white"},
+    "大阪環状線":{"bg":"darkorange1", "fg":"white"},
+    "南海本線":{"bg":"yellow green", "fg":"white"},
+    "大和路(関西本)線":{"bg":"gray", "fg":"white"},
+    "サンライズ出雲・瀬戸":{"bg":"magenta2", "fg":"white"}
+}
+# --- ↑↑↑ 路線の設定は自由に…  ↑↑↑ ---
+
+
+# 上の設定から LineConfig のリストを作成(train_list の順)
+def default_lines():
+    lines = []
+    for name in train_list:
+        lines.append(LineConfig(
+            name=name,
+            url=url_dict[name],
+            company_url=railway_company_urls.get(name),
+            section=train_section.get(name, ""),
+            style=dict(train_styles.get(name, DEFAULT_STYLE)),
+            area=line_areas.get(name),
+        ))
+    return lines
+
+
+# 設定ファイル1件分の辞書から LineConfig を作成
+def _line_from_dict(entry):
+    name = entry.get("name")
+    url = entry.get("url")
+    if not name or not url:
+        raise ValueError(f"路線名(name)とURL(url)は必須です：{entry}")
+    style = dict(DEFAULT_STYLE)
+    style.update(entry.get("style") or {})
+    return LineConfig(
+        name=str(name),
+        url=str(url),
+        company_url=entry.get("company_url") or None,
+        section=str(entry.get("section", "")),
+        style=style,
+        area=entry.get("area") or None,
+    )
+
+
+# 設定ファイルの内容( JSON / TOML の文字列)から LineConfig のリストを作成
+# 形式: {"lines": [{"name": ..., "url": ..., "company_url": ..., "section": ..., "style": {"bg": ..., "fg": ...},
+#                  "area": ...}, ...]}
+def parse_lines(text, suffix=".json"):
+    if suffix == ".toml":
+        import tomllib # Python 3.11 以降
+        data = tomllib.loads(text)
+    else:
+        data = json.loads(text)
+    entries = data.get("lines") if isinstance(data, dict) else data
+    if not isinstance(entries, list):
+        raise ValueError("設定ファイルに lines (路線のリスト)がありません")
+    lines = [_line_from_dict(entry) for entry in entries]
+    names = [line.name for line in lines]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"路線名が重複しています：{', '.join(duplicates)}")
+    return lines
+
+
+# 設定ファイルを読み込む(ファイルが無い場合は上の設定)
+def load_lines(path=DEFAULT_CONFIG_PATH):
+    if path is None or not os.path.exists(path):
+        return default_lines()
+    with open(path, encoding="utf-8") as f:
+        return parse_lines(f.read(), os.path.splitext(path)[1].lower())
+
+
+# LineConfig のリストを設定ファイル( JSON )の形式で書き出す
+def dump_lines(lines):
+    entries = [line._asdict() for line in lines]
+    return json.dumps({"lines": entries}, ensure_ascii=False, indent=4)
+
+
+# 新旧の設定を比べて変わった路線名を返す
+#   added: 追加, removed: 削除, refetch: URL が変わった(取得し直す),
+#   changed: 区間・配色・関連URL・一覧ページが変わった(表示だけ更新), moved: 並び順が変わった
+def diff_lines(old_lines, new_lines):
+    old = {line.name: line for line in old_lines}
+    new = {line.name: line for line in new_lines}
+    added = [name for name in new if name not in old]
+    removed = [name for name in old if name not in new]
+    refetch = []
+    changed = []
+    for name, line in new.items():
+        before = old.get(name)
+        if before is None or before == line:
+            continue
+        if before.url != line.url:
+            refetch.append(name)
+        else:
+            changed.append(name)
+    kept_old = [name for name in old if name in new]
+    kept_new = [name for name in new if name in old]
+    return {
+        "added": added,
+        "removed": removed,
+        "refetch": refetch,
+        "changed": changed,
+        "moved": kept_old != kept_new,
+    }
+
+
+# 設定ファイルの変更を検出する(定期的に poll() を呼ぶ)
+# 更新日時とサイズが変わった場合だけ読み直し、内容が同じなら変更なしとする
+class RegistryWatcher:
+
+    # コンストラクタ
+    def __init__(self, path):
+        self.path = path
+        self._signature = self._stat_signature()
+        self._text = self._read_text()
+        self.last_error = None # 最後の読み込みエラー(正常時は None)
+
+    # ファイルの (更新日時, サイズ)。ファイルが無い場合は None
+    def _stat_signature(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _read_text(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    # 変更があれば新しい LineConfig のリストを返す(変更なし・読み込みエラーは None)
+    # ファイルが削除された場合は上の設定に戻す
+    def poll(self):
+        signature = self._stat_signature()
+        if signature == self._signature:
+            return None
+        self._signature = signature
+        text = self._read_text()
+        if text == self._text: # 保存し直しただけ
+            return None
+        self._text = text
+        if text is None:
+            self.last_error = None
+            return default_lines()
+        try:
+            lines = parse_lines(text, os.path.splitext(self.path)[1].lower())
+        except Exception as e: # 書きかけ・書式の誤りは前の設定のまま
+            self.last_error = e
+            return None
+        self.last_error = None
+        return lines
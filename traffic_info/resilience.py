@@ -0,0 +1,145 @@
+"""
+路線毎の取得の失敗対策(タイムアウト・再試行・サーキットブレーカー)
+
+ResilientFetch は fetch_func を包み、
+    - 1回の通信にタイムアウトを付ける( fetch_func の timeout 引数)
+    - 一時的なエラー(接続エラー・タイムアウト・5xx)は deadline 秒以内で再試行する
+    - 失敗が続くホストは CircuitBreaker が一定時間取得を止める( CircuitOpenError )
+取得できなかった路線は、呼び出し側で前回の表示状態を「古い情報」として表示し続ける
+"""
+
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+from .transport import is_retryable_error
+
+
+# サーキットブレーカーが開いている(取得を止めている)
+class CircuitOpenError(Exception):
+    pass
+
+
+# ホスト1つ分のサーキットブレーカー
+#   closed    : 通常
+#   open      : failure_threshold 回続けて失敗したので reset_timeout 秒間は取得しない
+#   half_open : reset_timeout 経過後, 1件だけ試しに取得する(成功で closed, 失敗で open)
+class CircuitBreaker:
+
+    # コンストラクタ
+    def __init__(self, failure_threshold=3, reset_timeout=120.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = "closed"
+        self.failures = 0 # 連続失敗回数
+        self.opened_at = 0.0
+        self.trips = 0 # open になった回数
+        self._probe_running = False
+        self._lock = threading.Lock() # ワーカースレッドから呼ばれる
+
+    # 取得してよいか確認(だめなら CircuitOpenError)
+    def before_call(self):
+        with self._lock:
+            if self.state == "open":
+                if self.clock() - self.opened_at < self.reset_timeout:
+                    raise CircuitOpenError(f"失敗が続いているため取得を停止中です(残り {self.retry_in():.0f}秒)")
+                self.state = "half_open"
+                self._probe_running = False
+            if self.state == "half_open":
+                if self._probe_running: # 試しの取得は1件だけ
+                    raise CircuitOpenError("取得再開を確認中です")
+                self._probe_running = True
+
+    # 取得再開までの秒数(ロック内から呼ぶ)
+    def retry_in(self):
+        return max(0.0, self.opened_at + self.reset_timeout - self.clock())
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._probe_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probe_running = False
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.trips += 1
+                self.state = "open"
+                self.opened_at = self.clock()
+
+
+# fetch_func を再試行・サーキットブレーカー付きで呼ぶ(ワーカースレッドで実行)
+class ResilientFetch:
+
+    # コンストラクタ
+    # fetch_func: fetch_func(url, timeout=...) で1回取得する関数
+    # timeout: 1回の通信のタイムアウト (接続, 読み込み) 秒
+    # retries: 再試行回数, deadline: 再試行を含めた1路線の持ち時間(秒)
+    def __init__(
+        self,
+        fetch_func,
+        timeout=(3.05, 10.0),
+        retries=2,
+        backoff=0.5,
+        deadline=20.0,
+        failure_threshold=3,
+        reset_timeout=120.0,
+    ):
+        self.fetch_func = fetch_func
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.deadline = deadline
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.breakers = {} # ホスト名 -> CircuitBreaker
+        self._lock = threading.Lock()
+
+    # ホスト毎のサーキットブレーカー
+    def breaker_for(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            breaker = self.breakers.get(host)
+            if breaker is None:
+                breaker = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+                self.breakers[host] = breaker
+            return breaker
+
+    def __call__(self, url):
+        breaker = self.breaker_for(url)
+        breaker.before_call()
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            try:
+                value = self.fetch_func(url, timeout=self.timeout)
+            except Exception as e:
+                if not is_retryable_error(e): # 4xx や解析エラーはホストの障害ではない
+                    breaker.record_success()
+                    raise
+                # 待ち時間は 0.5, 1, 2 ... 秒 (+ゆらぎ)
+                wait = self.backoff * (2 ** attempt) * random.uniform(1.0, 1.5)
+                if attempt >= self.retries or time.monotonic() - started + wait >= self.deadline:
+                    breaker.record_failure()
+                    raise
+                attempt += 1
+                time.sleep(wait)
+                continue
+            breaker.record_success()
+            return value
+
+    # 停止中のホスト(ホスト名 -> 再開までの秒数)
+    def open_circuits(self):
+        with self._lock:
+            breakers = list(self.breakers.items())
+        opened = {}
+        for host, breaker in breakers:
+            with breaker._lock:
+                if breaker.state == "open":
+                    opened[host] = breaker.retry_in()
+        return opened
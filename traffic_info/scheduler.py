@@ -0,0 +1,250 @@
+"""
+路線毎の取得間隔を決めるスケジューラ
+
+全路線を5分毎にまとめて取得する代わりに、路線毎に次回の取得時刻を持つ
+    トラブル中の路線         : trouble_interval 毎
+    最近状況が変わった路線   : recent_interval 毎( recent_window 秒の間)
+    長時間変化の無い路線     : stable_interval 毎( stable_after 秒以上変化なし)
+    それ以外                 : base_interval 毎
+取得に失敗した路線は error_base 秒から倍々に間隔を延ばす(上限 error_max, ゆらぎ付き)
+全体の取得数は budget_per_minute (1分あたりの件数)までに抑える
+(取得数は実際に送ったリクエストの数。HttpTransport.request_hooks に record_sent を登録して数える。
+再試行・トラブル中の路線の詳細・一覧ページも含み、一覧の結果を使い回した路線は数えない)
+"""
+
+import random
+import threading
+import time
+from collections import deque
+
+
+# 1路線分のスケジュール
+class LineSchedule:
+    __slots__ = (
+        "name", # 路線名
+        "next_due", # 次回の取得時刻( clock の値)
+        "interval", # 現在の取得間隔(秒)
+        "in_flight", # 取得中か
+        "last_fingerprint", # 前回の (運行状況, テキスト)
+        "last_change", # 最後に状況が変わった時刻(変化が無ければ None)
+        "errors", # 連続エラー回数
+        "requests", # 取得回数
+        "registered", # 登録した時刻(固定間隔との比較用)
+    )
+
+    def __init__(self, name, now):
+        self.name = name
+        self.next_due = now # 登録直後に取得
+        self.interval = 0.0
+        self.in_flight = False
+        self.last_fingerprint = None
+        self.last_change = None
+        self.errors = 0
+        self.requests = 0
+        self.registered = now
+
+
+class PollScheduler:
+
+    # コンストラクタ
+    # clock: 現在時刻を返す関数(秒), rng: ゆらぎ用の random.Random
+    def __init__(
+        self,
+        names=(),
+        base_interval=300.0,
+        trouble_interval=60.0,
+        recent_interval=90.0,
+        stable_interval=600.0,
+        recent_window=900.0,
+        stable_after=3600.0,
+        error_base=30.0,
+        error_max=1800.0,
+        jitter=0.1,
+        budget_per_minute=30,
+        batch_window=5.0,
+        clock=time.monotonic,
+        rng=None,
+    ):
+        self.base_interval = base_interval
+        self.trouble_interval = trouble_interval
+        self.recent_interval = recent_interval
+        self.stable_interval = stable_interval
+        self.recent_window = recent_window
+        self.stable_after = stable_after
+        self.error_base = error_base
+        self.error_max = error_max
+        self.jitter = jitter # 通常時の間隔のゆらぎ(割合)
+        self.budget_per_minute = max(1, int(budget_per_minute))
+        self.batch_window = batch_window # この秒数以内に取得時刻になる路線はまとめて取得する
+        self.clock = clock
+        self.rng = rng or random.Random()
+        self.lines = {} # 路線名 -> LineSchedule (登録順)
+        self._lock = threading.Lock() # record_sent() はワーカースレッドから呼ばれる
+        self._sent = deque() # 直近1分間のリクエストの送信時刻
+        self.total_requests = 0 # 送ったリクエストの数
+        self.budget_deferred = 0 # 上限のため後回しにした回数
+        self.set_lines(names)
+
+    # 対象路線を設定(新しい路線はすぐ取得, 無くなった路線は削除)
+    def set_lines(self, names):
+        now = self.clock()
+        names = list(names)
+        for name in list(self.lines):
+            if name not in names:
+                del self.lines[name]
+        for name in names:
+            if name not in self.lines:
+                self.lines[name] = LineSchedule(name, now)
+
+    # リクエストを1件送った( HttpTransport.request_hooks から呼ばれる)
+    def record_sent(self, now=None):
+        now = self.clock() if now is None else now
+        with self._lock:
+            self._sent.append(now)
+            self.total_requests += 1
+
+    # 直近1分間のリクエスト数
+    def _window_count(self, now):
+        with self._lock:
+            while self._sent and now - self._sent[0] >= 60.0:
+                self._sent.popleft()
+            return len(self._sent)
+
+    # 取得時刻になった路線名を返す(上限を超える分は次回以降に回す)
+    # 遅れの大きい路線, トラブル中の路線を優先する(1路線は少なくとも1リクエストとして枠を見積もる)
+    def due(self, now=None):
+        now = self.clock() if now is None else now
+        horizon = now + self.batch_window
+        if not any(not s.in_flight and s.next_due <= now for s in self.lines.values()):
+            return []
+        ready = [s for s in self.lines.values() if not s.in_flight and s.next_due <= horizon]
+        if not ready:
+            return []
+        ready.sort(key=lambda s: (s.interval != self.trouble_interval, s.next_due))
+        available = self.budget_per_minute - self._window_count(now)
+        if len(ready) > available:
+            self.budget_deferred += len(ready) - max(0, available)
+            ready = ready[:max(0, available)]
+        return [s.name for s in ready]
+
+    # 取得を開始した(手動更新など due() 以外からの取得も記録する)
+    def dispatched(self, names, now=None):
+        now = self.clock() if now is None else now
+        for name in names:
+            schedule = self.lines.get(name)
+            if schedule is None:
+                continue
+            schedule.in_flight = True
+            schedule.requests += 1
+            # 結果が返らなかった場合でも止まらないように仮の次回時刻を入れておく
+            schedule.next_due = now + self.base_interval
+
+    # ゆらぎを加えた間隔
+    def _jittered(self, interval):
+        return interval * (1.0 + self.rng.uniform(-self.jitter, self.jitter))
+
+    # 取得に成功した
+    def record_result(self, name, status, text=None, now=None):
+        schedule = self.lines.get(name)
+        if schedule is None:
+            return
+        now = self.clock() if now is None else now
+        fingerprint = (status, text)
+        if schedule.last_fingerprint is not None and fingerprint != schedule.last_fingerprint:
+            schedule.last_change = now
+        schedule.last_fingerprint = fingerprint
+        schedule.errors = 0
+        schedule.in_flight = False
+        # 変化が無ければ登録時刻から数える
+        unchanged_for = now - (schedule.last_change if schedule.last_change is not None else schedule.registered)
+        if status == "trouble":
+            interval = self.trouble_interval
+        elif schedule.last_change is not None and unchanged_for < self.recent_window:
+            interval = self.recent_interval
+        elif unchanged_for >= self.stable_after:
+            interval = self.stable_interval
+        else:
+            interval = self.base_interval
+        schedule.interval = interval
+        schedule.next_due = now + self._jittered(interval)
+
+    # 取得に失敗した(連続エラー回数に応じて間隔を延ばす)
+    def record_error(self, name, now=None):
+        schedule = self.lines.get(name)
+        if schedule is None:
+            return
+        now = self.clock() if now is None else now
+        schedule.errors += 1
+        schedule.in_flight = False
+        backoff = min(self.error_max, self.error_base * (2 ** (schedule.errors - 1)))
+        # 半分は固定, 残り半分をランダムにして, 複数路線の再試行が重ならないようにする
+        schedule.interval = backoff
+        schedule.next_due = now + backoff / 2 + self.rng.uniform(0, backoff / 2)
+
+    # 次の due() で取得する(一覧ページで新たにトラブルになったと分かった路線など)
+    def expedite(self, names, now=None):
+        now = self.clock() if now is None else now
+        for name in names:
+            schedule = self.lines.get(name)
+            if schedule is not None and not schedule.in_flight:
+                schedule.next_due = min(schedule.next_due, now)
+
+    # 取得が終わらなかった路線を取得中から外す(結果を捨てた場合など)
+    def release(self, names):
+        for name in names:
+            schedule = self.lines.get(name)
+            if schedule is not None:
+                schedule.in_flight = False
+
+    # 次に due() を呼ぶまでの秒数(上限に達している場合は枠が空くまで)
+    def next_due_in(self, now=None):
+        now = self.clock() if now is None else now
+        waiting = [s.next_due for s in self.lines.values() if not s.in_flight]
+        if not waiting:
+            return self.base_interval
+        delay = max(0.0, min(waiting) - now)
+        if self._window_count(now) >= self.budget_per_minute:
+            with self._lock:
+                oldest = self._sent[0] if self._sent else now - 60.0
+            delay = max(delay, oldest + 60.0 - now)
+        return delay
+
+    # 統計(路線毎の次回時刻, 固定間隔で取得した場合との比較)
+    # requests は送ったリクエストの数。固定間隔は従来どおり路線毎に1リクエストとして数える
+    def stats(self, now=None):
+        now = self.clock() if now is None else now
+        lines = {}
+        fixed_requests = 0.0
+        for name, schedule in self.lines.items():
+            # 固定間隔( base_interval )なら登録直後の1回 + 経過時間 / 間隔 回
+            fixed_requests += 1 + (now - schedule.registered) // self.base_interval
+            lines[name] = {
+                "next_due_in": max(0.0, schedule.next_due - now),
+                "interval": schedule.interval,
+                "errors": schedule.errors,
+                "requests": schedule.requests,
+                "in_flight": schedule.in_flight,
+            }
+        return {
+            "lines": lines,
+            "requests": self.total_requests,
+            "fixed_requests": int(fixed_requests),
+            "saved": int(fixed_requests) - self.total_requests,
+            "last_minute": self._window_count(now),
+            "budget_per_minute": self.budget_per_minute,
+            "budget_deferred": self.budget_deferred,
+        }
+
+    # 統計を表示用の文字列にする
+    def format_stats(self, now=None):
+        stats = self.stats(now)
+        rows = [
+            f"リクエスト {stats['requests']}回 (固定間隔なら {stats['fixed_requests']}回, 削減 {stats['saved']}回), "
+            f"直近1分 {stats['last_minute']}/{stats['budget_per_minute']}件, 上限で後回し {stats['budget_deferred']}回"
+        ]
+        for name, line in sorted(stats["lines"].items(), key=lambda item: item[1]["next_due_in"]):
+            state = "取得中" if line["in_flight"] else f"{line['next_due_in']:.0f}秒後"
+            rows.append(
+                f"  {name}：{state} (間隔 {line['interval']:.0f}秒, 取得 {line['requests']}回, エラー {line['errors']}回)"
+            )
+        return "\n".join(rows)
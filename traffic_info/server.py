@@ -0,0 +1,357 @@
+"""
+運行状況の配信サーバー(複数の表示端末で1回の取得結果を共有する)
+
+    python -m traffic_info --serve [HOST:PORT]
+
+StatusAggregator が路線毎の取得( PollScheduler + StatusPipeline )とニュースの取得を行い、
+結果を StatusHub に渡す。StatusHub は変わった路線だけを1つの版( version )として記録し、
+HTTP で配信する
+    GET /status  現在の全路線・ニュース (JSON, ETag 対応: If-None-Match が同じ版なら 304)
+    GET /metrics 取得・解析時間などの計測 (Prometheus のテキスト形式)
+    GET /events  Server-Sent Events。変わった路線だけを delta イベントで送る
+                 Last-Event-ID (または ?since=版) を付けて再接続すると続きから受け取れる
+                 (古すぎる版の場合は snapshot イベントで全体を送り直す)
+--export FILE を付けると、版が変わる度に /status と同じ内容をファイルにも書き出す
+(ネットワークを使わずに同じ端末・共有フォルダの画面へ渡す場合。traffic_info.subscriber.FileFeed)
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from .logs import get_logger, setup_logging, shutdown_logging
+from .metrics import METRICS
+
+server_log = get_logger("server")
+fetch_log = get_logger("fetch")
+news_log = get_logger("news")
+scheduler_log = get_logger("scheduler")
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+KEEPALIVE_SEC = 15 # SSE の接続維持用コメントの間隔
+
+
+# JSON を UTF-8 のバイト列にする
+def _encode(payload):
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+# SSE の1イベント
+def _sse_event(event, version, payload):
+    return b"event: " + event.encode() + b"\nid: " + str(version).encode() + b"\ndata: " + _encode(payload) + b"\n\n"
+
+
+# LineState を配信用の辞書にする
+def line_payload(state):
+    return state._asdict()
+
+
+# 最新の状態と、版毎の変更(直近 history_size 件)を持つ
+# 取得スレッドが publish() し、各接続のスレッドが wait() で次の版を待つ
+class StatusHub:
+
+    # コンストラクタ
+    # export_path: 版が変わる度に全体を書き出すファイル(省略時は書き出さない)
+    def __init__(self, history_size=1024, export_path=None):
+        # 版は起動時刻(ミリ秒)から始める。再起動したサーバーに前回の版で再接続しても
+        # 続きとして扱わず、全体を送り直すため
+        self.version = int(time.time() * 1000)
+        self.lines = {} # 路線名 -> 配信用の辞書
+        self.news = None # {"headlines": [...], "fetched_at": UNIX時刻}
+        self.closed = False
+        self._events = deque(maxlen=history_size) # (版, SSE のバイト列)
+        self._snapshot = None # (版, JSON のバイト列) のキャッシュ
+        self._cond = threading.Condition()
+        self.export_path = export_path
+        self._export_lock = threading.Lock()
+
+    # 変更を反映する。変わった部分があれば新しい版を返す(無ければ None)
+    # lines: {路線名: 配信用の辞書}, removed: 削除した路線名, news: 見出しのリスト
+    def publish(self, lines=None, removed=(), news=None):
+        with self._cond:
+            changed = {name: data for name, data in (lines or {}).items() if self.lines.get(name) != data}
+            removed = [name for name in removed if name in self.lines]
+            news_changed = news is not None and (self.news is None or self.news["headlines"] != list(news))
+            if not changed and not removed and not news_changed:
+                return None
+            self.version += 1
+            self.lines.update(changed)
+            for name in removed:
+                del self.lines[name]
+            delta = {"version": self.version, "lines": changed}
+            if removed:
+                delta["removed"] = removed
+            if news_changed:
+                self.news = {"headlines": list(news), "fetched_at": time.time()}
+                delta["news"] = self.news
+            self._events.append((self.version, _sse_event("delta", self.version, delta)))
+            self._snapshot = None
+            self._cond.notify_all()
+            version = self.version
+        if self.export_path:
+            self._export()
+        return version
+
+    # 全体( JSON のバイト列)と版
+    def snapshot(self):
+        with self._cond:
+            if self._snapshot is None or self._snapshot[0] != self.version:
+                payload = {"version": self.version, "lines": self.lines, "news": self.news}
+                self._snapshot = (self.version, _encode(payload))
+            return self._snapshot
+
+    # 全体をファイルに書き出す(一時ファイルに書いてから置き換える)
+    def _export(self):
+        with self._export_lock:
+            version, body = self.snapshot()
+            tmp_path = self.export_path + ".tmp"
+            try:
+                os.makedirs(os.path.dirname(self.export_path) or ".", exist_ok=True)
+                with open(tmp_path, "wb") as f:
+                    f.write(body)
+                os.replace(tmp_path, self.export_path)
+            except OSError as e:
+                server_log.warning("配信ファイルを書き出せませんでした：%s", e)
+
+    # SSE の snapshot イベント
+    def snapshot_event(self):
+        version, body = self.snapshot()
+        return version, b"event: snapshot\nid: " + str(version).encode() + b"\ndata: " + body + b"\n\n"
+
+    # version より後の delta イベント ( SSE のバイト列のリスト, 最後の版)。履歴に無い場合は None
+    def events_since(self, version):
+        with self._cond:
+            if version > self.version:
+                return None # 別のサーバーの版
+            if version == self.version:
+                return [], version
+            if not self._events or self._events[0][0] > version + 1:
+                return None # 古すぎる(または別のサーバーの版)
+            return [data for event_version, data in self._events if event_version > version], self.version
+
+    # version より新しい版が出るまで待つ(最大 timeout 秒)。現在の版を返す
+    def wait(self, version, timeout=None):
+        with self._cond:
+            self._cond.wait_for(lambda: self.version > version or self.closed, timeout)
+            return self.version
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+
+class StatusRequestHandler(BaseHTTPRequestHandler):
+    server_version = "traffic_info"
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == "/status":
+            self._send_status()
+        elif url.path == "/events":
+            self._send_events(parse_qs(url.query))
+        elif url.path == "/metrics":
+            self._send_metrics()
+        else:
+            self.send_error(404)
+
+    # 現在の全体( ETag は版)
+    def _send_status(self):
+        version, body = self.server.hub.snapshot()
+        etag = f'"{version}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(body)
+
+    # 計測 (Prometheus のテキスト形式)
+    def _send_metrics(self):
+        body = METRICS.exposition().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    # Server-Sent Events (接続が切れるまで送り続ける)
+    def _send_events(self, query):
+        hub = self.server.hub
+        since = self.headers.get("Last-Event-ID") or (query.get("since") or [None])[0]
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        try:
+            self.wfile.write(b"retry: 3000\n\n") # 再接続までの待ち時間(ミリ秒)
+            pending = None
+            if since is not None:
+                try:
+                    pending = hub.events_since(int(since))
+                except ValueError:
+                    pending = None
+            while True:
+                if pending is None: # 初回接続・続きが無い場合は全体を送る
+                    version, data = hub.snapshot_event()
+                    events = [data]
+                else:
+                    events, version = pending
+                for data in events:
+                    self.wfile.write(data)
+                self.wfile.flush()
+                if hub.wait(version, timeout=KEEPALIVE_SEC) == version:
+                    if hub.closed:
+                        return
+                    self.wfile.write(b": keepalive\n\n")
+                    pending = ([], version)
+                    continue
+                pending = hub.events_since(version) # 取りこぼした場合は None (全体を送り直す)
+        except (BrokenPipeError, ConnectionResetError, ConnectionAbortedError):
+            return # 表示端末側が切断した
+
+    # アクセスログは出さない(エラーのみ)
+    def log_message(self, format, *args):
+        pass
+
+    def log_error(self, format, *args):
+        server_log.warning(format, *args)
+
+
+class StatusServer(ThreadingHTTPServer):
+    daemon_threads = True # 接続中のスレッドを待たずに終了する
+
+    # コンストラクタ
+    def __init__(self, hub, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        self.hub = hub
+        super().__init__((host, port), StatusRequestHandler)
+
+    def server_close(self):
+        self.hub.close()
+        super().server_close()
+
+    # 表示端末が途中で切断した場合はトレースバックを出さない
+    def handle_error(self, request, client_address):
+        if isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError, ConnectionAbortedError)):
+            return
+        super().handle_error(request, client_address)
+
+
+# 路線毎の取得とニュースの取得を行い、結果を StatusHub に渡す(別スレッドで実行)
+class StatusAggregator:
+
+    # コンストラクタ
+    # pipeline: StatusPipeline, scheduler: PollScheduler (省略時は作成)
+    # summary_interval: 計測の集計を表示する間隔(秒)
+    def __init__(self, pipeline, hub, scheduler=None, news_interval=15 * 60, news_url=None, summary_interval=5 * 60):
+        from .news import NEWS_URL
+        from .scheduler import PollScheduler
+
+        self.pipeline = pipeline
+        self.hub = hub
+        self.scheduler = scheduler or PollScheduler([line.name for line in pipeline.lines])
+        pipeline.transport.request_hooks.append(self.scheduler.record_sent) # 実際に送ったリクエストを数える
+        self.news_interval = news_interval
+        self.news_url = news_url or NEWS_URL
+        self._next_news = 0.0
+        self.summary_interval = summary_interval
+        self._next_summary = time.monotonic() + summary_interval
+        self._stop = threading.Event()
+        self.thread = None
+
+    # 取得時刻になった路線を取得して配信する
+    def poll_lines(self):
+        due = self.scheduler.due()
+        if not due:
+            return
+        self.scheduler.dispatched(due)
+        previous = {name: state.status for name, state in self.pipeline.states.items()}
+        states = self.pipeline.refresh(names=due)
+        for name in due:
+            if name in self.pipeline.errors:
+                self.scheduler.record_error(name)
+            elif name in states:
+                self.scheduler.record_result(name, states[name].status, states[name].text)
+            else:
+                self.scheduler.release([name])
+        updates = {name: line_payload(states[name]) for name in due if name in states}
+        # 一覧ページで分かった他の路線: 平常運転はそのまま反映, 新たにトラブルになった路線は詳細を早めに取得
+        for name, (status, text) in self.pipeline.shared.items():
+            if status == "normal":
+                self.scheduler.record_result(name, status, text)
+                updates[name] = line_payload(states[name])
+            elif previous.get(name) != "trouble":
+                self.scheduler.expedite([name])
+        version = self.hub.publish(lines=updates)
+        if version is not None:
+            server_log.info("配信：版 %s (%s路線を取得)", version, len(due))
+
+    # ニュースの見出しを取得して配信する
+    def poll_news(self):
+        if time.monotonic() < self._next_news:
+            return
+        from .news import fetch_news_headlines
+
+        self._next_news = time.monotonic() + self.news_interval
+        try:
+            headlines = fetch_news_headlines(self.pipeline.transport, self.news_url)
+        except Exception as e:
+            news_log.warning("ニュースの取得に失敗しました：%s", e)
+            return
+        if headlines:
+            self.hub.publish(news=headlines)
+
+    def run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll_lines()
+                self.poll_news()
+            except Exception as e: # 取得の失敗で配信を止めない
+                fetch_log.exception("取得中にエラーが発生しました：%s", e)
+            if time.monotonic() >= self._next_summary:
+                self._next_summary = time.monotonic() + self.summary_interval
+                scheduler_log.info(METRICS.summary_line())
+            wait = min(self.scheduler.next_due_in(), max(0.0, self._next_news - time.monotonic()), 30.0)
+            self._stop.wait(max(wait, 1.0))
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="traffic_aggregator", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+
+# サーバーを起動する( Ctrl+C で終了)
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, lines=None, export_path=None):
+    from .pipeline import StatusPipeline
+
+    setup_logging()
+    hub = StatusHub(export_path=export_path)
+    pipeline = StatusPipeline(lines=lines)
+    aggregator = StatusAggregator(pipeline, hub).start()
+    server = StatusServer(hub, host, port)
+    server_log.info("配信サーバーを起動しました：http://%s:%s/status , /events", host, server.server_port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        aggregator.stop()
+        server.server_close()
+        pipeline.close()
+        shutdown_logging()
+    return 0
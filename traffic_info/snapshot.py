@@ -0,0 +1,99 @@
+"""
+最後に取得できた運行状況とニュース見出しの保存(起動直後の表示用)
+
+更新が終わる度に cache/snapshot.json へ保存し、次回の起動時は通信より先に
+この内容を「古い情報」として表示する。保存は一時ファイルに書いてから置き換えるので、
+書き込み中に電源が切れても前回の内容が残る
+"""
+
+import json
+import os
+import time
+
+from .logs import get_logger
+
+ui_log = get_logger("ui")
+
+SNAPSHOT_VERSION = 1
+
+
+class SnapshotStore:
+
+    # コンストラクタ
+    def __init__(self, path):
+        self.path = path
+        self.lines = {} # 路線名 -> {"status": ..., "text": ..., "fetched_at": UNIX時刻}
+        self.news = None # {"headlines": [...], "fetched_at": UNIX時刻}
+        self.dirty = False # 保存していない変更があるか
+        self.saved_at = 0.0 # 最後に保存した時刻
+
+    # 保存済みの内容を読み込む(無い・壊れている場合は空のまま)
+    def load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            if not isinstance(e, FileNotFoundError):
+                ui_log.warning("保存した運行状況を読み込めませんでした：%s", e)
+            return self
+        if not isinstance(data, dict) or data.get("version") != SNAPSHOT_VERSION:
+            return self
+        self.lines = {
+            name: entry for name, entry in (data.get("lines") or {}).items()
+            if isinstance(entry, dict) and "status" in entry and "text" in entry
+        }
+        news = data.get("news")
+        if isinstance(news, dict) and news.get("headlines"):
+            self.news = news
+        self.dirty = False
+        return self
+
+    # 1路線分の取得結果を記録(変わった場合のみ保存対象にする)
+    def update_line(self, name, status, text, fetched_at=None):
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        entry = self.lines.get(name)
+        if entry is not None and entry["status"] == status and entry["text"] == text:
+            entry["fetched_at"] = fetched_at # 時刻だけの変更は次の保存で書く
+            return
+        self.lines[name] = {"status": status, "text": text, "fetched_at": fetched_at}
+        self.dirty = True
+
+    # ニュース見出しを記録
+    def update_news(self, headlines, fetched_at=None):
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        if self.news is not None and self.news["headlines"] == list(headlines):
+            self.news["fetched_at"] = fetched_at
+            return
+        self.news = {"headlines": list(headlines), "fetched_at": fetched_at}
+        self.dirty = True
+
+    # 設定から外れた路線を削除
+    def retain(self, names):
+        names = set(names)
+        for name in list(self.lines):
+            if name not in names:
+                del self.lines[name]
+                self.dirty = True
+
+    # ファイルに保存(一時ファイルに書いてから置き換える)
+    # 状況・見出しが変わった時, または前回の保存から max_age 秒以上経った時(取得時刻の更新)だけ書く
+    def save(self, max_age=60.0):
+        now = time.time()
+        if not self.dirty and now - self.saved_at < max_age:
+            return False
+        data = {
+            "version": SNAPSHOT_VERSION,
+            "saved_at": now,
+            "lines": self.lines,
+            "news": self.news,
+        }
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno()) # 再起動直前の書き込みも残す
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+        self.saved_at = now
+        return True
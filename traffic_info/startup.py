@@ -0,0 +1,40 @@
+"""
+起動時間の計測
+
+traffic_info を import した時点を起点に、各段階(import・ウィジェット作成・
+最初の描画・最初のデータ表示)までの時間を記録し、まとめて表示する
+"""
+
+import time
+
+
+class StartupTimer:
+
+    # コンストラクタ
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._last = self.started
+        self.phases = [] # (段階名, その段階にかかったミリ秒)
+        self.reported = False
+
+    # 段階の終了を記録(同じ段階は1回だけ)
+    def mark(self, phase):
+        if any(name == phase for name, _ in self.phases):
+            return
+        now = time.perf_counter()
+        self.phases.append((phase, (now - self._last) * 1000))
+        self._last = now
+
+    # 起点からの合計ミリ秒
+    @property
+    def total_ms(self):
+        return (self._last - self.started) * 1000
+
+    # 計測結果を1行で返す
+    def report(self):
+        parts = ", ".join(f"{name} {ms:.0f}ms" for name, ms in self.phases)
+        return f"起動時間：{parts} (合計 {self.total_ms:.0f}ms)"
+
+
+# プロセス全体で1つ(パッケージの import 時に開始)
+STARTUP = StartupTimer()
@@ -0,0 +1,79 @@
+"""
+路線毎の表示状態(スナップショット)
+
+取得結果から表示に必要な値(状況・テキスト・アイコン・配色)を LineState にまとめ、
+前回の LineState と比較して変わった項目だけをウィジェットに反映する
+取得に失敗した路線は mark_stale() で前回の状態に「古い情報」の印を付けて表示し続ける
+"""
+
+from collections import namedtuple
+
+
+# 1路線分の表示状態
+LineState = namedtuple(
+    "LineState",
+    [
+        "status", # "normal" / "trouble"
+        "text", # 運行状況テキスト
+        "icon", # icon_dict のキー
+        "canvas_bg", # 運行状況 Canvas の背景色
+        "icon_bg", # アイコンの背景色
+        "text_fill", # 運行状況テキストの文字色
+        "section", # 区間情報
+        "company_url", # 鉄道会社公式サイトURL (アイコンクリック用)
+        "stale", # 最新の取得に失敗し、前回取得した情報を表示している
+    ],
+    defaults=(False,),
+)
+
+# 状況毎の配色
+STATUS_STYLES = {
+    "normal": {
+        "canvas_bg": "AntiqueWhite2", # 通常時の運行情報テキスト背景色
+        "icon_bg": "green yellow", # 通常時のアイコン背景色
+        "text_fill": "black",
+    },
+    "trouble": {
+        "canvas_bg": "yellow", # トラブル時の運行情報テキスト背景色
+        "icon_bg": "yellow", # トラブル時のアイコン背景色
+        "text_fill": "red", # トラブル時は赤文字
+    },
+}
+
+
+# アイコンの判別
+def icon_key_for(train_name, status):
+    if status == "trouble": # トラブル発生時は trouble アイコンを使用(優先)
+        return "trouble"
+    if "新幹線" in train_name: # 路線名に[ 新幹線 ]が含まれていれば shinkansen アイコン
+        return "shinkansen"
+    return "normal" # 在来線など
+
+
+# 取得結果から LineState を作成
+def build_line_state(train_name, status, text, section="", company_url=None):
+    style = STATUS_STYLES.get(status, STATUS_STYLES["trouble"])
+    return LineState(
+        status=status,
+        text=text,
+        icon=icon_key_for(train_name, status),
+        canvas_bg=style["canvas_bg"],
+        icon_bg=style["icon_bg"],
+        text_fill=style["text_fill"],
+        section=section,
+        company_url=company_url,
+    )
+
+
+# 前回の状態を「古い情報」にする(取得に失敗した場合)
+def mark_stale(state):
+    if state is None or state.stale:
+        return state
+    return state._replace(stale=True)
+
+
+# 変わった項目名の集合を返す(前回が無ければ全項目)
+def diff_line_state(old, new):
+    if old is None:
+        return set(new._fields)
+    return {name for name, old_value, new_value in zip(new._fields, old, new) if old_value != new_value}
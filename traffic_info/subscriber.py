@@ -0,0 +1,207 @@
+"""
+配信サーバー( traffic_info.server )または共有ファイルから運行状況を受け取る
+
+画面( board )を購読モードで起動すると、自分では取得せずにここで受け取った変更だけを反映する
+    SseFeed  : http://HOST:PORT/events を購読。切断されたら Last-Event-ID を付けて再接続し、
+               取りこぼした版から続けて受け取る
+    FileFeed : サーバーが書き出した JSON ファイル( --serve --export FILE )の更新を確認する
+受け取った内容は events キューに積む(UI スレッドから after() で取り出す)
+    ("snapshot", 版, {"lines": ..., "news": ...})  全体
+    ("delta", 版, {"lines": ..., "removed": ..., "news": ...})  変わった部分
+    ("connected", None, None) / ("disconnected", None, エラー)
+"""
+
+import http.client
+import json
+import os
+import queue
+import socket
+import threading
+from urllib.parse import urlsplit
+
+
+# 受信元(SSE / ファイル)共通の処理
+class _Feed:
+
+    def __init__(self, source):
+        self.source = source # URL またはファイルのパス
+        self.events = queue.Queue()
+        self.version = None # 最後に受け取った版
+        self.connected = False
+        self._stop = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="traffic_feed", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    # 次は全体を受け取り直す(手動更新用)
+    def resync(self):
+        self.version = None
+
+    def _set_connected(self, connected, error=None):
+        if connected != self.connected:
+            self.connected = connected
+            self.events.put(("connected", None, None) if connected else ("disconnected", None, error))
+
+    # キューに溜まったイベントを取り出す(UI スレッドから呼ぶ)
+    def drain(self):
+        items = []
+        while True:
+            try:
+                items.append(self.events.get_nowait())
+            except queue.Empty:
+                return items
+
+
+# Server-Sent Events の購読
+class SseFeed(_Feed):
+
+    # コンストラクタ
+    # read_timeout: この秒数何も届かなければ切断とみなす(サーバーは15秒毎に keepalive を送る)
+    def __init__(self, url, read_timeout=45.0, max_retry=30.0):
+        super().__init__(url)
+        self.url = url
+        self.read_timeout = read_timeout
+        self.max_retry = max_retry
+        self.retry = 1.0 # 再接続までの秒数(サーバーの retry: で変わる)
+        self._sock = None # 受信中のソケット(別スレッドから切断するため)
+        self._resyncing = False
+
+    def stop(self):
+        super().stop()
+        self._close()
+
+    # 接続し直して全体を受け取る(切断扱いにはしない)
+    def resync(self):
+        super().resync()
+        self._resyncing = True
+        self._close()
+
+    # 読み込み待ちを解除する
+    def _close(self):
+        sock = self._sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def _connect(self):
+        url = urlsplit(self.url)
+        connection_class = http.client.HTTPSConnection if url.scheme == "https" else http.client.HTTPConnection
+        conn = connection_class(url.hostname, url.port, timeout=self.read_timeout)
+        headers = {"Accept": "text/event-stream", "Cache-Control": "no-cache"}
+        if self.version is not None:
+            headers["Last-Event-ID"] = str(self.version) # 続きから
+        conn.request("GET", (url.path or "/events") + (f"?{url.query}" if url.query else ""), headers=headers)
+        self._sock = conn.sock
+        response = conn.getresponse()
+        if response.status != 200:
+            response.close()
+            conn.close()
+            raise ConnectionError(f"HTTP {response.status}")
+        return response
+
+    # 1回の接続で届いたイベントを読み続ける(切断されたら戻る)
+    def _read_events(self, response):
+        event, event_id, data = "message", None, []
+        while not self._stop.is_set():
+            raw = response.readline()
+            if not raw: # 切断
+                return
+            line = raw.decode("utf-8").rstrip("\r\n")
+            if not line: # 空行でイベント確定
+                if data:
+                    self._dispatch(event, event_id, "\n".join(data))
+                event, event_id, data = "message", None, []
+                continue
+            if line.startswith(":"): # コメント( keepalive )
+                continue
+            field, _, value = line.partition(":")
+            value = value[1:] if value.startswith(" ") else value
+            if field == "event":
+                event = value
+            elif field == "id":
+                event_id = value
+            elif field == "data":
+                data.append(value)
+            elif field == "retry" and value.isdigit():
+                self.retry = int(value) / 1000
+
+    def _dispatch(self, event, event_id, data):
+        if event not in ("snapshot", "delta"):
+            return
+        payload = json.loads(data)
+        version = int(event_id) if event_id else payload.get("version")
+        self.events.put((event, version, payload))
+        self.version = version
+
+    def _run(self):
+        delay = self.retry
+        while not self._stop.is_set():
+            response = None
+            try:
+                response = self._connect()
+                self._set_connected(True)
+                delay = self.retry
+                self._read_events(response)
+                error = ConnectionError("配信サーバーから切断されました")
+            except (OSError, http.client.HTTPException, ValueError) as e:
+                error = e
+            finally:
+                if response is not None:
+                    response.close()
+                if self._sock is not None:
+                    self._sock.close()
+                    self._sock = None
+            if self._stop.is_set():
+                break
+            if self._resyncing: # resync() ですぐに接続し直す
+                self._resyncing = False
+                continue
+            self._set_connected(False, error)
+            # 再接続は少しずつ間隔を延ばす(上限 max_retry 秒)
+            self._stop.wait(delay)
+            delay = min(self.max_retry, delay * 2)
+
+
+# 共有ファイル(サーバーが書き出した /status と同じ形式の JSON)の更新確認
+class FileFeed(_Feed):
+
+    # コンストラクタ
+    def __init__(self, path, interval=0.5):
+        super().__init__(path)
+        self.path = path
+        self.interval = interval # 更新日時の確認間隔(秒)
+        self._signature = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                st = os.stat(self.path)
+                signature = (st.st_mtime_ns, st.st_size)
+                if signature != self._signature or self.version is None:
+                    with open(self.path, encoding="utf-8") as f:
+                        payload = json.load(f)
+                    self._signature = signature
+                    if payload.get("version") != self.version:
+                        self.version = payload.get("version")
+                        self.events.put(("snapshot", self.version, payload))
+                self._set_connected(True)
+            except (OSError, ValueError) as e: # 書き込み途中などは次の確認で
+                self._set_connected(False, e)
+            self._stop.wait(self.interval)
+
+
+# URL ならば SseFeed, それ以外はファイルとして FileFeed を作る
+def open_feed(source):
+    if source.startswith(("http://", "https://")):
+        if not urlsplit(source).path.strip("/"):
+            source = source.rstrip("/") + "/events"
+        return SseFeed(source)
+    return FileFeed(source)
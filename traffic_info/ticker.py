@@ -0,0 +1,226 @@
+"""
+スクロール表示(ティッカー)用の共通アニメーションクロックとタスク
+
+ティッカー毎に after() を繰り返すのではなく、1つのクロックが1フレーム毎に
+全ティッカーをまとめて進める。移動量は 速度(px/秒) × 経過時間 で計算するので、
+フレームが遅れてもスクロール速度は変わらない
+"""
+
+import time
+
+from .metrics import METRICS
+
+MAX_FRAME_DT = 0.25 # 1フレームで進める最大秒数(長時間止まった後に大きく飛ばないように)
+
+
+# スクロールタスク1件分(毎フレーム作り直さず、その場で更新する)
+class ScrollTask:
+    __slots__ = (
+        "canvas", # Canvas Widget
+        "text_item_id", # テキストアイテムID
+        "text", # 表示テキスト
+        "text_width", # 表示テキストの幅(ピクセル)
+        "x", # 現在のX座標(text中央)
+        "y", # Y座標
+        "active", # スクロール中か
+        "is_trouble", # トラブル情報か
+        "font", # フォントオブジェクト
+        "velocity", # スクロール速度(ピクセル/秒)
+    )
+
+    def __init__(self, canvas, text_item_id, text, text_width, x, y, active, is_trouble, font, velocity):
+        self.canvas = canvas
+        self.text_item_id = text_item_id
+        self.text = text
+        self.text_width = text_width
+        self.x = x
+        self.y = y
+        self.active = active
+        self.is_trouble = is_trouble
+        self.font = font
+        self.velocity = velocity
+
+    # dt 秒分 左にスクロールする
+    # テキストが左端で完全に消えたら canvas_width (右端) の外側に戻す
+    def advance(self, dt, canvas_width):
+        x = self.x - self.velocity * dt
+        half_width = self.text_width / 2 # anchor="center" なので text右端は x + 幅の半分
+        if x + half_width < 0:
+            x = canvas_width + half_width
+        self.x = x
+        self.canvas.coords(self.text_item_id, x, self.y)
+
+
+# 複数の文字列(ニュース見出しなど)を1件ずつの Canvas アイテムとして順番に流すティッカー
+# 左端で消えたアイテムを削除し、右端が空いたら次の文字列を後ろに追加する
+# set_texts() で文字列を差し替えても表示中のアイテムはそのまま流れ続け、
+# 次に追加するアイテムから新しい内容になる(位置が飛んだり止まったりしない)
+class TickerChain:
+    __slots__ = (
+        "canvas", # Canvas Widget
+        "tag", # 全アイテム共通のタグ(まとめて移動・削除する)
+        "texts", # 順番に流す文字列のリスト
+        "next_index", # 次に追加する文字列の位置
+        "items", # 表示中のアイテム [アイテムID, 左端のX座標, 幅, 文字列]
+        "y", # Y座標
+        "font", # フォントオブジェクト
+        "font_spec", # create_text に渡すフォント
+        "measure", # measure(フォント, 文字列) -> 幅(ピクセル)
+        "fill", # 文字色
+        "velocity", # スクロール速度(ピクセル/秒)
+        "active", # スクロール中か(常に True)
+        "is_trouble", # トラブル情報か(常に False)
+        "text_item_id", # 1件のみのティッカーとの互換用(常に None)
+    )
+
+    def __init__(self, canvas, tag, texts, y, font, font_spec, measure, fill, velocity):
+        self.canvas = canvas
+        self.tag = tag
+        self.texts = list(texts)
+        self.next_index = 0
+        self.items = []
+        self.y = y
+        self.font = font
+        self.font_spec = font_spec
+        self.measure = measure
+        self.fill = fill
+        self.velocity = velocity
+        self.active = True
+        self.is_trouble = False
+        self.text_item_id = None
+
+    # 流す文字列を差し替える(同じ内容なら何もせず False)
+    # 表示中の最後のアイテムが新しいリストにもあれば、その次から続ける
+    def set_texts(self, texts):
+        texts = list(texts)
+        if texts == self.texts:
+            return False
+        last_text = self.items[-1][3] if self.items else None
+        self.texts = texts
+        if last_text in texts:
+            self.next_index = (texts.index(last_text) + 1) % len(texts)
+        else:
+            self.next_index = 0 # 先頭(見出しの前置き)から
+        return True
+
+    # dt 秒分 左にスクロールし、右端が空いたら次の文字列を追加する
+    def advance(self, dt, canvas_width):
+        dx = -self.velocity * dt
+        if self.items:
+            self.canvas.move(self.tag, dx, 0) # 全アイテムを1回で移動
+            for item in self.items:
+                item[1] += dx
+            # 左端で完全に消えたアイテムを削除
+            while self.items and self.items[0][1] + self.items[0][2] < 0:
+                self.canvas.delete(self.items.pop(0)[0])
+        # 右端が空いたら追加(最初は右端の外側から)
+        right = self.items[-1][1] + self.items[-1][2] if self.items else canvas_width
+        while self.texts and right < canvas_width + 1:
+            text = self.texts[self.next_index % len(self.texts)]
+            self.next_index = (self.next_index + 1) % len(self.texts)
+            width = self.measure(self.font, text)
+            item_id = self.canvas.create_text(
+                right,
+                self.y,
+                text=text,
+                font=self.font_spec,
+                anchor="w",
+                fill=self.fill,
+                tags=self.tag
+            )
+            self.items.append([item_id, right, width, text])
+            right += width
+            if width <= 0: # 幅が取れない場合(描画前など)は次のフレームで
+                break
+
+    # 文字色を変更
+    def set_fill(self, fill):
+        self.fill = fill
+        self.canvas.itemconfigure(self.tag, fill=fill)
+
+    # 全アイテムを削除
+    def clear(self):
+        self.canvas.delete(self.tag)
+        self.items = []
+
+
+class FrameClock:
+
+    # コンストラクタ
+    # widget: after() / after_cancel() を持つ Tk ウィジェット
+    # on_frame: on_frame(dt秒) を毎フレーム呼ぶ。False を返すとクロックを止める
+    def __init__(self, widget, on_frame, fps=30):
+        self.widget = widget
+        self.on_frame = on_frame
+        self.after_id = None
+        self._last_time = None
+        self._scheduled_delay = 0.0 # 前回予約した待ち時間(秒)
+        self.set_fps(fps)
+        self.reset_stats()
+
+    # 目標フレームレートを設定
+    def set_fps(self, fps):
+        self.fps = max(1, int(fps))
+        self.frame_budget_ms = 1000.0 / self.fps # 1フレームあたりの持ち時間
+
+    # 統計をリセット
+    def reset_stats(self):
+        self.frames = 0 # 実行したフレーム数
+        self.over_budget = 0 # 処理が持ち時間を超えたフレーム数
+        self.late_frames = 0 # 予定より大きく遅れて始まったフレーム数
+        self.max_work_ms = 0.0 # 1フレームの最大処理時間
+
+    @property
+    def running(self):
+        return self.after_id is not None
+
+    # クロック開始(動作中なら何もしない)
+    def start(self):
+        if self.after_id is None:
+            self._last_time = time.monotonic()
+            self._scheduled_delay = int(self.frame_budget_ms) / 1000
+            self.after_id = self.widget.after(int(self.frame_budget_ms), self._tick)
+
+    # クロック停止
+    def stop(self):
+        if self.after_id is not None:
+            try:
+                self.widget.after_cancel(self.after_id)
+            except Exception:
+                pass # ウィジェット破棄後など
+            self.after_id = None
+
+    # 1フレーム分の処理
+    def _tick(self):
+        self.after_id = None
+        now = time.monotonic()
+        dt = now - self._last_time
+        self._last_time = now
+        self.frames += 1
+        if dt * 1000 > self.frame_budget_ms * 2: # 予定の2倍以上遅れた
+            self.late_frames += 1
+        METRICS.frame_interval_seconds.observe(dt)
+        METRICS.frame_drift_seconds.observe(max(0.0, dt - self._scheduled_delay))
+
+        keep_running = self.on_frame(min(dt, MAX_FRAME_DT))
+
+        work_ms = (time.monotonic() - now) * 1000
+        if work_ms > self.max_work_ms:
+            self.max_work_ms = work_ms
+        if work_ms > self.frame_budget_ms:
+            self.over_budget += 1
+        if keep_running:
+            # 処理時間を差し引いて次のフレームを予約
+            delay = max(1, int(self.frame_budget_ms - work_ms))
+            self._scheduled_delay = (delay + work_ms) / 1000 # 今のフレームの開始から次のフレームまで
+            self.after_id = self.widget.after(delay, self._tick)
+
+    # 統計を辞書で返す
+    def stats(self):
+        return {
+            "fps": self.fps,
+            "frames": self.frames,
+            "over_budget": self.over_budget,
+            "late_frames": self.late_frames,
+            "max_work_ms": round(self.max_work_ms, 2),
+        }
@@ -0,0 +1,334 @@
+"""
+共有 HTTP トランスポート
+
+- requests.Session によるコネクションプール(keep-alive)
+- gzip / brotli 圧縮の受け入れ(brotli はモジュールがある場合のみ)
+- ETag / Last-Modified による条件付き GET
+  変更がなければ 304 で本文を受け取らず、前回の本文と解析結果を再利用する
+- get_extracted(): 本文を少しずつ読みながら解析し、必要な部分を読み終えたら接続を閉じる
+  (本文全体は保持しない。本文の大きさには上限 MAX_BODY_BYTES がある)
+- 更新サイクル毎の 節約バイト数 / 再利用コネクション数 を集計
+- request_hooks: リクエストを送る度に呼ぶ関数(取得数の上限 PollScheduler.record_sent など)
+
+requests は起動を速くするため最初の通信時(ワーカースレッド)に import する
+"""
+
+import codecs
+import threading
+import time
+
+MAX_BODY_BYTES = 2 * 1024 * 1024 # 1ページの本文(展開後)の上限
+STREAM_CHUNK_SIZE = 8 * 1024 # get_extracted() で1回に読む大きさ
+DRAIN_LIMIT = 32 * 1024 # 解析が終わった時の残りがこれ以下なら読み切って接続を再利用する
+
+
+# 本文が上限を超えた(解析せずに打ち切った)
+class ResponseTooLargeError(Exception):
+
+    def __init__(self, url, limit):
+        super().__init__(f"本文が上限 ({limit} bytes) を超えました：{url}")
+        self.url = url
+        self.limit = limit
+
+
+# brotli を展開できる場合のみ br を要求する(urllib3 が brotli / brotlicffi を利用)
+def _accept_encoding():
+    for module_name in ("brotli", "brotlicffi"):
+        try:
+            __import__(module_name)
+            return "gzip, deflate, br"
+        except ImportError:
+            pass
+    return "gzip, deflate"
+
+
+# requests のネットワークエラー・HTTPエラーか
+def is_network_error(error):
+    import requests
+    return isinstance(error, requests.exceptions.RequestException)
+
+
+# 再試行で直る可能性のあるエラーか(接続エラー・タイムアウト・5xx・429)
+def is_retryable_error(error):
+    if isinstance(error, TimeoutError): # 取得エンジンの持ち時間切れ
+        return True
+    if not is_network_error(error):
+        return False
+    import requests
+    if isinstance(error, requests.exceptions.HTTPError):
+        status_code = getattr(error.response, "status_code", None)
+        return status_code is None or status_code >= 500 or status_code == 429
+    return isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+
+
+# URL 毎のキャッシュ
+class CachedPage:
+    __slots__ = ("url", "text", "size", "etag", "last_modified", "parsed")
+
+    def __init__(self, url, text, size, etag, last_modified):
+        self.url = url
+        self.text = text # 本文(デコード済み。get_extracted() の場合は None)
+        self.size = size # 本文のバイト数(展開後)
+        self.etag = etag
+        self.last_modified = last_modified
+        self.parsed = None # 解析結果のメモ(304 の場合は再解析しない)
+
+
+# get() の戻り値
+class PageResponse:
+    __slots__ = ("page", "not_modified", "status_code", "parse_seconds")
+
+    def __init__(self, page, not_modified, status_code, parse_seconds=0.0):
+        self.page = page # CachedPage
+        self.not_modified = not_modified # 304 で前回の本文を使ったか
+        self.status_code = status_code
+        self.parse_seconds = parse_seconds # get_extracted() で解析にかかった秒数(読み込みの待ち時間を除く)
+
+    @property
+    def text(self):
+        return self.page.text
+
+
+class HttpTransport:
+
+    # コンストラクタ
+    # max_body_bytes: get_extracted() で読む本文の上限, drain_limit: 解析後に読み切る残りの上限
+    def __init__(self, pool_maxsize=4, user_agent=None, max_body_bytes=MAX_BODY_BYTES, drain_limit=DRAIN_LIMIT):
+        self.pool_maxsize = max(1, int(pool_maxsize)) # 同時取得数と同じだけ接続を保持する
+        self.user_agent = user_agent
+        self.max_body_bytes = max_body_bytes
+        self.drain_limit = drain_limit
+        self._session = None # 最初の通信時に作成
+        self._adapter = None
+        self._cache = {} # URL -> CachedPage
+        self._lock = threading.Lock() # ワーカースレッドから同時に呼ばれる
+        self.request_hooks = [] # リクエストを送る度に呼ぶ関数(引数なし。ワーカースレッドから呼ばれる)
+        self._reset_cycle_counters()
+
+    # requests.Session (最初に呼ばれたときに作成)
+    @property
+    def session(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.pool_maxsize)
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    session.headers["Accept-Encoding"] = _accept_encoding()
+                    if self.user_agent:
+                        session.headers["User-Agent"] = self.user_agent
+                    self._adapter = adapter
+                    self._session = session
+        return self._session
+
+    def _reset_cycle_counters(self):
+        self._requests = 0 # リクエスト数
+        self._not_modified = 0 # 304 の数
+        self._bytes_received = 0 # 受信バイト数(圧縮後、分かる範囲で)
+        self._bytes_saved_cache = 0 # 304 で受け取らずに済んだバイト数
+        self._bytes_saved_compression = 0 # 圧縮で減ったバイト数
+        self._bytes_saved_stream = 0 # 解析が終わって読まずに済んだバイト数( Content-Length が分かる場合)
+        self._stopped_early = 0 # 解析が終わって途中で読むのをやめた数
+        self._largest_read = 0 # 1ページで読んだ本文の最大バイト数(展開後)
+        self._pool_snapshot = self._pool_counters()
+
+    # urllib3 のプールから (新規接続数, リクエスト数) を集計
+    def _pool_counters(self):
+        new_connections = 0
+        pool_requests = 0
+        if self._adapter is None: # まだ通信していない
+            return 0, 0
+        try:
+            pools = self._adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools[key]
+                new_connections += getattr(pool, "num_connections", 0)
+                pool_requests += getattr(pool, "num_requests", 0)
+        except Exception:
+            pass # 集計できなくても取得には影響させない
+        return new_connections, pool_requests
+
+    # 更新サイクルの開始(集計をリセット)
+    def begin_cycle(self):
+        with self._lock:
+            self._reset_cycle_counters()
+
+    # 今回のサイクルの集計結果
+    def cycle_stats(self):
+        with self._lock:
+            new_connections, pool_requests = self._pool_counters()
+            base_connections, base_requests = self._pool_snapshot
+            opened = new_connections - base_connections
+            sent = pool_requests - base_requests
+            return {
+                "requests": self._requests,
+                "not_modified": self._not_modified,
+                "bytes_received": self._bytes_received,
+                "bytes_saved": self._bytes_saved_cache + self._bytes_saved_compression + self._bytes_saved_stream,
+                "bytes_saved_cache": self._bytes_saved_cache,
+                "bytes_saved_compression": self._bytes_saved_compression,
+                "bytes_saved_stream": self._bytes_saved_stream,
+                "stopped_early": self._stopped_early,
+                "largest_read": self._largest_read,
+                "connections_opened": opened,
+                "connections_reused": max(0, sent - opened),
+            }
+
+    # キャッシュと条件付き GET のヘッダー
+    # need_text: 本文が必要か(本文を持たないキャッシュ = get_extracted() の結果は使わない)
+    def _conditional(self, url, need_text):
+        with self._lock:
+            cached = self._cache.get(url)
+        if cached is None or (cached.text is None if need_text else cached.parsed is None):
+            return None, {}
+        headers = {}
+        if cached.etag:
+            headers["If-None-Match"] = cached.etag
+        if cached.last_modified:
+            headers["If-Modified-Since"] = cached.last_modified
+        return cached, headers
+
+    # 304 (変更なし) の場合は前回の内容を返す
+    def _reuse_cached(self, cached):
+        with self._lock:
+            self._requests += 1
+            self._not_modified += 1
+            self._bytes_saved_cache += cached.size
+        return PageResponse(cached, True, 304)
+
+    # リクエストを送る(再試行・304 になるものも含めて request_hooks に知らせる)
+    def _send(self, url, headers, timeout, stream=False):
+        for hook in self.request_hooks:
+            hook()
+        return self.session.get(url, headers=headers, timeout=timeout, stream=stream)
+
+    # 検証できるページのみキャッシュ
+    def _store(self, page):
+        if page.etag or page.last_modified:
+            self._cache[page.url] = page
+        else:
+            self._cache.pop(page.url, None)
+
+    # 条件付き GET
+    def get(self, url, timeout=None):
+        cached, headers = self._conditional(url, need_text=True)
+
+        response = self._send(url, headers, timeout)
+
+        if response.status_code == 304 and cached is not None:
+            response.close()
+            return self._reuse_cached(cached)
+
+        response.raise_for_status() # ステータスコードが4xx or 5xxの場合は例外を発生
+        body = response.content
+        size = len(body)
+        # Content-Length は圧縮後のサイズ(圧縮されていない場合は本文と同じ)
+        try:
+            wire_size = int(response.headers.get("Content-Length", size))
+        except ValueError:
+            wire_size = size
+        page = CachedPage(
+            url,
+            response.text,
+            size,
+            response.headers.get("ETag"),
+            response.headers.get("Last-Modified"),
+        )
+        with self._lock:
+            self._requests += 1
+            self._bytes_received += wire_size
+            self._bytes_saved_compression += max(0, size - wire_size)
+            self._largest_read = max(self._largest_read, size)
+            self._store(page)
+        return PageResponse(page, False, response.status_code)
+
+    # 条件付き GET で本文を少しずつ読みながら解析する(本文全体は保持しない)
+    # make_extractor: feed(文字列) / close() / result() と done (解析が終わったか)を持つ解析器を作る関数
+    # done になった時点で読むのをやめて接続を閉じる(残りが drain_limit 以下なら読み切って接続を再利用)
+    # 本文(展開後)が max_body_bytes を超えたら ResponseTooLargeError
+    # 戻り値の page.parsed が解析結果 (result() の値)。304 の場合は前回の解析結果
+    def get_extracted(self, url, make_extractor, timeout=None):
+        cached, headers = self._conditional(url, need_text=False)
+
+        response = self._send(url, headers, timeout, stream=True)
+        try:
+            if response.status_code == 304 and cached is not None:
+                return self._reuse_cached(cached)
+            response.raise_for_status() # ステータスコードが4xx or 5xxの場合は例外を発生
+            # Content-Length は圧縮後のサイズ(圧縮されていない場合は本文と同じ)
+            try:
+                wire_length = int(response.headers["Content-Length"])
+            except (KeyError, ValueError):
+                wire_length = None
+            if wire_length is not None and wire_length > self.max_body_bytes:
+                raise ResponseTooLargeError(url, self.max_body_bytes)
+            # response.text と同じ文字コード(ヘッダーで指定されていない場合は UTF-8)
+            decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(errors="replace")
+            extractor = make_extractor()
+            size = 0
+            parse_seconds = 0.0
+            stopped_early = False
+            for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+                size += len(chunk)
+                if size > self.max_body_bytes:
+                    raise ResponseTooLargeError(url, self.max_body_bytes)
+                started = time.perf_counter()
+                extractor.feed(decoder.decode(chunk))
+                parse_seconds += time.perf_counter() - started
+                if extractor.done:
+                    stopped_early = True
+                    break
+            started = time.perf_counter()
+            if not extractor.done:
+                extractor.feed(decoder.decode(b"", final=True))
+            extractor.close()
+            parsed = extractor.result()
+            parse_seconds += time.perf_counter() - started
+            wire_read = _wire_bytes_read(response, size)
+            remaining = wire_length - wire_read if wire_length is not None else None
+            if stopped_early and remaining is not None and remaining <= self.drain_limit:
+                # 残りが少なければ読み切って接続をプールに戻す(閉じると次の取得で接続し直しになる)
+                for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+                    size += len(chunk)
+                wire_read = wire_length
+                stopped_early = False
+        finally:
+            response.close() # 読み切っていない場合は接続を閉じる
+
+        # 304 の節約量は本文全体の大きさ(途中でやめた場合は Content-Length, 分からなければ読んだ分)
+        page = CachedPage(
+            url,
+            None,
+            wire_length if stopped_early and wire_length is not None else size,
+            response.headers.get("ETag"),
+            response.headers.get("Last-Modified"),
+        )
+        page.parsed = parsed
+        with self._lock:
+            self._requests += 1
+            self._bytes_received += wire_read
+            if not stopped_early:
+                self._bytes_saved_compression += max(0, size - wire_read)
+            else:
+                self._stopped_early += 1
+                self._bytes_saved_stream += max(0, remaining or 0)
+            self._largest_read = max(self._largest_read, size)
+            self._store(page)
+        return PageResponse(page, False, response.status_code, parse_seconds)
+
+    # 終了処理
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+
+
+# 受信したバイト数(圧縮後)。urllib3 から分からない場合は展開後のバイト数
+def _wire_bytes_read(response, size):
+    try:
+        return int(response.raw.tell())
+    except Exception:
+        return size